@@ -21,6 +21,8 @@ data_load_event_rule_schedule = config.require("dataLoadEventRuleSchedule")
 data_load_event_rule_state = config.require("dataLoadEventRuleState")
 lambda_execution_timeout = config.require_int("lambdaExecutionTimeout")
 log_level = config.require("logLevel")
+question_worker_concurrency = config.require_int("questionWorkerConcurrency")
+question_worker_reserved_concurrent_executions = config.require_int("questionWorkerReservedConcurrentExecutions")
 openai_api_key_secret_name = config.require("openAiApiKeySecretName")
 pinecone_api_key_secret_name = config.require("pineconeApiKeySecretName")
 slack_bot_token_secret_name = config.require("slackBotTokenSecretName")
@@ -366,6 +368,25 @@ aws.s3.BucketNotification(
     ],
 )
 
+# Questions enqueued by the Slack app, answered by the question worker
+question_dead_letter_queue = aws.sqs.Queue(
+    f"{app_name}-question-dead-letter-queue",
+    message_retention_seconds=345600,  # 4 days
+    sqs_managed_sse_enabled=True,
+)
+
+question_queue = aws.sqs.Queue(
+    f"{app_name}-question-queue",
+    message_retention_seconds=1800,  # Slack response URLs expire after 30 minutes
+    redrive_allow_policy=json.dumps({"redrivePermission": "denyAll"}),
+    redrive_policy=pulumi.Output.all(question_dead_letter_queue.arn).apply(
+        lambda args: json.dumps({"deadLetterTargetArn": args[0], "maxReceiveCount": 3})
+    ),
+    sqs_managed_sse_enabled=True,
+    # AWS recommends six times the function timeout, so a batch being answered is not redelivered
+    visibility_timeout_seconds=lambda_execution_timeout * 6,
+)
+
 #
 # Application
 #
@@ -449,6 +470,21 @@ docker_image_lambda_event_handler = docker.Image(
     registry=registry_info,
 )
 
+docker_image_lambda_question_handler = docker.Image(
+    f"{app_name}-lambda-question-handler-image",
+    build=docker.DockerBuildArgs(
+        args={
+            "LAMBDA_HANDLER": "arti_ai.lambda_question_handler.handler",
+        },
+        context="../..",
+        dockerfile="../../Dockerfile",
+        platform="linux/amd64",
+    ),
+    image_name=pulumi.Output.concat(ecr_repository.repository_url, ":lambda-question-handler"),
+    skip_push=False,
+    registry=registry_info,
+)
+
 docker_image_lambda_sqs_handler = docker.Image(
     f"{app_name}-lambda-sqs-handler-image",
     build=docker.DockerBuildArgs(
@@ -484,6 +520,7 @@ app_lambda_role = aws.iam.Role(
 lambda_environment = pulumi.Output.all(  # type: ignore
     app_bucket.id,
     sqs_queue.url,
+    question_queue.url,
 ).apply(
     lambda args: {
         "variables": {
@@ -497,6 +534,9 @@ lambda_environment = pulumi.Output.all(  # type: ignore
             "OPENAI_API_KEY_SECRET_NAME": openai_api_key_secret_name,
             "PINECONE_API_KEY_SECRET_NAME": pinecone_api_key_secret_name,
             "PIP_CACHE_DIR": "/tmp/pip-cache",
+            "QUESTION_QUEUE": "sqs",
+            "QUESTION_QUEUE_URL": args[2],
+            "QUESTION_WORKER_CONCURRENCY": question_worker_concurrency,
             "SLACK_BOT_TOKEN_SECRET_NAME": slack_bot_token_secret_name,
         }
     }
@@ -544,6 +584,16 @@ app_sqs_lambda = aws.lambda_.Function(
     **common_lambda_options,
 )
 
+# Create the Question Worker Lambda function
+app_question_lambda = aws.lambda_.Function(
+    resource_name=f"{app_name}-question-lambda",
+    environment=lambda_environment,
+    reserved_concurrent_executions=question_worker_reserved_concurrent_executions,
+    image_uri=docker_image_lambda_question_handler.repo_digest,
+    opts=pulumi.ResourceOptions(depends_on=[docker_image_lambda_question_handler]),
+    **common_lambda_options,
+)
+
 secrets_manager_policy = aws.iam.RolePolicy(
     f"{app_name}-secrets-manager-policy",
     role=app_lambda_role.name,
@@ -560,7 +610,12 @@ secrets_manager_policy = aws.iam.RolePolicy(
                             f"{args[0]}:{pinecone_api_key_secret_name}-??????",
                             f"{args[0]}:{slack_bot_token_secret_name}-??????",
                         ],
-                    }
+                    },
+                    {
+                        "Action": "secretsmanager:BatchGetSecretValue",
+                        "Effect": "Allow",
+                        "Resource": "*",
+                    },
                 ],
             }
         )
@@ -605,6 +660,37 @@ sqs_policy = aws.iam.RolePolicy(
     ),
 )
 
+question_queue_policy = aws.iam.RolePolicy(
+    f"{app_name}-question-queue-policy",
+    role=app_lambda_role.name,
+    policy=pulumi.Output.all(question_queue.arn).apply(
+        lambda args: json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "SQSSendQuestions",
+                        "Effect": "Allow",
+                        "Action": ["sqs:SendMessage"],
+                        "Resource": [args[0]],
+                    },
+                    {
+                        "Sid": "SQSReceiveQuestions",
+                        "Effect": "Allow",
+                        "Action": [
+                            "sqs:ReceiveMessage",
+                            "sqs:DeleteMessage",
+                            "sqs:GetQueueAttributes",
+                            "sqs:ChangeMessageVisibility",
+                        ],
+                        "Resource": [args[0]],
+                    },
+                ],
+            }
+        )
+    ),
+)
+
 lambda_invoke_policy = aws.iam.RolePolicy(
     f"{app_name}-lambda-invoke-policy",
     role=app_lambda_role.name,
@@ -685,6 +771,17 @@ event_source_mapping = aws.lambda_.EventSourceMapping(
     function_name=app_sqs_lambda.name,
     enabled=True,
     batch_size=10,
+    function_response_types=["ReportBatchItemFailures"],
+)
+
+question_event_source_mapping = aws.lambda_.EventSourceMapping(
+    f"{app_name}-lambda-question-event-source-mapping",
+    event_source_arn=question_queue.arn,
+    function_name=app_question_lambda.name,
+    enabled=True,
+    batch_size=10,
+    function_response_types=["ReportBatchItemFailures"],
+    opts=pulumi.ResourceOptions(depends_on=[question_queue_policy]),
 )
 
 #
@@ -860,9 +957,11 @@ pulumi.export("api_log_group", api_log_group.id)
 pulumi.export("app_log_group", app_log_group.id)
 pulumi.export("app_event_lambda_id", app_event_lambda.id)
 pulumi.export("app_api_lambda_id", app_api_lambda.id)
+pulumi.export("app_question_lambda_id", app_question_lambda.id)
 pulumi.export("docker_image_lambda_api_repo_digest", docker_image_lambda_api_handler.repo_digest)
 pulumi.export("docker_image_lambda_event_repo_digest", docker_image_lambda_event_handler.repo_digest)
 pulumi.export("invoke_url", deployment.invoke_url)
 pulumi.export("pinecone_index_host", pinecone_index.host)
+pulumi.export("question_queue_url", question_queue.url)
 pulumi.export("public_subnet_ids", public_subnet_ids)
 pulumi.export("private_subnet_ids", private_subnet_ids)
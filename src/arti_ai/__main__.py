@@ -1,9 +1,14 @@
 """CLI entrypoint to arti."""
 
 import argparse
+import contextlib
 import json
+import os
+import sys
+import time
 
-from arti_ai.app import ask_ai, list_data_sources, load_data, reset_data
+from arti_ai.app import ask_ai, list_data_sources, load_data, reset_data, sync_data
+from arti_ai.batch import ask_many, completed_ids, read_questions, summarize
 
 
 def handle_ask(question):
@@ -11,6 +16,74 @@ def handle_ask(question):
     print(ask_ai(question))
 
 
+def handle_ask_batch(input_path, output_path=None, concurrency=4, resume=False):
+    """Handle the ask-batch command, writing results as JSON lines and a summary to stderr."""
+    skip_ids = set()
+    if resume and os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as output_file:
+            skip_ids = completed_ids(output_file)
+
+    with contextlib.ExitStack() as stack:
+        input_file = sys.stdin if input_path == "-" else stack.enter_context(open(input_path, "r", encoding="utf-8"))
+        output_file = (
+            sys.stdout
+            if output_path is None
+            else stack.enter_context(open(output_path, "a" if resume else "w", encoding="utf-8"))
+        )
+
+        def write(result):
+            output_file.write(json.dumps(result, default=str) + "\n")
+            output_file.flush()
+
+        start = time.perf_counter()
+        results = ask_many(read_questions(input_file), concurrency=concurrency, skip_ids=skip_ids, on_result=write)
+
+    print(json.dumps(summarize(results, time.perf_counter() - start)), file=sys.stderr)
+
+
+def handle_benchmark(args):
+    """Handle the benchmark command."""
+    # pylint: disable=import-outside-toplevel
+    from arti_ai.benchmark import run_benchmark
+
+    # pylint: enable=import-outside-toplevel
+    report = json.dumps(
+        run_benchmark(
+            documents=args.documents,
+            questions=args.questions,
+            top_k=args.top_k,
+            seed=args.seed,
+            hybrid=args.hybrid,
+            vectordb=args.vectordb,
+            rerank=args.rerank,
+        ),
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(report + "\n")
+    else:
+        print(report)
+
+
+def handle_sync(parser):
+    """Handle the sync command, reporting a missing S3 bucket as a usage error."""
+    try:
+        counts = sync_data()
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(counts))
+
+
+def handle_serve(args):
+    """Handle the serve command."""
+    # pylint: disable=import-outside-toplevel
+    from arti_ai.server import serve
+
+    # pylint: enable=import-outside-toplevel
+    serve(mode=args.mode, host=args.host, port=args.port, workers=args.workers)
+
+
 def main():
     """Entrypoint to CLI."""
     parser = argparse.ArgumentParser(description="CLI entrypoint to ask questions to the AI model.")
@@ -19,22 +92,64 @@ def main():
     parser_ask = subparsers.add_parser("ask", help="Ask a question")
     parser_ask.add_argument("question", type=str, help="The question you want to ask")
 
+    parser_ask_batch = subparsers.add_parser("ask-batch", help="Answer questions from a JSON lines file")
+    parser_ask_batch.add_argument("input", nargs="?", default="-", help="JSON lines of questions, - for stdin")
+    parser_ask_batch.add_argument("--output", "-o", help="File the JSON lines results are written to")
+    parser_ask_batch.add_argument("--concurrency", "-c", type=int, default=4, help="Questions answered at once")
+    parser_ask_batch.add_argument(
+        "--resume", action="store_true", help="Skip questions answered without error in the output file"
+    )
+
+    parser_benchmark = subparsers.add_parser("benchmark", help="Benchmark retrieval offline on a synthetic corpus")
+    parser_benchmark.add_argument("--documents", type=int, default=200, help="Documents in the corpus")
+    parser_benchmark.add_argument("--questions", type=int, default=50, help="Labelled questions asked")
+    parser_benchmark.add_argument("--top-k", type=int, default=3, help="Contexts retrieved per question")
+    parser_benchmark.add_argument("--seed", type=int, default=0, help="Seed of the corpus and questions")
+    parser_benchmark.add_argument("--hybrid", action="store_true", help="Fuse BM25 keyword and vector search")
+    parser_benchmark.add_argument(
+        "--vectordb", choices=("chroma", "local"), default="chroma", help="Vector database provider"
+    )
+    parser_benchmark.add_argument(
+        "--rerank", choices=("bm25", "cross-encoder"), help="Rerank the retrieved chunks with this scorer"
+    )
+    parser_benchmark.add_argument("--output", "-o", help="File the JSON report is written to")
+
     subparsers.add_parser("list", help="List data sources")
 
     subparsers.add_parser("load", help="Load data from data sources")
 
     subparsers.add_parser("reset", help="Reset data in vector database")
 
+    subparsers.add_parser("sync", help="Incrementally synchronise changed S3 data")
+
+    parser_serve = subparsers.add_parser("serve", help="Serve the Slack app with health and metrics endpoints")
+    parser_serve.add_argument(
+        "--mode", choices=("http", "socket"), default="http", help="Receive Slack requests over HTTP or Socket Mode"
+    )
+    parser_serve.add_argument("--host", default="0.0.0.0", help="Host the HTTP server listens on")  # nosec B104
+    parser_serve.add_argument("--port", type=int, default=8080, help="Port the HTTP server listens on")
+    parser_serve.add_argument("--workers", type=int, default=8, help="HTTP requests handled at once")
+
     args = parser.parse_args()
 
     if args.command == "ask":
         handle_ask(question=args.question)
+    elif args.command == "ask-batch":
+        if args.resume and not args.output:
+            parser.error("--resume requires --output")
+        handle_ask_batch(args.input, output_path=args.output, concurrency=args.concurrency, resume=args.resume)
+    elif args.command == "benchmark":
+        handle_benchmark(args)
     elif args.command == "list":
         print(json.dumps(list_data_sources()))
     elif args.command == "load":
         load_data()
     elif args.command == "reset":
         reset_data()
+    elif args.command == "sync":
+        handle_sync(parser)
+    elif args.command == "serve":
+        handle_serve(args)
     else:
         parser.print_help()
 
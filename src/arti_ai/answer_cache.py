@@ -0,0 +1,449 @@
+"""Semantic answer cache for questions asked through arti."""
+
+import abc
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def cosine_similarities(vector, vectors):
+    """Return the cosine similarity of a vector to each of a list of vectors, 0.0 where either is all zeros.
+
+    Args:
+        vector (list[float]): The vector compared.
+        vectors (list[list[float]]): Vectors of the same dimension, stacked into one matrix.
+
+    Returns:
+        numpy.ndarray: The similarities, in the order of `vectors`.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), len(vector))
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+    return np.divide(matrix @ vector, norms, out=np.zeros(len(matrix), dtype=np.float32), where=norms > 0)
+
+
+def parameters_key(**parameters):
+    """Return a stable key for the parameters that change how a question is answered.
+
+    Args:
+        parameters: Model, temperature, prompt, system prompt, `where` filter and similar options.
+
+    Returns:
+        str: A hexadecimal sha256 digest of the canonical JSON form of the parameters.
+    """
+    canonical = json.dumps(parameters, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def encode_answer(answer):
+    """Serialize an answer, optionally with citations, to JSON."""
+    if isinstance(answer, tuple):
+        summary, citations = answer
+        return json.dumps({"answer": summary, "citations": [list(citation) for citation in citations]}, default=str)
+    return json.dumps({"answer": answer})
+
+
+def decode_answer(payload):
+    """Deserialize an answer produced by `encode_answer`."""
+    data = json.loads(payload)
+    if "citations" in data:
+        return data["answer"], [tuple(citation) for citation in data["citations"]]
+    return data["answer"]
+
+
+class AnswerStore(abc.ABC):
+    """Interface for a tier of the answer cache."""
+
+    @abc.abstractmethod
+    def candidates(self, key):
+        """Return `(entry_id, vector, payload)` tuples stored under a parameters key."""
+
+    @abc.abstractmethod
+    def touch(self, entry_id):
+        """Mark an entry as recently used."""
+
+    @abc.abstractmethod
+    def put(self, key, question, vector, payload, entry_id=None):
+        """Store an answer payload under a parameters key and return its entry id."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+    def generation(self):
+        """Return a value that changes whenever the store is cleared, also by another process, or None."""
+        return None
+
+
+class MemoryAnswerStore(AnswerStore):
+    """In-process answer store with LRU and TTL eviction."""
+
+    def __init__(self, max_entries=512, ttl=86400):
+        """Initialize the store.
+
+        Args:
+            max_entries (int): Maximum number of answers kept before the least recently used is evicted.
+            ttl (float): Seconds an answer stays valid.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        """Drop entries older than the TTL."""
+        cutoff = time.time() - self.ttl
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if entry["created_at"] < cutoff]:
+            del self._entries[entry_id]
+
+    def candidates(self, key):
+        """Return `(entry_id, vector, payload)` tuples stored under a parameters key."""
+        with self._lock:
+            self._expire()
+            return [
+                (entry_id, entry["vector"], entry["payload"])
+                for entry_id, entry in self._entries.items()
+                if entry["key"] == key
+            ]
+
+    def touch(self, entry_id):
+        """Mark an entry as recently used."""
+        with self._lock:
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+
+    def put(self, key, question, vector, payload, entry_id=None):
+        """Store an answer payload under a parameters key."""
+        with self._lock:
+            entry_id = entry_id or uuid.uuid4().hex
+            self._entries[entry_id] = {
+                "key": key,
+                "question": question,
+                "vector": list(vector),
+                "payload": payload,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry_id
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteAnswerStore(AnswerStore):
+    """Answer store persisted to a SQLite file, e.g. under /tmp, to survive warm restarts."""
+
+    def __init__(self, path, max_entries=4096, ttl=86400):
+        """Initialize the store.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_entries (int): Maximum number of answers kept before the least recently used is evicted.
+            ttl (float): Seconds an answer stays valid.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id TEXT PRIMARY KEY, key TEXT NOT NULL, question TEXT, vector BLOB NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS answers_key ON answers (key)")
+        self._connection.commit()
+
+    def candidates(self, key):
+        """Return `(entry_id, vector, payload)` tuples stored under a parameters key."""
+        with self._lock:
+            self._connection.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl,))
+            self._connection.commit()
+            rows = self._connection.execute("SELECT id, vector, payload FROM answers WHERE key = ?", (key,)).fetchall()
+        return [(entry_id, array("f", vector).tolist(), payload) for entry_id, vector, payload in rows]
+
+    def touch(self, entry_id):
+        """Mark an entry as recently used."""
+        with self._lock:
+            self._connection.execute("UPDATE answers SET accessed_at = ? WHERE id = ?", (time.time(), entry_id))
+            self._connection.commit()
+
+    def put(self, key, question, vector, payload, entry_id=None):
+        """Store an answer payload under a parameters key."""
+        entry_id = entry_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry_id, key, question, array("f", vector).tobytes(), payload, now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+        return entry_id
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._connection.execute("DELETE FROM answers")
+            self._connection.commit()
+
+
+class DynamoDBAnswerStore(AnswerStore):
+    """Answer store in a DynamoDB table shared by every container, so ingesting anywhere invalidates answers everywhere.
+
+    The table has a `key` string partition key and an `id` string sort key; enable DynamoDB's time to live on the
+    `expires_at` attribute to have expired answers deleted. Clearing bumps a generation counter that prefixes the
+    partition keys, so older answers are no longer found, and other containers notice it within `refresh_seconds`.
+    Answers expire by age only; reads do not record their use.
+    """
+
+    GENERATION = "generation"
+
+    def __init__(self, table_name, ttl=86400, refresh_seconds=30, client=None):
+        """Initialize the store.
+
+        Args:
+            table_name (str): Name of the DynamoDB table.
+            ttl (float): Seconds an answer stays valid.
+            refresh_seconds (float): Seconds the generation is cached before it is read again.
+            client: The DynamoDB client, created on first use by default.
+        """
+        self.table_name = table_name
+        self.ttl = ttl
+        self.refresh_seconds = refresh_seconds
+        self._client = client
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Return the DynamoDB client, created on first use."""
+        if self._client is None:
+            # pylint: disable=import-outside-toplevel
+            import boto3  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def _remember_generation(self, generation):
+        """Cache the generation for `refresh_seconds`."""
+        with self._lock:
+            self._generation, self._checked_at = generation, time.monotonic()
+        return generation
+
+    def generation(self):
+        """Return the number of times the table was cleared, read at most once every `refresh_seconds`."""
+        with self._lock:
+            if self._generation is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return self._generation
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key={"key": {"S": self.GENERATION}, "id": {"S": self.GENERATION}},
+            ConsistentRead=True,
+        ).get("Item")
+        return self._remember_generation(int(item[self.GENERATION]["N"]) if item else 0)
+
+    def candidates(self, key):
+        """Return `(entry_id, vector, payload)` tuples stored under a parameters key in the current generation."""
+        query = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "#key = :key",
+            "FilterExpression": "expires_at > :now",
+            "ExpressionAttributeNames": {"#key": "key"},
+            "ExpressionAttributeValues": {
+                ":key": {"S": f"{self.generation()}#{key}"},
+                ":now": {"N": str(int(time.time()))},
+            },
+        }
+        entries = []
+        while True:
+            response = self.client.query(**query)
+            for item in response.get("Items", []):
+                entries.append((item["id"]["S"], array("f", item["vector"]["B"]).tolist(), item["payload"]["S"]))
+            if "LastEvaluatedKey" not in response:
+                return entries
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def touch(self, entry_id):
+        """Answers expire by age only, so their use is not recorded."""
+
+    def put(self, key, question, vector, payload, entry_id=None):
+        """Store an answer payload under a parameters key in the current generation."""
+        entry_id = entry_id or uuid.uuid4().hex
+        self.client.put_item(
+            TableName=self.table_name,
+            Item={
+                "key": {"S": f"{self.generation()}#{key}"},
+                "id": {"S": entry_id},
+                "question": {"S": question},
+                "vector": {"B": array("f", vector).tobytes()},
+                "payload": {"S": payload},
+                "expires_at": {"N": str(int(time.time() + self.ttl))},
+            },
+        )
+        return entry_id
+
+    def clear(self):
+        """Start a new generation, so every container stops finding the answers stored so far."""
+        response = self.client.update_item(
+            TableName=self.table_name,
+            Key={"key": {"S": self.GENERATION}, "id": {"S": self.GENERATION}},
+            UpdateExpression="ADD #generation :one",
+            ExpressionAttributeNames={"#generation": self.GENERATION},
+            ExpressionAttributeValues={":one": {"N": "1"}},
+            ReturnValues="UPDATED_NEW",
+        )
+        self._remember_generation(int(response["Attributes"][self.GENERATION]["N"]))
+
+
+class AnswerCache:
+    """Return prior answers for near-duplicate questions asked with the same parameters."""
+
+    def __init__(self, memory_store=None, persistent_store=None, threshold=0.95):
+        """Initialize the cache.
+
+        Args:
+            memory_store (AnswerStore): The local in-memory tier.
+            persistent_store (AnswerStore): An optional persistent tier shared across restarts, or across
+                containers; the memory tier is dropped whenever the persistent tier was cleared elsewhere.
+            threshold (float): Minimum cosine similarity for two questions to be considered the same.
+        """
+        self.memory_store = memory_store or MemoryAnswerStore()
+        self.persistent_store = persistent_store
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._generation = None
+
+    def _check_generation(self):
+        """Drop the memory tier once the persistent tier was cleared, e.g. by a container that ingested content."""
+        if self.persistent_store is None:
+            return
+        generation = self.persistent_store.generation()
+        if generation != self._generation:
+            if self._generation is not None:
+                self.memory_store.clear()
+                logger.info("Answer cache cleared elsewhere, dropping the memory tier")
+            self._generation = generation
+
+    def _best_match(self, store, key, vector):
+        """Return the best `(entry_id, vector, payload, score)` match above the threshold in a store."""
+        # Answers stored before the embedding model changed cannot be compared
+        candidates = [candidate for candidate in store.candidates(key) if len(candidate[1]) == len(vector)]
+        if not candidates:
+            return None
+        scores = cosine_similarities(vector, [candidate_vector for _, candidate_vector, _ in candidates])
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        entry_id, candidate_vector, payload = candidates[best]
+        return entry_id, candidate_vector, payload, float(scores[best])
+
+    def lookup(self, question, vector, **parameters):
+        """Return a cached answer for a question, or None.
+
+        Args:
+            question (str): The question being asked.
+            vector (list[float]): The embedding of the question.
+            parameters: The options the answer depends on.
+
+        Returns:
+            str | tuple | None: The cached answer, optionally with citations.
+        """
+        self._check_generation()
+        key = parameters_key(**parameters)
+        match = self._best_match(self.memory_store, key, vector)
+        if match is not None:
+            self.memory_store.touch(match[0])
+        elif self.persistent_store is not None:
+            match = self._best_match(self.persistent_store, key, vector)
+            if match is not None:
+                self.persistent_store.touch(match[0])
+                self.memory_store.put(key, question, match[1], match[2], entry_id=match[0])
+
+        if match is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.info("Answer cache hit with similarity %.4f", match[3])
+        return decode_answer(match[2])
+
+    def store(self, question, vector, answer, **parameters):
+        """Cache an answer to a question.
+
+        Args:
+            question (str): The question that was asked.
+            vector (list[float]): The embedding of the question.
+            answer (str | tuple): The answer, optionally with citations.
+            parameters: The options the answer depends on.
+        """
+        key = parameters_key(**parameters)
+        payload = encode_answer(answer)
+        entry_id = self.memory_store.put(key, question, vector, payload)
+        if self.persistent_store is not None:
+            self.persistent_store.put(key, question, vector, payload, entry_id=entry_id)
+
+    def clear(self):
+        """Invalidate every cached answer, e.g. after new content was ingested."""
+        self.memory_store.clear()
+        if self.persistent_store is not None:
+            self.persistent_store.clear()
+        logger.info("Answer cache cleared")
+
+    def stats(self):
+        """Return cache metrics.
+
+        Returns:
+            dict: Hit and miss counters.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def answer_cache_from_env():
+    """Build the answer cache from environment variables.
+
+    Returns:
+        AnswerCache | None: The configured cache, or None when `ANSWER_CACHE_ENABLED` is not true.
+    """
+    if os.environ.get("ANSWER_CACHE_ENABLED", "false").lower() != "true":
+        return None
+
+    ttl = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    max_entries = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "512"))
+    db_path = os.environ.get("ANSWER_CACHE_DB_PATH")
+    table_name = os.environ.get("ANSWER_CACHE_TABLE")
+
+    persistent_store: AnswerStore | None = None
+    if table_name:
+        refresh_seconds = float(os.environ.get("ANSWER_CACHE_REFRESH_SECONDS", "30"))
+        persistent_store = DynamoDBAnswerStore(table_name, ttl=ttl, refresh_seconds=refresh_seconds)
+    elif db_path:
+        db_max_entries = int(os.environ.get("ANSWER_CACHE_DB_MAX_ENTRIES", "4096"))
+        persistent_store = SqliteAnswerStore(db_path, max_entries=db_max_entries, ttl=ttl)
+
+    return AnswerCache(
+        memory_store=MemoryAnswerStore(max_entries=max_entries, ttl=ttl),
+        persistent_store=persistent_store,
+        threshold=float(os.environ.get("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95")),
+    )
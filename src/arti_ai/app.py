@@ -1,23 +1,84 @@
 """The arti app."""
 
+import hashlib
 import logging
 import os
 
+from arti_ai.answer_cache import answer_cache_from_env
+from arti_ai.app_pool import AppPool, query_view
+from arti_ai.async_engine import generate, retrieve, run_stage, stage_timeouts_from_env
 from arti_ai.config import Config
+from arti_ai.embedding_cache import embedding_cache_from_env, install_embedding_cache
+from arti_ai.ingest import ingestion_pipeline_from_env
+from arti_ai.keyword_index import hybrid_options_from_env, install_keyword_index, keyword_index_from_env
+from arti_ai.rerank import install_reranker, rerank_options_from_env, scorer_from_env
+from arti_ai.startup import prewarm
+from arti_ai.streaming import AnswerStream
+from arti_ai.tracing import instrument_app, tracer
 
 config_args = {}
 if os.getenv("APP_CONFIG_FILE"):
     config_args["config_file"] = os.getenv("APP_CONFIG_FILE")
 config = Config(**config_args)
 
-os.environ["OPENAI_API_KEY"] = config.get_openai_credentials()
-os.environ["PINECONE_API_KEY"] = config.get_pinecone_credentials()
-
 logger = logging.getLogger(__name__)
 
+embedding_cache = embedding_cache_from_env()
+keyword_index = keyword_index_from_env()
+reranker = scorer_from_env()
+answer_cache = answer_cache_from_env()
+if answer_cache is not None:
+    config.add_reload_hook(lambda _embedchain_config: answer_cache.clear())
+
+
+def load_credentials():
+    """Export the OpenAI and Pinecone keys Embedchain reads from the environment, fetching secrets if needed."""
+    config.prefetch_secrets()
+    os.environ["OPENAI_API_KEY"] = config.get_openai_credentials()
+    os.environ["PINECONE_API_KEY"] = config.get_pinecone_credentials()
+
+
+def create_app(**kwargs):
+    """Build an Embedchain app, caching its embeddings when the embedding cache is enabled.
+
+    Credentials are resolved here rather than at import, so importing the module costs no Secrets Manager calls.
+    """
+    # pylint: disable=import-outside-toplevel
+    from embedchain import App  # type: ignore
+
+    from arti_ai.local_vectordb import app_from_config, is_local
+
+    # pylint: enable=import-outside-toplevel
+    load_credentials()
+    app = app_from_config(kwargs["config"]) if is_local(kwargs.get("config") or {}) else App.from_config(**kwargs)
+    if embedding_cache is not None:
+        install_embedding_cache(app, embedding_cache)
+    if keyword_index is not None:
+        install_keyword_index(app, keyword_index, **hybrid_options_from_env())
+    if reranker is not None:
+        install_reranker(app, reranker, **rerank_options_from_env())
+    return instrument_app(app)
+
 
+app_pool_max_age = os.environ.get("APP_POOL_MAX_AGE_SECONDS")
+app_pool = AppPool(factory=create_app, max_age=float(app_pool_max_age) if app_pool_max_age else None)
+
+
+def get_app():
+    """Return the pooled Embedchain app for the current configuration."""
+    with tracer.span("config"):
+        embedchain_config = config.load_embedchain_config()
+    with tracer.span("app") as app_span:
+        misses = app_pool.misses
+        app = app_pool.get(embedchain_config.data, key=embedchain_config.digest)
+        app_span.set_attribute("pool_hit", app_pool.misses == misses)
+    return app
+
+
+@tracer.traced("ask_ai")
 def ask_ai(
     question: str,
+    *,
     model="gpt-3.5-turbo",
     temperature=0.5,
     max_tokens=1000,
@@ -27,7 +88,8 @@ def ask_ai(
     dry_run=False,
     where=None,
     citations=False,
-):  # pylint: disable=R0913
+    stream=False,
+):  # pylint: disable=R0913,R0914
     """Query an AI model using Embedchain and return the response.
 
     Args:
@@ -41,16 +103,35 @@ def ask_ai(
     - dry_run (bool): Test the prompt structure without running inference.
     - where (dict): Dictionary for filtering data from the vector database.
     - citations (bool): Whether to return citations with the answer.
+    - stream (bool): Return an `AnswerStream` yielding tokens as they are generated.
 
     Returns:
-    - str | tuple: The AI's response, optionally including citations.
+    - str | tuple | AnswerStream: The AI's response, optionally including citations, or a stream of it.
     """
     # pylint: disable=import-outside-toplevel
-    from embedchain import App  # type: ignore
     from embedchain.config import BaseLlmConfig  # type: ignore
 
     # pylint: enable=import-outside-toplevel
-    app = App.from_config(config=config.get_embedchain_config())
+    app = get_app()
+
+    cache_parameters = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": top_p,
+        "prompt": prompt,
+        "system_prompt": system_prompt,
+        "where": where,
+        "citations": citations,
+    }
+    question_vector = None
+    if answer_cache is not None and not dry_run:
+        with tracer.span("answer_cache.lookup") as lookup_span:
+            question_vector = app.embedding_model.to_embeddings(question)
+            cached_response = answer_cache.lookup(question, question_vector, **cache_parameters)
+            lookup_span.add("answer_cache.hits" if cached_response is not None else "answer_cache.misses")
+        if cached_response is not None:
+            return AnswerStream(lambda _callbacks: cached_response) if stream else cached_response
 
     llm_config = BaseLlmConfig(
         model=model,
@@ -59,13 +140,111 @@ def ask_ai(
         temperature=temperature,
         max_tokens=max_tokens,
         top_p=top_p,
+        stream=stream,
     )
 
-    response = app.query(input_query=question, config=llm_config, dry_run=dry_run, where=where, citations=citations)
+    def store(response):
+        if question_vector is not None:
+            answer_cache.store(question, question_vector, response, **cache_parameters)
+
+    if stream:
+
+        def query(callbacks):
+            llm_config.callbacks = callbacks
+            return query_view(app).query(
+                input_query=question, config=llm_config, dry_run=dry_run, where=where, citations=citations
+            )
+
+        return AnswerStream(query, on_complete=store)
+
+    with tracer.span("query", model=model, citations=citations):
+        response = query_view(app).query(
+            input_query=question, config=llm_config, dry_run=dry_run, where=where, citations=citations
+        )
+    store(response)
 
     return response
 
 
+async def ask_ai_async(
+    question: str,
+    *,
+    model="gpt-3.5-turbo",
+    temperature=0.5,
+    max_tokens=1000,
+    top_p=1.0,
+    prompt=None,
+    system_prompt=None,
+    dry_run=False,
+    where=None,
+    citations=False,
+    retrievals=None,
+    timeouts=None,
+):  # pylint: disable=R0913,R0914
+    """Query an AI model like `ask_ai`, without blocking the event loop.
+
+    Many questions can be awaited concurrently: OpenAI calls share a pool of HTTP connections, and vector database
+    and embedding calls run on a bounded thread pool. Several retrievals are queried concurrently and their contexts
+    merged. Each stage is bounded by a timeout, and cancelling the task abandons the stage in progress.
+
+    Args:
+    - question (str): The user's query to send to the AI.
+    - model, temperature, max_tokens, top_p, prompt, system_prompt, dry_run, citations: As for `ask_ai`.
+    - where (dict): Dictionary for filtering data from the vector database, when `retrievals` is not given.
+    - retrievals (list[dict]): Keyword arguments of concurrent vector database queries, e.g. several `where`
+      filters or Pinecone `namespace`s.
+    - timeouts (StageTimeouts): Seconds the embed, retrieve and generate stages may take.
+
+    Returns:
+    - str | tuple: The AI's response, optionally including citations.
+
+    Raises:
+    - TimeoutError: If a stage takes longer than its timeout.
+    """
+    # pylint: disable=import-outside-toplevel
+    from embedchain.config import BaseLlmConfig  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    timeouts = timeouts or stage_timeouts_from_env()
+    retrievals = retrievals or [{"where": where}]
+    app = await run_stage("app", None, get_app)
+
+    cache_parameters = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": top_p,
+        "prompt": prompt,
+        "system_prompt": system_prompt,
+        "retrievals": retrievals,
+        "citations": citations,
+    }
+    question_vector = None
+    if answer_cache is not None and not dry_run:
+        question_vector = await run_stage("embed", timeouts.embed, app.embedding_model.to_embeddings, question)
+        cached_response = answer_cache.lookup(question, question_vector, **cache_parameters)
+        if cached_response is not None:
+            return cached_response
+
+    llm_config = BaseLlmConfig(
+        model=model,
+        prompt=prompt,
+        system_prompt=system_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        top_p=top_p,
+    )
+    contexts = await retrieve(app, question, retrievals, llm_config.number_documents, timeouts.retrieve)
+    answer = await generate(
+        app, question, [text for text, _ in contexts], llm_config, timeouts.generate, dry_run=dry_run
+    )
+
+    response = (answer, contexts) if citations else answer
+    if question_vector is not None:
+        answer_cache.store(question, question_vector, response, **cache_parameters)
+    return response
+
+
 def get_loader_and_asset_root():
     """Select and configures the appropriate loader based on AWS S3 bucket presence."""
     app_bucket_name = os.getenv("APP_BUCKET_NAME")
@@ -90,45 +269,157 @@ def get_loader_and_asset_root():
 
 def list_data_sources():
     """List data sources."""
-    # pylint: disable=import-outside-toplevel
-    from embedchain import App
-
-    # pylint: enable=import-outside-toplevel
-
-    app = App.from_config(config=config.get_embedchain_config())
+    app = get_app()
 
     response = app.get_data_sources()
 
     return response
 
 
+def after_ingestion(app, added, removed=False):
+    """Clear cached answers and persist the caches, keyword index and local vector database after a write.
+
+    Args:
+        app (App): The Embedchain app that was written to.
+        added (bool): Whether chunks were added, whose embeddings may be new.
+        removed (bool): Whether chunks were deleted.
+    """
+    if not added and not removed:
+        return
+    if answer_cache is not None:
+        answer_cache.clear()
+    if embedding_cache is not None and added:
+        with tracer.span("embedding_cache.snapshot"):
+            embedding_cache.snapshot()
+    if keyword_index is not None:
+        with tracer.span("keyword_index.snapshot"):
+            keyword_index.snapshot()
+    if hasattr(app.db, "snapshot"):
+        # The local vector database keeps writes in memory until it is saved
+        with tracer.span("vectordb.snapshot"):
+            app.db.snapshot()
+
+
+@tracer.traced("load_data")
 def load_data(asset_location=None):
     """Load data from data sources."""
     logger.info("Loading data")
 
-    # pylint: disable=import-outside-toplevel
-    from embedchain import App
+    app = get_app()
 
-    # pylint: enable=import-outside-toplevel
+    loader, primary_asset_location = get_loader_and_asset_root()
+    asset_location = asset_location if asset_location is not None else primary_asset_location
+    pipeline = ingestion_pipeline_from_env(app)
+    with tracer.span("ingest", pipeline=pipeline is not None) as ingest_span:
+        if pipeline is not None:
+            response = pipeline.run(asset_location, loader)
+            for name, value in response.items():
+                if isinstance(value, (int, float)):
+                    ingest_span.add(name, value)
+            ingest_span.set_attribute("stages", response.get("stages"))
+        else:
+            response = app.add(asset_location, loader=loader)
+
+    after_ingestion(app, added=True)
+
+    return response
 
-    app = App.from_config(config=config.get_embedchain_config())
+
+def ingest_objects(bucket_name, created_keys=(), removed_keys=()):
+    """Ingest created and delete removed S3 objects with one app and one S3 client.
+
+    Each object is its own Embedchain source, so a created object replaces any vectors it had before and a removed
+    object's vectors can be deleted.
+
+    Args:
+        bucket_name (str): The bucket the objects are in.
+        created_keys (Iterable[str]): Keys of objects to (re)ingest.
+        removed_keys (Iterable[str]): Keys of objects whose vectors are deleted.
+
+    Returns:
+        dict: Counts of added and deleted objects, and the keys that failed.
+    """
+    app = get_app()
+    loader, _ = get_loader_and_asset_root()
+    result = {"added": 0, "deleted": 0, "failed": []}
+
+    for key in removed_keys:
+        try:
+            app.delete(hashlib.md5(f"{bucket_name}/{key}".encode("utf-8")).hexdigest())  # nosec B324
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Failed to delete vectors for %s: %s", key, e)
+            result["failed"].append(key)
+            continue
+        result["deleted"] += 1
+
+    for key in created_keys:
+        source = f"{bucket_name}/{key}"
+        try:
+            app.delete(hashlib.md5(source.encode("utf-8")).hexdigest())  # nosec B324
+            pipeline = ingestion_pipeline_from_env(app)
+            if pipeline is not None:
+                pipeline.run(source, loader)
+            else:
+                app.add(source, loader=loader)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Failed to ingest %s: %s", key, e)
+            result["failed"].append(key)
+            continue
+        result["added"] += 1
+
+    after_ingestion(app, added=bool(result["added"]), removed=bool(result["deleted"]))
+
+    return result
+
+
+def sync_data(asset_location=None):
+    """Incrementally synchronise the S3 assets with the vector database.
+
+    Only objects whose ETag or size changed since the last run are downloaded and embedded, and vectors of
+    removed objects are deleted.
+
+    Args:
+        asset_location (str): The bucket and prefix to synchronise, defaults to the configured asset root.
+
+    Returns:
+        dict: Counts of added, updated, deleted, skipped and failed objects.
+
+    Raises:
+        ValueError: If no S3 bucket is configured; local assets are loaded with `load_data` instead.
+    """
+    logger.info("Synchronising data")
+
+    if not os.getenv("APP_BUCKET_NAME"):
+        raise ValueError("Incremental sync needs an S3 bucket: set APP_BUCKET_NAME, or load local assets with load")
 
     loader, primary_asset_location = get_loader_and_asset_root()
+
+    # pylint: disable=import-outside-toplevel
+    import boto3
+
+    from arti_ai.s3_sync import S3IncrementalSync
+
+    # pylint: enable=import-outside-toplevel
+
+    app = get_app()
     asset_location = asset_location if asset_location is not None else primary_asset_location
-    response = app.add(asset_location, loader=loader)
+    sync = S3IncrementalSync(app, loader, boto3.client("s3"), config_data=config.load_embedchain_config().data)
+    counts = sync.sync(asset_location)
 
-    return response
+    after_ingestion(app, added=bool(counts["added"] or counts["updated"]), removed=bool(counts["deleted"]))
+
+    return counts
 
 
 def reset_data():
     """Reset data in vector db."""
     logger.info("Reseting data")
 
-    # pylint: disable=import-outside-toplevel
-    from embedchain import App
+    app = get_app()
 
-    # pylint: enable=import-outside-toplevel
+    app.reset()
 
-    app = App.from_config(config=config.get_embedchain_config())
+    after_ingestion(app, added=False, removed=True)
 
-    app.reset()
+
+prewarm(get_app)
@@ -0,0 +1,193 @@
+"""Process-wide pool of Embedchain apps keyed by their effective configuration."""
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import types
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def config_hash(embedchain_config):
+    """Return a stable hash for an Embedchain configuration dictionary.
+
+    Args:
+        embedchain_config (dict): The Embedchain configuration.
+
+    Returns:
+        str: A hexadecimal sha256 digest of the canonical JSON form of the configuration.
+    """
+    canonical = json.dumps(embedchain_config or {}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def copy_llm(llm):
+    """Return a shallow copy of an LLM whose configuration and streaming callbacks can be set for a single query.
+
+    Methods patched onto the instance, such as the tracing wrapper of `get_answer_from_llm`, are bound to the copy.
+
+    Args:
+        llm (BaseLlm): The Embedchain LLM, shared by concurrent queries.
+
+    Returns:
+        BaseLlm: The copy.
+    """
+    llm_copy = copy.copy(llm)
+    for name, value in vars(llm).items():
+        if isinstance(value, types.MethodType) and value.__self__ is llm:
+            setattr(llm_copy, name, types.MethodType(value.__func__, llm_copy))
+    return llm_copy
+
+
+def query_view(app):
+    """Return a shallow copy of a pooled app with its own LLM, so it can be queried while other threads query it.
+
+    Embedchain's `query` swaps the LLM's configuration for the duration of the call, so concurrent queries of the
+    same app would leak each other's settings and streaming callbacks. The database and embedder stay shared.
+
+    Args:
+        app (App): An app returned by `AppPool.get`.
+
+    Returns:
+        App: The view.
+    """
+    view = copy.copy(app)
+    view.llm = copy_llm(app.llm)
+    return view
+
+
+def default_health_check(app):
+    """Return whether an Embedchain app still has its core components wired up."""
+    return all(getattr(app, attribute, None) is not None for attribute in ("db", "embedding_model"))
+
+
+class AppPool:  # pylint: disable=too-many-instance-attributes
+    """Build Embedchain apps once per container and reuse them across invocations.
+
+    Apps are keyed by the hash of the effective configuration, so editing the configuration
+    naturally produces a new app while the stale one is evicted.
+
+    Pooled apps are shared by every thread of the process, so each query goes through its own `query_view(app)`.
+    """
+
+    def __init__(self, factory=None, max_size=1, max_age=None, health_check=default_health_check):
+        """Initialize the pool.
+
+        Args:
+            factory (callable): Builds an app from a configuration dictionary, defaults to `App.from_config`.
+            max_size (int): Maximum number of apps kept alive at once.
+            max_age (float): Seconds after which an app is rebuilt, or None to keep it forever.
+            health_check (callable): Returns False when a pooled app must be rebuilt.
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.health_check = health_check
+        self._apps = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_construction_seconds = 0.0
+        self.total_construction_seconds = 0.0
+
+    def _build(self, embedchain_config):
+        """Construct a new app using the configured factory."""
+        factory = self.factory
+        if factory is None:
+            # pylint: disable=import-outside-toplevel
+            from embedchain import App  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+            factory = App.from_config
+
+        start = time.perf_counter()
+        app = factory(config=copy.deepcopy(embedchain_config))
+        elapsed = time.perf_counter() - start
+
+        self.last_construction_seconds = elapsed
+        self.total_construction_seconds += elapsed
+        logger.info("Constructed Embedchain app in %.3fs", elapsed)
+
+        return app
+
+    def _is_usable(self, created_at, app):
+        """Return whether a pooled app can be handed out again."""
+        if self.max_age is not None and time.monotonic() - created_at > self.max_age:
+            logger.info("Pooled Embedchain app expired after %ss", self.max_age)
+            return False
+        try:
+            healthy = self.health_check is None or self.health_check(app)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Pooled Embedchain app failed its health check: %s", e)
+            healthy = False
+        if not healthy:
+            logger.info("Pooled Embedchain app is unhealthy, rebuilding")
+        return healthy
+
+    def get(self, embedchain_config, key=None):
+        """Return the app for a configuration, building it on first use.
+
+        Args:
+            embedchain_config (dict): The effective Embedchain configuration.
+            key (str): A digest already identifying the configuration, such as `EmbedchainConfig.digest`, to avoid
+                hashing it on every call.
+
+        Returns:
+            App: An Embedchain app for the configuration.
+        """
+        key = key or config_hash(embedchain_config)
+        with self._lock:
+            entry = self._apps.get(key)
+            if entry is not None and self._is_usable(*entry):
+                self._apps.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._apps[key]
+                self.evictions += 1
+
+            self.misses += 1
+            app = self._build(embedchain_config)
+            self._apps[key] = (time.monotonic(), app)
+
+            while len(self._apps) > self.max_size:
+                self._apps.popitem(last=False)
+                self.evictions += 1
+
+            return app
+
+    def invalidate(self, embedchain_config=None, key=None):
+        """Drop a pooled app, or every pooled app when no configuration is given.
+
+        Args:
+            embedchain_config (dict): The configuration whose app should be dropped.
+            key (str): The digest the app was pooled under, instead of the configuration.
+        """
+        with self._lock:
+            if embedchain_config is None and key is None:
+                self.evictions += len(self._apps)
+                self._apps.clear()
+            elif self._apps.pop(key or config_hash(embedchain_config), None) is not None:
+                self.evictions += 1
+
+    def stats(self):
+        """Return pool metrics.
+
+        Returns:
+            dict: Hit/miss counters, pool size and construction timings.
+        """
+        with self._lock:
+            return {
+                "size": len(self._apps),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "last_construction_seconds": self.last_construction_seconds,
+                "total_construction_seconds": self.total_construction_seconds,
+            }
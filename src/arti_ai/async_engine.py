@@ -0,0 +1,210 @@
+"""Asyncio building blocks for answering many questions concurrently."""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from arti_ai.app_pool import copy_llm
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeouts(NamedTuple):
+    """Seconds each stage of answering a question may take."""
+
+    embed: float = 10.0
+    retrieve: float = 10.0
+    generate: float = 60.0
+
+
+def stage_timeouts_from_env():
+    """Build the stage timeouts from environment variables."""
+    return StageTimeouts(
+        embed=float(os.environ.get("ASYNC_EMBED_TIMEOUT_SECONDS", "10")),
+        retrieve=float(os.environ.get("ASYNC_RETRIEVE_TIMEOUT_SECONDS", "10")),
+        generate=float(os.environ.get("ASYNC_GENERATE_TIMEOUT_SECONDS", "60")),
+    )
+
+
+def max_connections_from_env():
+    """Return the number of pooled connections, and threads, shared by concurrent questions."""
+    return int(os.environ.get("ASYNC_MAX_CONNECTIONS", "20"))
+
+
+@functools.cache
+def get_executor():
+    """Return the thread pool running blocking vector database and embedding calls."""
+    return ThreadPoolExecutor(max_workers=max_connections_from_env(), thread_name_prefix="arti-async")
+
+
+_openai_clients = weakref.WeakKeyDictionary()
+
+# Set to a dict by callers that want the tokens used by generations in their task added to it.
+token_usage = contextvars.ContextVar("token_usage", default=None)
+
+
+def get_async_openai_client():
+    """Return the OpenAI client of the running event loop, sharing one pool of HTTP connections.
+
+    An httpx connection pool is bound to the loop that opened it, so each loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
+        # pylint: disable=import-outside-toplevel
+        import httpx
+        from openai import AsyncOpenAI  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        max_connections = max_connections_from_env()
+        client = AsyncOpenAI(
+            api_key=os.environ["OPENAI_API_KEY"],
+            base_url=os.environ.get("OPENAI_API_BASE"),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            ),
+        )
+        _openai_clients[loop] = client
+    return client
+
+
+async def run_stage(name, timeout, function, *args, **kwargs):
+    """Run a blocking call on the shared thread pool, giving up after `timeout` seconds.
+
+    A cancelled or timed out stage stops being awaited; the call itself runs to completion in its thread.
+
+    Raises:
+        TimeoutError: If the stage takes longer than `timeout`.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), functools.partial(function, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError as e:
+        raise TimeoutError(f"The {name} stage timed out after {timeout} seconds") from e
+
+
+async def cancel_tasks(tasks):
+    """Cancel tasks and wait until they have finished."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def gather_or_cancel(tasks):
+    """Return the results of tasks, cancelling the others once one fails or the caller is cancelled."""
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        await cancel_tasks(tasks)
+        raise
+
+
+def default_where(app, where):
+    """Return the vector database filter Embedchain would use, restricting to the app's id by default."""
+    if where is not None:
+        return where
+    return {"app_id": app.config.id} if app.config.id is not None else {}
+
+
+def merge_contexts(results):
+    """Merge the contexts of several retrievals, interleaving them by rank and dropping repeated texts.
+
+    Args:
+        results (list[list[tuple[str, dict]]]): Contexts and metadata of each retrieval, best first.
+
+    Returns:
+        list[tuple[str, dict]]: The unique contexts.
+    """
+    merged = {}
+    for rank in range(max((len(contexts) for contexts in results), default=0)):
+        for contexts in results:
+            if rank < len(contexts):
+                merged.setdefault(contexts[rank][0], contexts[rank])
+    return list(merged.values())
+
+
+async def retrieve(app, question, retrievals, n_results, timeout):
+    """Query the vector database once per retrieval, concurrently, and merge the contexts.
+
+    Args:
+        app (App): The Embedchain app.
+        question (str): The question.
+        retrievals (list[dict]): Keyword arguments of each query, e.g. `{"where": {...}}` or `{"namespace": "..."}`.
+        n_results (int): Contexts fetched per retrieval.
+        timeout (float): Seconds all retrievals may take.
+
+    Returns:
+        list[tuple[str, dict]]: The merged contexts with their metadata.
+    """
+
+    async def query(options):
+        options = dict(options)
+        where = default_where(app, options.pop("where", None))
+        return await run_stage(
+            "retrieve",
+            timeout,
+            app.db.query,
+            input_query=question,
+            n_results=n_results,
+            where=where,
+            citations=True,
+            **options,
+        )
+
+    # Stop the other retrievals once one fails or the question is cancelled
+    return merge_contexts(await gather_or_cancel([asyncio.ensure_future(query(options)) for options in retrievals]))
+
+
+async def generate(app, question, contexts, llm_config, timeout, *, dry_run=False):
+    """Generate the answer from the retrieved contexts.
+
+    OpenAI models are called through the pooled async client; other providers run on the shared thread pool.
+
+    Args:
+        app (App): The Embedchain app.
+        question (str): The question.
+        contexts (list[str]): The context texts.
+        llm_config (BaseLlmConfig): The per-question LLM configuration.
+        timeout (float): Seconds generation may take.
+        dry_run (bool): Return the prompt instead of calling the LLM.
+
+    Returns:
+        str: The answer, or the prompt on a dry run.
+    """
+    # The app's LLM is shared by concurrent questions, so the per-question config goes on a copy.
+    llm = copy_llm(app.llm)
+    llm.config = llm_config
+    prompt = llm.generate_prompt(question, contexts)
+    if dry_run:
+        return prompt
+
+    if type(llm).__name__ != "OpenAILlm":
+        return await run_stage("generate", timeout, llm.get_answer_from_llm, prompt)
+
+    messages = [{"role": "system", "content": llm_config.system_prompt}] if llm_config.system_prompt else []
+    messages.append({"role": "user", "content": prompt})
+    try:
+        completion = await asyncio.wait_for(
+            get_async_openai_client().chat.completions.create(
+                model=llm_config.model or "gpt-3.5-turbo",
+                messages=messages,
+                temperature=llm_config.temperature,
+                max_tokens=llm_config.max_tokens,
+                top_p=llm_config.top_p,
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError as e:
+        raise TimeoutError(f"The generate stage timed out after {timeout} seconds") from e
+
+    usage = token_usage.get()
+    if usage is not None and completion.usage is not None:
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            usage[name] = usage.get(name, 0) + getattr(completion.usage, name)
+    return completion.choices[0].message.content
@@ -0,0 +1,147 @@
+"""Answer batches of questions concurrently, for regression testing answer quality and throughput."""
+
+import asyncio
+import json
+import math
+import time
+
+from arti_ai.app import ask_ai_async
+from arti_ai.async_engine import cancel_tasks, gather_or_cancel, token_usage
+
+
+def read_questions(lines):
+    """Parse questions from JSON lines.
+
+    Each line is either a question string or an object with a `question` and optionally an `id` and `ask_ai`
+    options such as `where` or `citations`. Questions without an id are numbered by line.
+
+    Args:
+        lines (Iterable[str]): The JSON lines.
+
+    Yields:
+        dict: The question and its options.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"question": item}
+        item.setdefault("id", number)
+        yield item
+
+
+def completed_ids(lines):
+    """Return the ids of questions answered without error, read from the JSON lines of an earlier run."""
+    ids = set()
+    for line in lines:
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            # The last line of an interrupted run may be incomplete
+            continue
+        if "error" not in result:
+            ids.add(str(result["id"]))
+    return ids
+
+
+async def answer(item):
+    """Answer one question, recording its latency, token usage and any error.
+
+    Args:
+        item (dict): The question and its options, as read by `read_questions`.
+
+    Returns:
+        dict: The result.
+    """
+    options = {name: value for name, value in item.items() if name != "id"}
+    usage = {}
+    token_usage.set(usage)
+    result = {"id": item["id"], "question": item["question"]}
+    start = time.perf_counter()
+    try:
+        response = await ask_ai_async(**options)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        result["error"] = f"{type(e).__name__}: {e}"
+    else:
+        if isinstance(response, tuple):
+            result["answer"], result["citations"] = response[0], [list(citation) for citation in response[1]]
+        else:
+            result["answer"] = response
+    result["latency_seconds"] = round(time.perf_counter() - start, 6)
+    result["usage"] = usage
+    return result
+
+
+def ask_many(questions, concurrency=4, skip_ids=(), on_result=None):
+    """Answer questions with at most `concurrency` in flight, reusing the pooled app.
+
+    Questions are read lazily, so a large file or a pipe is never loaded at once.
+
+    Args:
+        questions (Iterable[dict]): Questions and their options, as read by `read_questions`.
+        concurrency (int): Maximum number of questions answered at the same time.
+        skip_ids (Iterable[str]): Ids of questions already answered, e.g. by an interrupted run.
+        on_result (callable): Called with each result as soon as it is ready.
+
+    Returns:
+        list[dict]: The results in the order they completed.
+    """
+    skip_ids = {str(item_id) for item_id in skip_ids}
+    pending = (item for item in questions if str(item["id"]) not in skip_ids)
+    results = []
+
+    async def answer_one(item, semaphore):
+        try:
+            result = await answer(item)
+        finally:
+            semaphore.release()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+        try:
+            for item in pending:
+                # Acquire before reading the next question so at most `concurrency` are read ahead
+                await semaphore.acquire()
+                tasks.append(asyncio.ensure_future(answer_one(item, semaphore)))
+        except BaseException:
+            await cancel_tasks(tasks)
+            raise
+        await gather_or_cancel(tasks)
+
+    asyncio.run(run())
+    return results
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def summarize(results, seconds):
+    """Summarize a batch run.
+
+    Args:
+        results (list[dict]): The results returned by `ask_many`.
+        seconds (float): Wall-clock duration of the run.
+
+    Returns:
+        dict: Counts, throughput, latency percentiles and total tokens.
+    """
+    latencies = [result["latency_seconds"] for result in results]
+    return {
+        "questions": len(results),
+        "failed": sum(1 for result in results if "error" in result),
+        "seconds": round(seconds, 6),
+        "questions_per_second": round(len(results) / seconds, 3) if seconds else None,
+        "latency_p50_seconds": percentile(latencies, 0.5),
+        "latency_p95_seconds": percentile(latencies, 0.95),
+        "total_tokens": sum(result["usage"].get("total_tokens", 0) for result in results),
+    }
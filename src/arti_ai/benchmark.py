@@ -0,0 +1,274 @@
+"""Offline retrieval benchmark: latency percentiles per stage, throughput, memory and recall@k.
+
+A synthetic corpus is ingested with `load_data` into a temporary local Chroma database, and a labelled question set
+is answered with `ask_ai`. Embeddings and answers come from deterministic fakes, so runs need no network access or
+API keys and are comparable over time.
+"""
+
+import functools
+import hashlib
+import math
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import yaml
+
+from arti_ai import app as arti_app
+from arti_ai.batch import percentile
+from arti_ai.keyword_index import KeywordIndex, install_keyword_index
+from arti_ai.local_vectordb import app_from_config, is_local
+from arti_ai.rerank import build_scorer, install_reranker
+
+STOP_WORDS = {"a", "is", "of", "the", "what"}
+
+WORDS = (
+    "amber basalt cedar delta ember falcon garnet harbor indigo juniper kestrel lagoon marble nectar onyx pebble "
+    "quartz raven saffron tundra umber velvet willow xenon yarrow zephyr"
+).split()
+
+
+class FakeEmbedder:  # pylint: disable=too-few-public-methods
+    """Deterministic embedder hashing the distinct words of a text, stop words aside, into fixed dimensions."""
+
+    def __init__(self, dimensions=256):
+        """Initialize the embedder.
+
+        Args:
+            dimensions (int): Length of the embedding vectors.
+        """
+        self.dimensions = dimensions
+
+    def __call__(self, texts):
+        """Embed texts as normalised bags of hashed words."""
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimensions
+            for word in set(re.findall(r"\w+", text.lower())) - STOP_WORDS:
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0  # nosec B324
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vectors.append([value / norm for value in vector])
+        return vectors
+
+
+def fake_answer(prompt):
+    """Answer with the first context sentence, as a stand-in for an LLM."""
+    match = re.search(r"Context information:\s*-*\s*(.+?\.)", prompt, re.DOTALL)
+    return match.group(1).strip() if match else prompt[-200:]
+
+
+def generate_corpus(directory, documents, seed=0):
+    """Write a synthetic corpus of documents, each holding one labelled fact among filler sentences.
+
+    Args:
+        directory (str): Directory the text files are written to.
+        documents (int): Number of documents.
+        seed (int): Seed of the filler text.
+
+    Returns:
+        list[dict]: A question per document, with the path of the document answering it.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for number in range(documents):
+        codename = f"{rng.choice(WORDS)}{number}"
+        filler = " ".join(" ".join(rng.choices(WORDS, k=12)).capitalize() + "." for _ in range(3))
+        path = os.path.join(directory, f"project-{number:05d}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(f"The code name of project {number} is {codename}. {filler}\n")
+        questions.append({"question": f"What is the code name of project {number}?", "source": path})
+    return questions
+
+
+class StageTimer:
+    """Collect the duration of every call to the instrumented functions, by stage."""
+
+    def __init__(self):
+        """Initialize the timer."""
+        self.samples = {}
+
+    def timed(self, stage, function):
+        """Return `function` recording its durations under `stage`."""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def record(self, stage, seconds):
+        """Record a duration."""
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        """Forget the recorded durations."""
+        self.samples = {}
+
+    def report(self):
+        """Return the p50, p95 and p99 latency, mean and count of each stage."""
+        return {
+            stage: {
+                "count": len(samples),
+                "mean_seconds": round(sum(samples) / len(samples), 6),
+                **{f"p{int(q * 100)}_seconds": round(percentile(samples, q), 6) for q in (0.5, 0.95, 0.99)},
+            }
+            for stage, samples in self.samples.items()
+        }
+
+
+def max_rss_mb():
+    """Return the process memory high-water mark in megabytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def offline_factory(timer, embedder, keyword_index=None, scorer=None):
+    """Return an app factory wiring the fake embedder and LLM, keyword index and reranker into instrumented apps."""
+
+    def factory(**kwargs):
+        # pylint: disable=import-outside-toplevel
+        from embedchain import App  # type: ignore
+        from embedchain.embedder.base import EmbeddingFunc  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        app = app_from_config(kwargs["config"]) if is_local(kwargs["config"]) else App.from_config(**kwargs)
+        app.embedding_model.set_embedding_fn(EmbeddingFunc(timer.timed("embed", embedder)))
+        app.embedding_model.set_vector_dimension(embedder.dimensions)
+        # Chroma captures the embedding function when the collection is opened, as does the local database
+        app.db.set_collection_name(app.db.config.collection_name)
+        if keyword_index is not None:
+            install_keyword_index(app, keyword_index)
+        if scorer is not None:
+            install_reranker(app, timer.timed("rerank", scorer))
+        app.db.query = timer.timed("retrieve", app.db.query)
+        app.llm.get_answer_from_llm = timer.timed("generate", fake_answer)
+        return app
+
+    return factory
+
+
+@contextmanager
+def offline_app(
+    directory, *, timer, top_k, embedder, hybrid=False, vectordb="chroma", rerank=None
+):  # pylint: disable=R0913,R0914
+    """Point arti at a temporary vector database and the fake embedder and LLM, restoring it afterwards."""
+    config_path = os.path.join(directory, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as file:
+        yaml.safe_dump(
+            {
+                "app": {"config": {"id": "benchmark", "collect_metrics": False, "log_level": "WARNING"}},
+                "llm": {"provider": "openai", "config": {"number_documents": top_k}},
+                "embedder": {"provider": "openai"},
+                "chunker": {"chunk_size": 2000, "chunk_overlap": 0, "length_function": "len"},
+                "vectordb": {
+                    "provider": vectordb,
+                    "config": {"collection_name": "benchmark", "dir": os.path.join(directory, "db")},
+                },
+            },
+            file,
+        )
+
+    environment = {"OPENAI_API_KEY": "offline", "EC_TELEMETRY": "false", "APP_BUCKET_NAME": ""}
+    saved_environment = {name: os.environ.get(name) for name in environment}
+    saved = (arti_app.config.config_file, arti_app.app_pool.factory)
+    os.environ.update(environment)
+    arti_app.config.config_file = config_path
+    arti_app.config.reload()
+    arti_app.app_pool.invalidate()
+    keyword_index = KeywordIndex(os.path.join(directory, "keyword_index.json.gz")) if hybrid else None
+    scorer = build_scorer(rerank) if rerank else None
+    arti_app.app_pool.factory = offline_factory(timer, embedder, keyword_index, scorer)
+    try:
+        yield
+    finally:
+        arti_app.app_pool.invalidate()
+        arti_app.config.config_file, arti_app.app_pool.factory = saved
+        for name, value in saved_environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_benchmark(
+    documents=200, *, questions=50, top_k=3, dimensions=256, seed=0, hybrid=False, vectordb="chroma", rerank=None
+):  # pylint: disable=R0913,R0914
+    """Ingest a synthetic corpus and answer labelled questions about it, measuring each stage.
+
+    Args:
+        documents (int): Number of documents in the corpus.
+        questions (int): Number of questions asked, sampled from the documents.
+        top_k (int): Contexts retrieved per question, the k of recall@k.
+        dimensions (int): Length of the fake embeddings.
+        seed (int): Seed of the corpus and of the question sample.
+        hybrid (bool): Retrieve with BM25 keyword search fused with vector search.
+        vectordb (str): Vector database provider, `chroma` or `local`.
+        rerank (str): Reranker of the retrieved chunks, e.g. `bm25`, or None to not rerank.
+
+    Returns:
+        dict: The benchmark parameters and results.
+    """
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as directory, offline_app(
+        directory,
+        timer=timer,
+        top_k=top_k,
+        embedder=FakeEmbedder(dimensions),
+        hybrid=hybrid,
+        vectordb=vectordb,
+        rerank=rerank,
+    ):
+        corpus_directory = os.path.join(directory, "corpus")
+        os.makedirs(corpus_directory)
+        labelled = generate_corpus(corpus_directory, documents, seed=seed)
+
+        start = time.perf_counter()
+        arti_app.load_data(asset_location=corpus_directory)
+        ingest_seconds = time.perf_counter() - start
+        ingest_stages = timer.report()
+        timer.reset()
+
+        sample = random.Random(seed).sample(labelled, min(questions, len(labelled)))
+        hits = 0
+        start = time.perf_counter()
+        for item in sample:
+            question_start = time.perf_counter()
+            _, contexts = arti_app.ask_ai(question=item["question"], citations=True)
+            timer.record("total", time.perf_counter() - question_start)
+            hits += any(metadata.get("url") == item["source"] for _, metadata in contexts[:top_k])
+        query_seconds = time.perf_counter() - start
+
+    return {
+        "parameters": {
+            "documents": documents,
+            "questions": len(sample),
+            "top_k": top_k,
+            "dimensions": dimensions,
+            "seed": seed,
+            "hybrid": hybrid,
+            "vectordb": vectordb,
+            "rerank": rerank,
+        },
+        "ingest": {
+            "seconds": round(ingest_seconds, 6),
+            "documents_per_second": round(documents / ingest_seconds, 3),
+            "stages": ingest_stages,
+        },
+        "query": {
+            "seconds": round(query_seconds, 6),
+            "questions_per_second": round(len(sample) / query_seconds, 3),
+            "stages": timer.report(),
+            f"recall_at_{top_k}": round(hits / len(sample), 4) if sample else None,
+        },
+        "memory": {"max_rss_mb": max_rss_mb()},
+    }
@@ -1,40 +1,175 @@
 """Configuration settings for Arti AI."""
 
-import json
+import hashlib
+import logging
 import os
+import threading
 from pathlib import Path
+from typing import NamedTuple, Optional
 
 import boto3  # type: ignore
 import yaml
 from botocore.exceptions import ClientError  # type: ignore
 from dotenv import load_dotenv
 
+from arti_ai.secrets_cache import secrets_cache_from_env
+
+logger = logging.getLogger(__name__)
+
+
+def setting(data: dict[str, object], *keys: str) -> Optional[str]:
+    """Return the string setting at a path of keys in a nested configuration, or None if it is not set."""
+    value: object = data
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, str) else None
+
+
+class EmbedchainConfig(NamedTuple):
+    """A parsed and validated Embedchain configuration, with what it was loaded from."""
+
+    data: dict[str, object]
+    digest: str
+    signature: Optional[tuple[int, int]]
+
+    @property
+    def app_id(self) -> Optional[str]:
+        """Return the Embedchain app id."""
+        return setting(self.data, "app", "config", "id")
+
+    @property
+    def vectordb_provider(self) -> str:
+        """Return the vector database provider."""
+        return setting(self.data, "vectordb", "provider") or "chroma"
+
+    @property
+    def embedder_provider(self) -> str:
+        """Return the embedding model provider."""
+        section = "embedding_model" if self.data.get("embedding_model") else "embedder"
+        return setting(self.data, section, "provider") or "openai"
+
+    @property
+    def llm_model(self) -> Optional[str]:
+        """Return the configured LLM model."""
+        return setting(self.data, "llm", "config", "model")
+
 
 class Config:
     """Configuration settings for Arti AI."""
 
-    def __init__(self, config_file="config/config.yaml", secrets_manager_client=None):
+    def __init__(self, config_file="config/config.yaml", secrets_manager_client=None, secrets_cache=None):
         """Initialize the configuration settings."""
-        self.secrets_manager_client = secrets_manager_client or boto3.client("secretsmanager")
+        self._secrets_manager_client = secrets_manager_client
+        self.secrets_cache = secrets_cache or secrets_cache_from_env(lambda: self.secrets_manager_client)
         self.project_root = Path(__file__).resolve().parents[2]
         self.config_file = self.project_root / config_file
+        self._embedchain_config = None
+        self._embedchain_config_lock = threading.Lock()
+        self._reload_hooks = []
         load_dotenv()
 
-    def get_embedchain_config(self):
-        """Load and return the EmbedChain app configuration from a YAML file.
+    @property
+    def secrets_manager_client(self):
+        """Return the Secrets Manager client, created on first use."""
+        if self._secrets_manager_client is None:
+            self._secrets_manager_client = boto3.client("secretsmanager")
+        return self._secrets_manager_client
 
-        Raises:
-            FileNotFoundError: If the YAML file cannot be found.
-            yaml.YAMLError: If there is an error parsing the YAML file.
-        """
+    def _config_file_signature(self):
+        """Return the modification time and size of the configuration file, or None if it cannot be read."""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_embedchain_config(self, signature, previous):
+        """Read, parse and validate the configuration file, reusing the previous parse if the content is unchanged."""
         try:
             with open(self.config_file, "r", encoding="utf-8") as file:
-                return yaml.safe_load(file)
+                content = file.read()
         except FileNotFoundError as e:
             raise FileNotFoundError(f"Configuration file not found: {self.config_file}") from e
+
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if previous is not None and previous.digest == digest:
+            return previous._replace(signature=signature)
+
+        try:
+            data = yaml.safe_load(content) or {}
         except yaml.YAMLError as e:
             raise yaml.YAMLError(f"Error parsing YAML configuration: {self.config_file}") from e
 
+        # pylint: disable=import-outside-toplevel
+        from embedchain.utils.misc import validate_config  # type: ignore
+        from schema import SchemaError  # type: ignore
+
+        from arti_ai.local_vectordb import is_local, validate_local_config
+
+        # pylint: enable=import-outside-toplevel
+        try:
+            if is_local(data):
+                validate_local_config(data)
+            else:
+                validate_config(data)
+        except SchemaError as e:
+            raise ValueError(f"Invalid Embedchain configuration: {self.config_file}: {e}") from e
+
+        return EmbedchainConfig(data=data, digest=digest, signature=signature)
+
+    def load_embedchain_config(self, force=False):
+        """Return the parsed and validated Embedchain configuration.
+
+        The file is parsed once and cached; later calls only compare its modification time and size, and parse it
+        again when either changed. Reload hooks run whenever the content actually changed.
+
+        Args:
+            force (bool): Read the file again even if it looks unchanged.
+
+        Raises:
+            FileNotFoundError: If the YAML file cannot be found.
+            yaml.YAMLError: If there is an error parsing the YAML file.
+            ValueError: If the configuration does not match the Embedchain schema.
+        """
+        signature = self._config_file_signature()
+        cached = self._embedchain_config
+        if not force and cached is not None and signature is not None and cached.signature == signature:
+            return cached
+
+        with self._embedchain_config_lock:
+            previous = self._embedchain_config
+            loaded = self._read_embedchain_config(signature, previous)
+            self._embedchain_config = loaded if signature is not None else None
+
+        if previous is not None and loaded.digest != previous.digest:
+            logger.info("Reloaded configuration %s", self.config_file)
+            for hook in self._reload_hooks:
+                hook(loaded)
+
+        return loaded
+
+    def reload(self):
+        """Read the configuration file again, running reload hooks if it changed."""
+        return self.load_embedchain_config(force=True)
+
+    def add_reload_hook(self, hook):
+        """Register a callable receiving the new `EmbedchainConfig` whenever the configuration changes."""
+        self._reload_hooks.append(hook)
+
+    def get_embedchain_config(self):
+        """Load and return the EmbedChain app configuration from a YAML file.
+
+        The returned dictionary is cached and shared, so it must not be modified.
+
+        Raises:
+            FileNotFoundError: If the YAML file cannot be found.
+            yaml.YAMLError: If there is an error parsing the YAML file.
+            ValueError: If the configuration does not match the Embedchain schema.
+        """
+        return self.load_embedchain_config().data
+
     def get_openai_credentials(self):
         """Retrieve OpenAI API key."""
         openai_api_key = os.environ.get("OPENAI_API_KEY")
@@ -78,15 +213,31 @@ class Config:
         except KeyError as e:
             raise EnvironmentError(f"Failed to find {name} in environment variables.") from e
 
+    def prefetch_secrets(self):
+        """Fetch the OpenAI, Pinecone and Slack secrets in one batched request.
+
+        Secrets whose value is provided directly through the environment are skipped.
+        """
+        secret_names = [
+            os.environ[secret_name_variable]
+            for value_variable, secret_name_variable in (
+                ("OPENAI_API_KEY", "OPENAI_API_KEY_SECRET_NAME"),
+                ("PINECONE_API_KEY", "PINECONE_API_KEY_SECRET_NAME"),
+                ("SLACK_BOT_TOKEN", "SLACK_BOT_TOKEN_SECRET_NAME"),
+            )
+            if not os.environ.get(value_variable) and os.environ.get(secret_name_variable)
+        ]
+        if secret_names:
+            self.secrets_cache.prefetch(secret_names)
+
     def get_secret(self, secret_name):
-        """Retrieve secret from AWS Secrets Manager.
+        """Retrieve secret from AWS Secrets Manager, through the secrets cache.
 
         Args:
             secret_name (str): The name of the secret to retrieve.
         """
         try:
-            response = self.secrets_manager_client.get_secret_value(SecretId=secret_name)
-            return json.loads(response["SecretString"])
+            return self.secrets_cache.get(secret_name)
         except ClientError as e:
             print(f"Error retrieving secret {secret_name}: {e}")
             return None
@@ -0,0 +1,261 @@
+"""Persistent embedding cache shared by question and chunk embeddings."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+
+from arti_ai.tracing import get_current_span
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_VARIABLES = 500
+# Share of `max_entries` evicted beyond the bound, so eviction runs once per that many inserts rather than every put
+EVICTION_FRACTION = 0.05
+# Number of cache hits whose access times are buffered before they are written without waiting for a put
+TOUCH_FLUSH_SIZE = 1000
+
+
+def embedding_key(provider, model, text):
+    """Return the cache key of a text embedded by a given provider and model.
+
+    Args:
+        provider (str): The embedder provider, e.g. `OpenAIEmbedder`.
+        model (str): The embedding model.
+        text (str): The embedded text.
+
+    Returns:
+        str: A hexadecimal sha256 digest.
+    """
+    return hashlib.sha256(f"{provider}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:  # pylint: disable=too-many-instance-attributes
+    """Embeddings stored as float32 blobs in SQLite, with least recently used eviction.
+
+    The database file can be restored from and snapshotted to S3, so a fresh container starts warm.
+    """
+
+    def __init__(self, path, max_entries=100000, snapshot_url=None):
+        """Initialize the cache.
+
+        Args:
+            path (str): Path of the SQLite database file, e.g. under /tmp.
+            max_entries (int): Maximum number of embeddings kept before the least recently used are evicted.
+            snapshot_url (str): Optional S3 bucket and key of a snapshot of the database file.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.snapshot_url = snapshot_url
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if snapshot_url and not os.path.exists(path):
+            self.restore()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+        self._connection.commit()
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._touched = {}
+
+    def get_many(self, keys):
+        """Return the cached embeddings of the given keys.
+
+        Args:
+            keys (Iterable[str]): Keys built by `embedding_key`.
+
+        Returns:
+            dict: The embeddings found, keyed by cache key.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                batch = keys[start:][:SQLITE_MAX_VARIABLES]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch  # nosec B608
+                ).fetchall()
+                found.update((key, array("f", vector).tolist()) for key, vector in rows)
+            if found:
+                self._touched.update(dict.fromkeys(found, time.time()))
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touched()
+                self._connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, embeddings):
+        """Store embeddings keyed by cache key, evicting the least recently used in a batch above `max_entries`."""
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            # A key always maps to the same embedding, so a key stored meanwhile is kept and not counted twice
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in embeddings.items()],
+            )
+            self._entries += cursor.rowcount
+            if self._entries > self.max_entries:
+                self._evict(self._entries - self.max_entries + int(self.max_entries * EVICTION_FRACTION))
+            self._connection.commit()
+
+    def _flush_touched(self):
+        """Write the buffered access times of cache hits; the caller holds the lock and commits."""
+        if self._touched:
+            self._connection.executemany(
+                "UPDATE embeddings SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self, count):
+        """Delete the `count` least recently used embeddings; the caller holds the lock and commits."""
+        cursor = self._connection.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)", (count,)
+        )
+        self._entries -= cursor.rowcount
+
+    def clear(self):
+        """Remove every embedding."""
+        with self._lock:
+            self._connection.execute("DELETE FROM embeddings")
+            self._connection.commit()
+            self._entries = 0
+            self._touched.clear()
+
+    def stats(self):
+        """Return cache metrics.
+
+        Returns:
+            dict: Hit and miss counters and the number of stored embeddings.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": self._entries}
+
+    def _s3_location(self):
+        """Return the S3 client, bucket and key of the snapshot."""
+        # pylint: disable=import-outside-toplevel
+        import boto3
+
+        # pylint: enable=import-outside-toplevel
+        bucket_name, key = self.snapshot_url.split("/", 1)
+        return boto3.client("s3"), bucket_name, key
+
+    def restore(self):
+        """Download the S3 snapshot to the database path, starting empty when there is none."""
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import ClientError  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        s3_client, bucket_name, key = self._s3_location()
+        try:
+            s3_client.download_file(bucket_name, key, self.path)
+        except ClientError as e:
+            logger.info("No embedding cache snapshot restored from %s: %s", self.snapshot_url, e)
+            return False
+        logger.info("Restored embedding cache snapshot from %s", self.snapshot_url)
+        return True
+
+    def snapshot(self):
+        """Upload a consistent copy of the database to S3, if a snapshot location is configured."""
+        if not self.snapshot_url:
+            return False
+        s3_client, bucket_name, key = self._s3_location()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            copy_path = os.path.join(tmp_dir, os.path.basename(self.path))
+            with self._lock, sqlite3.connect(copy_path) as copy:
+                self._flush_touched()
+                self._connection.commit()
+                self._connection.backup(copy)
+            copy.close()
+            s3_client.upload_file(copy_path, bucket_name, key)
+        logger.info("Saved embedding cache snapshot to %s", self.snapshot_url)
+        return True
+
+
+class CachedEmbeddingFunction:  # pylint: disable=too-few-public-methods
+    """Embedding function that only sends texts missing from the cache to the wrapped embedder."""
+
+    def __init__(self, embedding_fn, cache, provider, model):
+        """Initialize the function.
+
+        Args:
+            embedding_fn (callable): The embedder's function, mapping a list of texts to a list of vectors.
+            cache (EmbeddingCache): The cache to read and fill.
+            provider (str): The embedder provider, part of the cache key.
+            model (str): The embedding model, part of the cache key.
+        """
+        self.embedding_fn = embedding_fn
+        self.cache = cache
+        self.provider = provider
+        self.model = model
+
+    def __call__(self, texts):
+        """Embed texts, reusing cached embeddings and embedding repeated texts once."""
+        keys = [embedding_key(self.provider, self.model, text) for text in texts]
+        embeddings = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in embeddings}
+        span = get_current_span()
+        span.add("embedding_cache.hits", len(keys) - len(missing))
+        span.add("embedding_cache.misses", len(missing))
+        if missing:
+            computed = dict(zip(missing, self.embedding_fn(list(missing.values()))))
+            self.cache.put_many(computed)
+            embeddings.update(computed)
+        return [embeddings[key] for key in keys]
+
+
+def install_embedding_cache(app, cache):
+    """Wrap an Embedchain app's embedder with the cache, for both queries and ingestion.
+
+    Chroma captures the embedding function when its collection is opened, so the collection is reopened.
+
+    Args:
+        app (App): The Embedchain app.
+        cache (EmbeddingCache): The cache to use.
+
+    Returns:
+        App: The same app.
+    """
+    # pylint: disable=import-outside-toplevel
+    from embedchain.embedder.base import EmbeddingFunc  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    embedder = app.embedding_model
+    cached_fn = CachedEmbeddingFunction(
+        embedder.embedding_fn,
+        cache,
+        provider=type(embedder).__name__,
+        model=getattr(getattr(embedder, "config", None), "model", None),
+    )
+    embedder.set_embedding_fn(EmbeddingFunc(cached_fn))
+    if hasattr(app.db, "collection"):
+        app.db.set_collection_name(app.db.config.collection_name)
+    return app
+
+
+def embedding_cache_from_env():
+    """Build the embedding cache from environment variables.
+
+    Returns:
+        EmbeddingCache | None: The configured cache, or None when `EMBEDDING_CACHE_ENABLED` is not true.
+    """
+    if os.environ.get("EMBEDDING_CACHE_ENABLED", "false").lower() != "true":
+        return None
+
+    default_path = os.path.join(os.environ.get("EMBEDCHAIN_CONFIG_DIR", tempfile.gettempdir()), "embeddings.db")
+
+    return EmbeddingCache(
+        os.environ.get("EMBEDDING_CACHE_DB_PATH", default_path),
+        max_entries=int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000")),
+        snapshot_url=os.environ.get("EMBEDDING_CACHE_SNAPSHOT_URL"),
+    )
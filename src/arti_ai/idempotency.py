@@ -0,0 +1,343 @@
+"""Run Slack listeners once per request, however often Slack or Lambda deliver it.
+
+Lazy listeners run in their own Lambda invocation, so a Slack retry or a retried asynchronous invocation would
+answer the same question twice. Each run is claimed under the request's event id or trigger id: duplicates arriving
+while it is in flight or after it completed get the recorded result instead of running again. Records are kept in
+memory and, to be shared between Lambda containers, in a persistent store, SQLite or DynamoDB.
+"""
+
+import abc
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from arti_ai.tracing import get_current_span
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = "in_flight"
+COMPLETED = "completed"
+
+
+class IdempotencyStore(abc.ABC):
+    """Records of claimed requests; subclasses implement `claim`, `complete` and `release`."""
+
+    def __init__(self, ttl_seconds=3600, lease_seconds=900):
+        """Initialize the store.
+
+        Args:
+            ttl_seconds (float): Seconds a completed request is remembered.
+            lease_seconds (float): Seconds an in-flight claim holds, so a run killed by a timeout can be retried.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+
+    @abc.abstractmethod
+    def claim(self, key):
+        """Claim a request unless it is in flight or completed.
+
+        Returns:
+            tuple[bool, dict | None]: Whether the request was claimed, and otherwise its record, with `status`,
+                `result` and `expires_at`.
+        """
+
+    @abc.abstractmethod
+    def complete(self, key, result):
+        """Record the result of a claimed request."""
+
+    @abc.abstractmethod
+    def release(self, key):
+        """Drop the claim of a request that failed, so a retry runs it again."""
+
+    def run_once(self, key, function):
+        """Return `function()`, or the recorded result when the request `key` already ran or is running.
+
+        Raises:
+            Exception: Any exception of `function`, after releasing the claim.
+        """
+        claimed, record = self.claim(key)
+        if not claimed:
+            logger.info("Skipped %s, already %s", key, record["status"])
+            get_current_span().add("idempotency_hits")
+            return record.get("result")
+        try:
+            result = function()
+        except BaseException:
+            self.release(key)
+            raise
+        self.complete(key, result)
+        return result
+
+
+class MemoryStore(IdempotencyStore):
+    """Records kept in the process, e.g. one Lambda container."""
+
+    def __init__(self, ttl_seconds=3600, lease_seconds=900, max_entries=1024):
+        """Initialize the store.
+
+        Args:
+            ttl_seconds (float): Seconds a completed request is remembered.
+            lease_seconds (float): Seconds an in-flight claim holds.
+            max_entries (int): Number of records above which expired ones are dropped.
+        """
+        super().__init__(ttl_seconds=ttl_seconds, lease_seconds=lease_seconds)
+        self.max_entries = max_entries
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, record):
+        """Store a record, e.g. one read from a persistent store."""
+        with self._lock:
+            self._records[key] = dict(record)
+
+    def claim(self, key):
+        """Claim a request unless it is in flight or completed."""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record["expires_at"] > now:
+                return False, record
+            if len(self._records) >= self.max_entries:
+                self._records = {name: kept for name, kept in self._records.items() if kept["expires_at"] > now}
+            self._records[key] = {"status": IN_FLIGHT, "result": None, "expires_at": now + self.lease_seconds}
+            return True, None
+
+    def complete(self, key, result):
+        """Record the result of a claimed request."""
+        self.put(key, {"status": COMPLETED, "result": result, "expires_at": time.time() + self.ttl_seconds})
+
+    def release(self, key):
+        """Drop the claim of a request."""
+        with self._lock:
+            self._records.pop(key, None)
+
+
+class SQLiteStore(IdempotencyStore):
+    """Records kept in a SQLite file, shared by the processes mounting it."""
+
+    def __init__(self, path, ttl_seconds=3600, lease_seconds=900):
+        """Initialize the store, creating its table.
+
+        Args:
+            path (str): Path of the SQLite database.
+            ttl_seconds (float): Seconds a completed request is remembered.
+            lease_seconds (float): Seconds an in-flight claim holds.
+        """
+        super().__init__(ttl_seconds=ttl_seconds, lease_seconds=lease_seconds)
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency "
+                "(key TEXT PRIMARY KEY, status TEXT, result TEXT, expires_at REAL)"
+            )
+
+    def _connect(self):
+        """Open a connection in autocommit mode, transactions being explicit."""
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def claim(self, key):
+        """Claim a request unless it is in flight or completed."""
+        now = time.time()
+        with closing(self._connect()) as connection:
+            # Take the write lock before reading, so concurrent claims of the same request are serialized
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT status, result, expires_at FROM idempotency WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[2] > now:
+                    connection.execute("COMMIT")
+                    return False, {"status": row[0], "result": json.loads(row[1]), "expires_at": row[2]}
+                connection.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+                connection.execute(
+                    "INSERT INTO idempotency VALUES (?, ?, ?, ?)", (key, IN_FLIGHT, "null", now + self.lease_seconds)
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return True, None
+
+    def complete(self, key, result):
+        """Record the result of a claimed request."""
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO idempotency VALUES (?, ?, ?, ?)",
+                (key, COMPLETED, json.dumps(result, default=str), time.time() + self.ttl_seconds),
+            )
+
+    def release(self, key):
+        """Drop the claim of a request."""
+        with closing(self._connect()) as connection:
+            connection.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+
+class DynamoDBStore(IdempotencyStore):
+    """Records kept in a DynamoDB table with an `id` string key, shared by all Lambda containers.
+
+    Enable DynamoDB's time to live on the `expires_at` attribute to have expired records deleted.
+    """
+
+    def __init__(self, table_name, ttl_seconds=3600, lease_seconds=900, client=None):
+        """Initialize the store.
+
+        Args:
+            table_name (str): Name of the DynamoDB table.
+            ttl_seconds (float): Seconds a completed request is remembered.
+            lease_seconds (float): Seconds an in-flight claim holds.
+            client: The DynamoDB client, created on first use by default.
+        """
+        super().__init__(ttl_seconds=ttl_seconds, lease_seconds=lease_seconds)
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        """Return the DynamoDB client, created on first use."""
+        if self._client is None:
+            # pylint: disable=import-outside-toplevel
+            import boto3  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    def _item(self, key, status, result, expires_at):
+        """Return a record as a DynamoDB item."""
+        return {
+            "id": {"S": key},
+            "status": {"S": status},
+            "result": {"S": json.dumps(result, default=str)},
+            "expires_at": {"N": str(int(expires_at))},
+        }
+
+    def claim(self, key):
+        """Claim a request unless it is in flight or completed."""
+        now = time.time()
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=self._item(key, IN_FLIGHT, None, now + self.lease_seconds),
+                ConditionExpression="attribute_not_exists(id) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(int(now))}},
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            item = self.client.get_item(TableName=self.table_name, Key={"id": {"S": key}}, ConsistentRead=True).get(
+                "Item"
+            )
+            if item is None:
+                # Released between the failed claim and the read
+                return self.claim(key)
+            return False, {
+                "status": item["status"]["S"],
+                "result": json.loads(item["result"]["S"]),
+                "expires_at": float(item["expires_at"]["N"]),
+            }
+        return True, None
+
+    def complete(self, key, result):
+        """Record the result of a claimed request."""
+        self.client.put_item(
+            TableName=self.table_name, Item=self._item(key, COMPLETED, result, time.time() + self.ttl_seconds)
+        )
+
+    def release(self, key):
+        """Drop the claim of a request."""
+        self.client.delete_item(TableName=self.table_name, Key={"id": {"S": key}})
+
+
+class TieredStore(IdempotencyStore):
+    """A memory store in front of a persistent store, answering duplicates seen by this process without I/O."""
+
+    def __init__(self, memory, persistent):
+        """Initialize the store.
+
+        Args:
+            memory (MemoryStore): The in-process tier.
+            persistent (IdempotencyStore): The tier shared between processes.
+        """
+        super().__init__(ttl_seconds=persistent.ttl_seconds, lease_seconds=persistent.lease_seconds)
+        self.memory = memory
+        self.persistent = persistent
+
+    def claim(self, key):
+        """Claim a request unless either tier has it in flight or completed."""
+        claimed, record = self.memory.claim(key)
+        if not claimed:
+            return False, record
+        try:
+            claimed, record = self.persistent.claim(key)
+        except BaseException:
+            self.memory.release(key)
+            raise
+        if not claimed:
+            self.memory.put(key, record)
+        return claimed, record
+
+    def complete(self, key, result):
+        """Record the result of a claimed request in both tiers."""
+        self.memory.complete(key, result)
+        self.persistent.complete(key, result)
+
+    def release(self, key):
+        """Drop the claim of a request from both tiers."""
+        self.memory.release(key)
+        self.persistent.release(key)
+
+
+def request_key(body):
+    """Return the id Slack delivers a request under, its event id or trigger id, or None."""
+    return (body or {}).get("event_id") or (body or {}).get("trigger_id")
+
+
+def idempotent(store):
+    """Decorate a Slack listener declaring a `body` argument so it runs once per request.
+
+    Args:
+        store (IdempotencyStore): The store of claimed requests, or None to run every delivery.
+    """
+
+    def decorator(function):
+        if store is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = request_key(kwargs.get("body"))
+            if key is None:
+                return function(*args, **kwargs)
+            return store.run_once(f"{function.__name__}:{key}", lambda: function(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def idempotency_store_from_env():
+    """Build the idempotency store from environment variables.
+
+    Returns:
+        IdempotencyStore | None: A memory store, backed by the persistent store `IDEMPOTENCY_STORE` names, or None
+            when it is `none`.
+    """
+    kind = os.environ.get("IDEMPOTENCY_STORE", "memory").lower()
+    if kind == "none":
+        return None
+    options = {
+        "ttl_seconds": float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "3600")),
+        "lease_seconds": float(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "900")),
+    }
+    memory = MemoryStore(**options)
+    if kind == "memory":
+        return memory
+    if kind == "sqlite":
+        path = os.environ.get("IDEMPOTENCY_SQLITE_PATH", "/tmp/arti-idempotency.sqlite3")  # nosec B108
+        return TieredStore(memory, SQLiteStore(path, **options))
+    if kind == "dynamodb":
+        return TieredStore(memory, DynamoDBStore(os.environ["IDEMPOTENCY_TABLE"], **options))
+    raise ValueError(f"Unknown idempotency store: {kind}")
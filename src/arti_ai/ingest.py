@@ -0,0 +1,385 @@
+"""Staged ingestion pipeline: load, chunk, dedupe, embed and upsert with bounded concurrency."""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage:  # pylint: disable=too-many-instance-attributes
+    """A pipeline stage run by a pool of worker threads between two bounded queues."""
+
+    def __init__(self, name, function, concurrency=1, flush=None):
+        """Initialize the stage.
+
+        Args:
+            name (str): Name used in timings and logs.
+            function (callable): Maps one input item to an iterable of output items.
+            concurrency (int): Number of worker threads.
+            flush (callable): Returns trailing output items once the input is exhausted; stateful stages
+                must run with a concurrency of 1.
+        """
+        self.name = name
+        self.function = function
+        self.concurrency = concurrency
+        self.flush = flush
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._running = concurrency
+
+    def _emit(self, outbox, results, start):
+        """Forward results downstream and account for the work."""
+        count = 0
+        for result in results:
+            outbox.put(result)
+            count += 1
+        with self._lock:
+            self.items_out += count
+            self.busy_seconds += time.perf_counter() - start
+
+    def work(self, inbox, outbox, errors):
+        """Consume the inbox until the end marker, propagating it once every worker has finished."""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                inbox.put(_DONE)
+                break
+            if errors:
+                continue  # drain so upstream stages never block on a full queue
+            with self._lock:
+                self.items_in += 1
+            try:
+                self._emit(outbox, self.function(item), time.perf_counter())
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("Ingestion stage %s failed: %s", self.name, e)
+                errors.append(e)
+
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            if self.flush is not None and not errors:
+                try:
+                    self._emit(outbox, self.flush(), time.perf_counter())
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.error("Ingestion stage %s failed: %s", self.name, e)
+                    errors.append(e)
+            outbox.put(_DONE)
+
+    def timings(self):
+        """Return the stage metrics."""
+        return {
+            "concurrency": self.concurrency,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 6),
+        }
+
+
+def normalize_text(text):
+    """Collapse whitespace so chunks that only differ in layout are treated as the same content."""
+    return " ".join(text.split())
+
+
+def content_hash(text):
+    """Return the hexadecimal sha256 digest of a chunk's normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def find_embeddings(db, content_hashes):
+    """Return embeddings already stored in an Embedchain vector database, keyed by content hash.
+
+    Only Chroma can be searched by metadata without a query vector; other databases return no embeddings.
+    """
+    if not content_hashes or not hasattr(db, "collection"):
+        return {}
+    result = db.collection.get(
+        where={"content_hash": {"$in": sorted(content_hashes)}}, include=["embeddings", "metadatas"]
+    )
+    return {
+        metadata["content_hash"]: embedding
+        for metadata, embedding in zip(result.get("metadatas") or [], result.get("embeddings") or [])
+    }
+
+
+def upsert_embeddings(db, ids, documents, metadatas, embeddings):
+    """Write precomputed embeddings to an Embedchain vector database.
+
+    Chroma and Pinecone are written to directly so the database does not embed the documents again, and the chunks
+    are added to the database's keyword index, if any; other databases fall back to `db.add`, which embeds them
+    itself.
+    """
+    if hasattr(db, "collection"):
+        db.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    elif hasattr(db, "pinecone_index"):
+        db.pinecone_index.upsert(
+            [
+                {"id": chunk_id, "values": embedding, "metadata": {**metadata, "text": document}}
+                for chunk_id, document, metadata, embedding in zip(ids, documents, metadatas, embeddings)
+            ]
+        )
+    else:
+        db.add(documents=documents, metadatas=metadatas, ids=ids)
+        return
+
+    keyword_index = getattr(db, "keyword_index", None)
+    if keyword_index is not None:
+        keyword_index.add(ids, documents, metadatas)
+
+
+class IngestionPipeline:  # pylint: disable=too-many-instance-attributes
+    """Ingest a source into an Embedchain app through explicit, individually sized stages.
+
+    Each stage runs in its own worker pool and hands work downstream through a bounded queue, so a slow stage
+    (usually embedding, bound by rate limits) applies backpressure instead of letting memory grow.
+    """
+
+    def __init__(
+        self,
+        app,
+        embed_batch_size=100,
+        upsert_batch_size=100,
+        concurrency=None,
+        queue_size=8,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            app (App): The Embedchain app providing the chunker settings, embedder and vector database.
+            embed_batch_size (int): Chunks per embedding request.
+            upsert_batch_size (int): Chunks per vector database write.
+            concurrency (dict): Worker threads per stage name (`chunk`, `embed`, `upsert`).
+            queue_size (int): Capacity of the queue in front of each stage.
+        """
+        self.app = app
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.concurrency = {"chunk": 2, "embed": 4, "upsert": 2, **(concurrency or {})}
+        self.queue_size = queue_size
+        self.app_id = getattr(getattr(app, "config", None), "id", None)
+        self._seen_ids = set()
+        self._pending = []
+        self.counts = {"documents": 0, "chunks": 0, "duplicates": 0, "reused": 0, "embedded": 0, "upserted": 0}
+        self._counts_lock = threading.Lock()
+        self._source = None
+        self._source_hash = None
+        self._chunker = None
+
+    def _count(self, name, value):
+        """Increment a pipeline counter."""
+        with self._counts_lock:
+            self.counts[name] += value
+
+    def _text_chunker(self):
+        """Return the Embedchain text chunker configured like the app."""
+        # pylint: disable=import-outside-toplevel
+        from embedchain.chunkers.text import TextChunker  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        return TextChunker(config=getattr(self.app, "chunker", None))
+
+    def chunk(self, document):
+        """Split a document into chunk records with Embedchain-compatible ids and metadata."""
+        self._count("documents", 1)
+        url = document["meta_data"].get("url", self._source)
+        doc_id = hashlib.sha256((document["content"] + url).encode()).hexdigest()
+        chunker = self._chunker
+        if chunker is None:
+            raise RuntimeError("Documents are only chunked while a source is being ingested.")
+        records = []
+        for text in chunker.get_chunks(document["content"]):
+            if not text:
+                continue
+            chunk_id = hashlib.sha256((text + url).encode()).hexdigest()
+            metadata = {
+                **document["meta_data"],
+                "data_type": "text",
+                "doc_id": f"{self.app_id}--{doc_id}" if self.app_id else doc_id,
+                "hash": self._source_hash,
+                "content_hash": content_hash(text),
+            }
+            if self.app_id:
+                chunk_id = f"{self.app_id}--{chunk_id}"
+                metadata["app_id"] = self.app_id
+            records.append({"id": chunk_id, "document": text, "metadata": metadata})
+        self._count("chunks", len(records))
+        return [records]
+
+    def _new_in_database(self, batch):
+        """Drop chunks that already exist in the vector database."""
+        existing_ids = set(self.app.db.get(ids=[record["id"] for record in batch]).get("ids", []))
+        self._count("duplicates", len(existing_ids))
+        return [record for record in batch if record["id"] not in existing_ids]
+
+    def dedupe(self, records):
+        """Drop repeated chunks and group the rest into embedding batches."""
+        for record in records:
+            if record["id"] in self._seen_ids:
+                self._count("duplicates", 1)
+                continue
+            self._seen_ids.add(record["id"])
+            self._pending.append(record)
+
+        batches = []
+        size = self.embed_batch_size
+        while len(self._pending) >= size:
+            batch, self._pending = self._pending[:size], self._pending[size:]
+            batch = self._new_in_database(batch)
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def flush_dedupe(self):
+        """Emit the final, partial embedding batch."""
+        batch, self._pending = self._pending, []
+        batch = self._new_in_database(batch) if batch else []
+        return [batch] if batch else []
+
+    def embed(self, batch):
+        """Embed a batch of chunks with a single embedder call.
+
+        Chunks are addressed by the hash of their normalized text: content already stored in the vector database,
+        e.g. under another URL, reuses its embedding, and repeated content within the batch is embedded once.
+        """
+        embeddings = find_embeddings(self.app.db, {record["metadata"]["content_hash"] for record in batch})
+        texts: dict[str, str] = {}
+        for record in batch:
+            if record["metadata"]["content_hash"] not in embeddings:
+                texts.setdefault(record["metadata"]["content_hash"], record["document"])
+        if texts:
+            embeddings.update(zip(texts, self.app.embedding_model.embedding_fn(list(texts.values()))))
+        self._count("embedded", len(texts))
+        self._count("reused", len(batch) - len(texts))
+        return [[{**record, "embedding": embeddings[record["metadata"]["content_hash"]]} for record in batch]]
+
+    def upsert(self, batch):
+        """Write embedded chunks to the vector database in batches of `upsert_batch_size`."""
+        size = self.upsert_batch_size
+        for start in range(0, len(batch), size):
+            records = batch[start:][:size]
+            upsert_embeddings(
+                self.app.db,
+                ids=[record["id"] for record in records],
+                documents=[record["document"] for record in records],
+                metadatas=[record["metadata"] for record in records],
+                embeddings=[record["embedding"] for record in records],
+            )
+            self._count("upserted", len(records))
+        return []
+
+    def _documents(self, source, loader):
+        """Yield documents from a loader, streaming them when the loader supports it."""
+        if hasattr(loader, "iter_documents"):
+            yield from loader.iter_documents(source)
+        else:
+            yield from loader.load_data(source)["data"]
+
+    def _record_data_source(self, source):
+        """Record the source in Embedchain's metadata database so it is listed like `app.add` sources."""
+        # pylint: disable=import-outside-toplevel
+        from embedchain.core.db.models import DataSource  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        try:
+            self.app.db_session.add(
+                DataSource(hash=self._source_hash, app_id=self.app_id, type="text", value=str(source), metadata="null")
+            )
+            self.app.db_session.commit()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Error adding data source: %s", e)
+            self.app.db_session.rollback()
+
+    def run(self, source, loader):
+        """Ingest a source.
+
+        Args:
+            source (str): The location handed to the loader.
+            loader (BaseLoader): The loader producing documents for the source.
+
+        Returns:
+            dict: The source hash, counters and per-stage timings.
+        """
+        self._source = source
+        self._source_hash = hashlib.md5(str(source).encode("utf-8")).hexdigest()  # nosec B324
+        self._chunker = self._text_chunker()
+
+        stages = [
+            Stage("chunk", self.chunk, self.concurrency["chunk"]),
+            Stage("dedupe", self.dedupe, 1, flush=self.flush_dedupe),
+            Stage("embed", self.embed, self.concurrency["embed"]),
+            Stage("upsert", self.upsert, self.concurrency["upsert"]),
+        ]
+        queues: list[queue.Queue[object]] = [queue.Queue(maxsize=self.queue_size) for _ in range(len(stages) + 1)]
+        errors: list[Exception] = []
+        threads = [
+            threading.Thread(target=stage.work, args=(queues[index], queues[index + 1], errors), daemon=True)
+            for index, stage in enumerate(stages)
+            for _ in range(stage.concurrency)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        load_start = time.perf_counter()
+        try:
+            for document in self._documents(source, loader):
+                if errors:
+                    break
+                queues[0].put(document)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Ingestion stage load failed: %s", e)
+            errors.append(e)
+        load_seconds = time.perf_counter() - load_start
+        queues[0].put(_DONE)
+
+        while queues[-1].get() is not _DONE:
+            pass
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        self._record_data_source(source)
+
+        result = {
+            "source_hash": self._source_hash,
+            **self.counts,
+            "seconds": round(time.perf_counter() - start, 6),
+            "stages": {"load": {"busy_seconds": round(load_seconds, 6)}, **{s.name: s.timings() for s in stages}},
+        }
+        logger.info("Ingested %s: %s", source, json.dumps(result))
+
+        return result
+
+
+def ingestion_pipeline_from_env(app):
+    """Build the ingestion pipeline from environment variables.
+
+    Returns:
+        IngestionPipeline | None: The configured pipeline, or None when `INGEST_PIPELINE_ENABLED` is not true.
+    """
+    if os.environ.get("INGEST_PIPELINE_ENABLED", "false").lower() != "true":
+        return None
+
+    return IngestionPipeline(
+        app,
+        embed_batch_size=int(os.environ.get("INGEST_EMBED_BATCH_SIZE", "100")),
+        upsert_batch_size=int(os.environ.get("INGEST_UPSERT_BATCH_SIZE", "100")),
+        concurrency={
+            "chunk": int(os.environ.get("INGEST_CHUNK_CONCURRENCY", "2")),
+            "embed": int(os.environ.get("INGEST_EMBED_CONCURRENCY", "4")),
+            "upsert": int(os.environ.get("INGEST_UPSERT_CONCURRENCY", "2")),
+        },
+        queue_size=int(os.environ.get("INGEST_QUEUE_SIZE", "8")),
+    )
@@ -0,0 +1,352 @@
+"""BM25 keyword index over the ingested chunks, fused with vector search by reciprocal rank fusion."""
+
+import gzip
+import json
+import math
+import os
+import re
+import tempfile
+
+from arti_ai.snapshot import SnapshottedIndex
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-/:]\w+)*")
+TOKEN_SEPARATORS = re.compile(r"[_.\-/:]+")
+CHROMA_PAGE_SIZE = 1000
+
+
+def tokenize(text):
+    """Split text into lowercase terms, keeping identifiers such as `ERR_TIMEOUT` or `config.yaml` whole.
+
+    The parts of a compound identifier are emitted too, so `config.yaml` also matches a question about `config`.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in TOKEN_SEPARATORS.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def matches(metadata, where):
+    """Return whether chunk metadata satisfies an Embedchain equality filter; operators are not evaluated."""
+    return all(metadata.get(key) == value for key, value in (where or {}).items() if not key.startswith("$"))
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse rankings by summing `1 / (k + rank)` over the rankings each key appears in.
+
+    Args:
+        rankings (Iterable[list]): Keys ordered best first.
+        k (int): Damping constant; larger values weigh lower ranks more evenly.
+
+    Returns:
+        list: The keys, best first.
+    """
+    scores: dict[object, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+class KeywordIndex(SnapshottedIndex):
+    """In-memory BM25 inverted index, saved as gzipped JSON and optionally snapshotted to S3.
+
+    A container that only queries reloads the snapshot when its ETag changes, so it picks up chunks ingested
+    elsewhere; see `SnapshottedIndex`.
+    """
+
+    snapshot_name = "keyword index"
+
+    def __init__(self, path, snapshot_url=None, refresh_seconds=300, k1=1.5, b=0.75):
+        """Initialize the index, loading it from `path`, or else from the S3 snapshot.
+
+        Args:
+            path (str): Path of the index file, e.g. under /tmp, or None to keep the index in memory only.
+            snapshot_url (str): Optional S3 bucket and key of a snapshot of the index file.
+            refresh_seconds (float): Minimum seconds between checks for a newer snapshot, or None to never check.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalisation.
+        """
+        super().__init__(snapshot_url=snapshot_url, refresh_seconds=refresh_seconds)
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._documents = {}
+        self._postings = {}
+        self._total_length = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as file:
+                self._load(file.read())
+        elif snapshot_url:
+            self.restore()
+
+    def __len__(self):
+        """Return the number of indexed chunks."""
+        return len(self._documents)
+
+    def add(self, ids, documents, metadatas):
+        """Index chunks, replacing chunks with the same ids.
+
+        Args:
+            ids (list[str]): Chunk ids.
+            documents (list[str]): Chunk texts.
+            metadatas (list[dict]): Chunk metadata, used by `where` filters.
+        """
+        self._record("add", list(ids), list(documents), [dict(metadata or {}) for metadata in metadatas])
+
+    def _add(self, ids, documents, metadatas):
+        """Index chunks without recording the change."""
+        with self._lock:
+            self._remove(set(ids) & self._documents.keys())
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                frequencies: dict[str, int] = {}
+                for term in tokenize(document):
+                    frequencies[term] = frequencies.get(term, 0) + 1
+                length = sum(frequencies.values())
+                self._documents[chunk_id] = (document, dict(metadata or {}), length)
+                self._total_length += length
+                for term, frequency in frequencies.items():
+                    self._postings.setdefault(term, {})[chunk_id] = frequency
+
+    def _remove(self, ids):
+        """Remove chunks by id."""
+        for chunk_id in ids:
+            document, _, length = self._documents.pop(chunk_id)
+            self._total_length -= length
+            for term in set(tokenize(document)):
+                postings = self._postings.get(term, {})
+                postings.pop(chunk_id, None)
+                if not postings:
+                    self._postings.pop(term, None)
+
+    def remove_where(self, where):
+        """Remove the chunks whose metadata matches a filter, e.g. `{"hash": source_hash}`."""
+        self._record("remove_where", dict(where or {}))
+
+    def _remove_where(self, where):
+        """Remove the chunks matching a filter without recording the change."""
+        with self._lock:
+            self._remove(
+                [chunk_id for chunk_id, (_, metadata, _) in self._documents.items() if matches(metadata, where)]
+            )
+
+    def clear(self):
+        """Remove every chunk."""
+        self._record("clear")
+
+    def _clear(self):
+        """Remove every chunk without recording the change."""
+        with self._lock:
+            self._documents, self._postings, self._total_length = {}, {}, 0
+
+    def search(self, query, n_results, where=None):
+        """Return the chunks best matching a query by BM25 score.
+
+        Args:
+            query (str): The query.
+            n_results (int): Maximum number of chunks returned.
+            where (dict): Equality filter on chunk metadata.
+
+        Returns:
+            list[tuple[str, dict, float]]: Text, metadata and score of each chunk, best first.
+        """
+        with self._lock:
+            if not self._documents:
+                return []
+            average_length = self._total_length / len(self._documents) or 1.0
+            scores: dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term, {})
+                idf = math.log(1 + (len(self._documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    _, metadata, length = self._documents[chunk_id]
+                    if not matches(metadata, where):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            best = sorted(scores, key=scores.__getitem__, reverse=True)[:n_results]
+            return [(self._documents[chunk_id][0], self._documents[chunk_id][1], scores[chunk_id]) for chunk_id in best]
+
+    def _dump(self):
+        """Serialize the index, numbering chunks so postings stay compact."""
+        with self._lock:
+            ids = list(self._documents)
+            numbers = {chunk_id: number for number, chunk_id in enumerate(ids)}
+            index = {
+                "version": 1,
+                "ids": ids,
+                "documents": [self._documents[chunk_id][:2] for chunk_id in ids],
+                "postings": {
+                    term: [[numbers[chunk_id], frequency] for chunk_id, frequency in postings.items()]
+                    for term, postings in self._postings.items()
+                },
+            }
+        return gzip.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+
+    def _load(self, payload):
+        """Replace the index with a serialized one."""
+        index = json.loads(gzip.decompress(payload))
+        ids = index["ids"]
+        postings = {
+            term: {ids[number]: frequency for number, frequency in entries}
+            for term, entries in index["postings"].items()
+        }
+        lengths = dict.fromkeys(ids, 0)
+        for entries in postings.values():
+            for chunk_id, frequency in entries.items():
+                lengths[chunk_id] += frequency
+        with self._lock:
+            self._documents = {
+                chunk_id: (document, metadata, lengths[chunk_id])
+                for chunk_id, (document, metadata) in zip(ids, index["documents"])
+            }
+            self._postings = postings
+            self._total_length = sum(lengths.values())
+
+    def save(self):
+        """Atomically write the index file, returning its content."""
+        payload = self._dump()
+        descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(payload)
+        os.replace(tmp_path, self.path)
+        return payload
+
+    def _load_snapshot(self, payload):
+        """Replace the index with a downloaded snapshot."""
+        self._load(payload)
+
+    def _save_snapshot(self):
+        """Write the index file and return it as the snapshot."""
+        return self.save()
+
+    def restore(self):
+        """Load the S3 snapshot unless it is the one already loaded, saving it to the index file.
+
+        Returns:
+            bool: Whether a snapshot was loaded.
+        """
+        if not super().restore():
+            return False
+        self.save()
+        return True
+
+
+class HybridRetriever:  # pylint: disable=too-few-public-methods
+    """Vector database query fusing vector and BM25 keyword rankings with reciprocal rank fusion.
+
+    Each ranking fetches `candidates` times the requested number of chunks, so a chunk ranked well by only one of
+    them can still make the cut.
+    """
+
+    def __init__(self, vector_query, index, candidates=4, rrf_k=60):
+        """Initialize the retriever.
+
+        Args:
+            vector_query (callable): The vector database's `query` method.
+            index (KeywordIndex): The keyword index.
+            candidates (int): Multiple of the requested number of chunks fetched from each ranking.
+            rrf_k (int): Reciprocal rank fusion constant.
+        """
+        self.vector_query = vector_query
+        self.index = index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def __call__(self, input_query, n_results, where=None, citations=False, **kwargs):
+        """Query like Embedchain's vector databases, returning texts, or texts and metadata with `citations`."""
+        self.index.refresh()
+        pool = n_results * self.candidates
+        vector_results = self.vector_query(
+            input_query=input_query, n_results=pool, where=where, citations=True, **kwargs
+        )
+        keyword_results = self.index.search(input_query, pool, where=where)
+
+        contexts = dict(vector_results)
+        for text, metadata, score in keyword_results:
+            contexts.setdefault(text, {**metadata, "score": score})
+        fused = reciprocal_rank_fusion(
+            [[text for text, _ in vector_results], [text for text, _, _ in keyword_results]], k=self.rrf_k
+        )[:n_results]
+        return [(text, contexts[text]) if citations else text for text in fused]
+
+
+def backfill(index, db):
+    """Index every chunk already stored in a Chroma collection; other databases cannot be listed."""
+    if not hasattr(db, "collection"):
+        return 0
+    offset = 0
+    while True:
+        page = db.collection.get(include=["documents", "metadatas"], limit=CHROMA_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return offset
+        index.add(page["ids"], page["documents"], page["metadatas"])
+        offset += len(page["ids"])
+
+
+def install_keyword_index(app, index, candidates=4, rrf_k=60):
+    """Keep a keyword index in step with an Embedchain app's vector database and retrieve through both.
+
+    Args:
+        app (App): The Embedchain app.
+        index (KeywordIndex): The keyword index; an empty one is filled from an existing Chroma collection.
+        candidates (int): Multiple of the requested number of chunks fetched from each ranking.
+        rrf_k (int): Reciprocal rank fusion constant.
+
+    Returns:
+        App: The same app.
+    """
+    db = app.db
+    if not len(index):  # pylint: disable=use-implicit-booleaness-not-len
+        backfill(index, db)
+
+    add, delete, reset = db.add, db.delete, db.reset
+
+    def add_and_index(documents, metadatas, ids, **kwargs):
+        result = add(documents=documents, metadatas=metadatas, ids=ids, **kwargs)
+        index.add(ids, documents, metadatas)
+        return result
+
+    def delete_and_unindex(where):
+        result = delete(where=where)
+        index.remove_where(where)
+        return result
+
+    def reset_and_clear():
+        result = reset()
+        index.clear()
+        return result
+
+    db.add, db.delete, db.reset = add_and_index, delete_and_unindex, reset_and_clear
+    db.query = HybridRetriever(db.query, index, candidates=candidates, rrf_k=rrf_k)
+    db.keyword_index = index
+    return app
+
+
+def keyword_index_from_env():
+    """Build the keyword index from environment variables.
+
+    Returns:
+        KeywordIndex | None: The configured index, or None when `HYBRID_RETRIEVAL_ENABLED` is not true.
+    """
+    if os.environ.get("HYBRID_RETRIEVAL_ENABLED", "false").lower() != "true":
+        return None
+
+    default_path = os.path.join(os.environ.get("EMBEDCHAIN_CONFIG_DIR", tempfile.gettempdir()), "keyword_index.json.gz")
+    refresh_seconds = os.environ.get("KEYWORD_INDEX_REFRESH_SECONDS", "300")
+
+    return KeywordIndex(
+        os.environ.get("KEYWORD_INDEX_PATH", default_path),
+        snapshot_url=os.environ.get("KEYWORD_INDEX_SNAPSHOT_URL"),
+        refresh_seconds=float(refresh_seconds) if refresh_seconds else None,
+    )
+
+
+def hybrid_options_from_env():
+    """Return the candidate multiple and reciprocal rank fusion constant of the hybrid retriever."""
+    return {
+        "candidates": int(os.environ.get("HYBRID_CANDIDATES", "4")),
+        "rrf_k": int(os.environ.get("HYBRID_RRF_K", "60")),
+    }
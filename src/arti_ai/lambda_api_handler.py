@@ -1,18 +1,33 @@
 """AWS Lambda handler function for responding to arti requests."""
 
 import base64
+import functools
 import json
 import logging
 
-from slack_bolt.adapter.aws_lambda import SlackRequestHandler
+from arti_ai.slack_prefilter import prefilter_from_env, skipped_response
+from arti_ai.startup import profiler
 
-from .slack_app import app
+with profiler.phase("import slack_bolt.adapter.aws_lambda"):
+    from slack_bolt.adapter.aws_lambda import SlackRequestHandler
+
+with profiler.phase("import arti_ai.slack_app"):
+    from .slack_app import app, slack_identity
 
 SlackRequestHandler.clear_all_log_handlers()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+prefilter = prefilter_from_env()
+
+
+@functools.cache
+def get_slack_handler():
+    """Return the Slack request handler, created once per container."""
+    return SlackRequestHandler(app=app)
 
+
+@profiler.report_on_first_call
 def handler(event, context):
     """Handle the incoming event and return the response."""
     logger.info("Starting lambda application")
@@ -29,8 +44,16 @@ def handler(event, context):
             "body": challenge,
         }
 
-    slack_handler = SlackRequestHandler(app=app)
-    response = slack_handler.handle(event, context)
+    event_id = None
+    if prefilter is not None:
+        reason, event_id = prefilter.check(event, bot_user_id=slack_identity.peek().get("user_id"))
+        if reason:
+            logger.info("Skipped Slack request %s: %s", event_id, reason)
+            return skipped_response()
+
+    response = get_slack_handler().handle(event, context)
     logger.info(response)
+    if prefilter is not None:
+        prefilter.handled(event_id, response)
 
     return response
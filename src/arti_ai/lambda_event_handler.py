@@ -2,13 +2,18 @@
 
 import json
 import logging
+import os
 
-from arti_ai.app import load_data
+from arti_ai.startup import profiler
+
+with profiler.phase("import arti_ai.app"):
+    from arti_ai.app import load_data, sync_data
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+@profiler.report_on_first_call
 def handler(event, _context):
     """Handle incoming events.
 
@@ -22,6 +27,10 @@ def handler(event, _context):
     logger.info("Starting lambda application")
     logger.debug(event)
 
-    load_data()
+    if os.getenv("ASSETS_SYNC_MODE", "full") == "incremental":
+        counts = sync_data()
+        logger.info("Incremental sync counts: %s", counts)
+    else:
+        load_data()
 
     return {"statusCode": 200, "body": json.dumps("Event processed successfully!")}
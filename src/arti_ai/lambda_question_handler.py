@@ -0,0 +1,124 @@
+"""This module contains the Lambda function handler answering questions queued by the Slack app."""
+
+import functools
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from arti_ai.idempotency import idempotency_store_from_env
+from arti_ai.startup import profiler
+from arti_ai.streaming import answer_text
+from arti_ai.tracing import tracer
+
+with profiler.phase("import arti_ai.app"):
+    from arti_ai.app import ask_ai, config
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# SQS delivers each message at least once
+idempotency_store = idempotency_store_from_env()
+
+
+@functools.cache
+def get_slack_client():
+    """Return the Slack Web API client posting answers, created on first use."""
+    # pylint: disable=import-outside-toplevel
+    from slack_sdk import WebClient
+
+    # pylint: enable=import-outside-toplevel
+    slack_bot_token, _ = config.get_slack_credentials()
+    return WebClient(token=slack_bot_token)
+
+
+@functools.cache
+def get_http_session():
+    """Return the HTTP session posting answers to response URLs."""
+    return requests.Session()
+
+
+def post_answer(job, answer):
+    """Post an answer where the job asks for it, its response URL or its channel."""
+    text = f"{job.get('prefix', '')}{answer_text(answer)}"
+    if job.get("response_url"):
+        response = get_http_session().post(job["response_url"], json={"text": text}, timeout=30)
+        response.raise_for_status()
+    elif job.get("channel"):
+        get_slack_client().chat_postMessage(channel=job["channel"], thread_ts=job.get("thread_ts"), text=text)
+    else:
+        logger.warning("Answered a question with nowhere to post the answer")
+
+
+@tracer.traced("question.answer")
+def answer_job(job):
+    """Answer a queued question and post the answer."""
+    ask_ai_kwargs = {"question": job["question"], **job.get("params", {})}
+    post_answer(job, ask_ai(**ask_ai_kwargs))
+
+
+def answer_jobs(jobs, max_workers=None):
+    """Answer queued questions concurrently, each at most once.
+
+    Args:
+        jobs (list[dict]): The question jobs.
+        max_workers (int): Questions answered at once, `QUESTION_WORKER_CONCURRENCY` by default.
+
+    Returns:
+        list[int]: Indexes of the jobs that failed.
+    """
+
+    def answer(job):
+        if idempotency_store is not None and job.get("id"):
+            idempotency_store.run_once(f"answer_job:{job['id']}", lambda: answer_job(job))
+        else:
+            answer_job(job)
+
+    max_workers = max_workers or int(os.environ.get("QUESTION_WORKER_CONCURRENCY", "4"))
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs) or 1))) as executor:
+        futures = [executor.submit(answer, job) for job in jobs]
+        for number, future in enumerate(futures):
+            try:
+                future.result()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to answer queued question %s", jobs[number].get("id"))
+                failed.append(number)
+    return failed
+
+
+@profiler.report_on_first_call
+def handler(event, context):  # pylint: disable=unused-argument
+    """Answer the questions of a batch of SQS messages.
+
+    Only messages of questions that failed are reported back to SQS for a retry; undecodable messages are dropped.
+
+    Args:
+        event (dict): The event data.
+        context (dict): The context data.
+
+    Returns:
+        dict: The response data, with the `batchItemFailures` of the batch.
+    """
+    logger.info("Starting lambda application")
+    logger.debug(event)
+
+    message_ids, jobs = [], []
+    for record in event.get("Records", []):
+        try:
+            jobs.append(json.loads(record.get("body", "")))
+        except json.JSONDecodeError:
+            logger.info("Failed to decode question job from SQS message body.")
+            continue
+        message_ids.append(record.get("messageId"))
+
+    failed = answer_jobs(jobs)
+    logger.info("Answered %d of %d queued questions.", len(jobs) - len(failed), len(jobs))
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps("Successfully processed question(s) from SQS messages."),
+        "batchItemFailures": [{"itemIdentifier": message_ids[number]} for number in failed],
+    }
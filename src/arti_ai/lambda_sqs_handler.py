@@ -3,41 +3,97 @@
 import json
 import logging
 import os
+from urllib.parse import unquote_plus
 
-from arti_ai.app import load_data
+from arti_ai.s3_sync import internal_prefixes
+from arti_ai.startup import profiler
+
+with profiler.phase("import arti_ai.app"):
+    from arti_ai.app import config, ingest_objects
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def coalesce_s3_events(records):
+    """Reduce the S3 events in a batch of SQS messages to the latest change per object key.
+
+    Args:
+        records (list[dict]): The SQS records of the batch.
+
+    Returns:
+        dict: Maps each object key to a dict with the latest `event` name and the `message_ids` mentioning it.
+    """
+    changes = {}
+    for record in records:
+        try:
+            s3_event = json.loads(record.get("body", "{}"))
+        except json.JSONDecodeError:
+            logger.info("Failed to decode S3 event from SQS message body.")
+            continue
+
+        for s3_record in s3_event.get("Records", []):
+            s3_object = s3_record.get("s3", {}).get("object", {})
+            object_key = s3_object.get("key")
+            if not object_key:
+                logger.info("Object key not found in S3 event.")
+                continue
+
+            object_key = unquote_plus(object_key)
+            change = changes.setdefault(object_key, {"event": None, "sequencer": "", "message_ids": []})
+            change["message_ids"].append(record.get("messageId"))
+            # Sequencers of the same key are hexadecimal strings that sort once padded to the same length
+            sequencer = s3_object.get("sequencer", "")
+            width = max(len(sequencer), len(change["sequencer"]))
+            if change["event"] is None or sequencer.rjust(width, "0") >= change["sequencer"].rjust(width, "0"):
+                change["event"] = s3_record.get("eventName", "")
+                change["sequencer"] = sequencer
+
+    return changes
+
+
+@profiler.report_on_first_call
 def handler(event, context):  # pylint: disable=unused-argument
     """Handle incoming S3 events from SQS messages.
 
+    Every object in the batch is ingested or deleted once, however many messages mention it. Only messages
+    mentioning an object that failed are reported back to SQS for a retry.
+
     Args:
         event (dict): The event data.
         context (dict): The context data.
 
     Returns:
-        dict: The response data.
+        dict: The response data, with the `batchItemFailures` of the batch.
     """
     logger.info("Starting lambda application")
     logger.debug(event)
 
     app_bucket_name = os.environ["APP_BUCKET_NAME"]
+    skipped_prefixes = internal_prefixes(app_bucket_name, config.load_embedchain_config().data)
 
-    for record in event.get("Records", []):
-        try:
-            s3_event = json.loads(record.get("body", "{}"))
-        except json.JSONDecodeError:
-            logger.info("Failed to decode S3 event from SQS message body.")
-            continue
+    changes = {
+        key: change
+        for key, change in coalesce_s3_events(event.get("Records", [])).items()
+        if not key.endswith("/") and not key.startswith(skipped_prefixes)
+    }
+    removed_keys = [key for key, change in changes.items() if change["event"].startswith("ObjectRemoved")]
+    created_keys = [key for key in changes if key not in removed_keys]
 
-        for s3_record in s3_event.get("Records", []):
-            object_key = s3_record.get("s3", {}).get("object", {}).get("key")
-            if object_key:
-                logger.info("Processed %s in bucket %s.", object_key, app_bucket_name)
-                load_data(asset_location=f"{app_bucket_name}/{object_key}")
-            else:
-                logger.info("Object key not found in S3 event.")
+    result = ingest_objects(app_bucket_name, created_keys=created_keys, removed_keys=removed_keys)
+    logger.info(
+        "Processed %d created and %d removed objects in bucket %s.",
+        result["added"],
+        result["deleted"],
+        app_bucket_name,
+    )
+
+    failed_message_ids = sorted(
+        {message_id for key in result["failed"] for message_id in changes[key]["message_ids"] if message_id}
+    )
 
-    return {"statusCode": 200, "body": json.dumps("Successfully processed S3 event(s) from SQS messages.")}
+    return {
+        "statusCode": 200,
+        "body": json.dumps("Successfully processed S3 event(s) from SQS messages."),
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids],
+    }
@@ -0,0 +1,569 @@
+"""In-process vector database for small corpora: a memory-mapped float32 matrix searched with numpy.
+
+Selected with `vectordb.provider: local` in the Embedchain configuration. Each collection is a directory holding
+`embeddings.f32`, the normalised embeddings as a raw row-major matrix, and `metadata.json.gz`, the ids, texts and
+metadata of its rows. Queries are brute force over the rows allowed by the `where` filter, or search the closest
+lists of an inverted file (IVF) index once the collection is large enough.
+
+The collection exposes the subset of Chroma's collection API arti uses (`get`, `upsert`, `query`, `delete`,
+`count`), so the ingestion pipeline and the keyword index treat it like Chroma. An S3 snapshot of a collection is
+one object, `snapshot.bin`, holding the length of the metadata file, the metadata file and the matrix.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from arti_ai.snapshot import SnapshottedIndex
+
+MATRIX_FILE = "embeddings.f32"
+METADATA_FILE = "metadata.json.gz"
+SNAPSHOT_FILE = "snapshot.bin"
+# Metadata keys with at most this many distinct values get a bitmap per value when the collection is loaded.
+BITMAP_MAX_VALUES = 64
+IVF_MIN_ROWS_PER_LIST = 32
+IVF_ITERATIONS = 10
+IVF_SAMPLE_PER_LIST = 256
+
+
+def normalize(vectors):
+    """Return float32 vectors scaled to unit length, so inner products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top(scores, n_results):
+    """Return the positions of the `n_results` highest scores, highest first, without sorting every score."""
+    best = np.argpartition(-scores, n_results)[:n_results] if len(scores) > n_results else np.arange(len(scores))
+    return best[np.argsort(-scores[best])]
+
+
+class LocalCollection(SnapshottedIndex):  # pylint: disable=too-many-instance-attributes
+    """Vectors, texts and metadata of one collection, held in memory and saved to a directory.
+
+    Writes are kept in memory until `save`, so a batch of upserts costs one write of the files. Like the keyword
+    index, queries reload the S3 snapshot when its ETag changes; see `SnapshottedIndex`.
+    """
+
+    snapshot_name = "local vector database"
+
+    def __init__(
+        self, path, embedding_function=None, *, ivf_lists=0, ivf_probes=8, snapshot_url=None, refresh_seconds=300
+    ):
+        """Initialize the collection, loading it from `path`, or else from the S3 snapshot.
+
+        Args:
+            path (str): Directory of the collection files.
+            embedding_function (callable): Embeds query texts and added documents without embeddings.
+            ivf_lists (int): Number of IVF lists, or 0 to always search by brute force.
+            ivf_probes (int): IVF lists searched per query.
+            snapshot_url (str): Optional S3 bucket and key prefix of a snapshot of the collection files.
+            refresh_seconds (float): Minimum seconds between checks for a newer snapshot, or None to never check.
+        """
+        super().__init__(snapshot_url=snapshot_url, refresh_seconds=refresh_seconds)
+        self.path = path
+        self.embedding_function = embedding_function
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self._clear()
+        if os.path.exists(os.path.join(path, METADATA_FILE)):
+            self._load()
+        elif snapshot_url:
+            self.restore()
+
+    def _clear(self):
+        """Forget every row."""
+        # Rows of the matrix past `_size` are spare capacity for appends
+        self._matrix: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._rows = {}
+        self._postings = {}
+        self._bitmaps = {}
+        self._ivf = None
+
+    def _load(self):
+        """Load the collection files, memory-mapping the matrix."""
+        with gzip.open(os.path.join(self.path, METADATA_FILE), "rt", encoding="utf-8") as file:
+            sidecar = json.load(file)
+        with self._lock:
+            self._clear()
+            if sidecar["ids"]:
+                self._matrix = np.memmap(
+                    os.path.join(self.path, MATRIX_FILE),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(len(sidecar["ids"]), sidecar["dimension"]),
+                )
+            self._append_rows(sidecar["ids"], sidecar["documents"], sidecar["metadatas"])
+            self._precompute_bitmaps()
+
+    def _append_rows(self, ids, documents, metadatas):
+        """Record the ids, texts and metadata of rows appended to the matrix, and index their metadata."""
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            row = len(self._ids)
+            self._ids.append(chunk_id)
+            self._documents.append(document)
+            self._metadatas.append(dict(metadata or {}))
+            self._rows[chunk_id] = row
+            for key, value in (metadata or {}).items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._postings.setdefault(key, {}).setdefault(value, []).append(row)
+        self._size = len(self._ids)
+
+    def _precompute_bitmaps(self):
+        """Build the row bitmap of every value of the low-cardinality metadata keys, e.g. `app_id`."""
+        for key, values in self._postings.items():
+            if len(values) <= BITMAP_MAX_VALUES:
+                for value in values:
+                    self._bitmap(key, value)
+
+    def _bitmap(self, key, value):
+        """Return the rows whose metadata `key` equals `value`, as a boolean mask."""
+        bitmap = self._bitmaps.get((key, value))
+        if bitmap is None:
+            bitmap = np.zeros(self._size, dtype=bool)
+            bitmap[self._postings.get(key, {}).get(value, [])] = True
+            self._bitmaps[(key, value)] = bitmap
+        return bitmap
+
+    def _condition_mask(self, key, condition):
+        """Return the rows satisfying one metadata condition, an equality or a `$eq`, `$ne`, `$in` or `$nin`."""
+        if not isinstance(condition, dict):
+            return self._bitmap(key, condition)
+        mask = np.ones(self._size, dtype=bool)
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                mask &= self._bitmap(key, operand)
+            elif operator == "$ne":
+                mask &= ~self._bitmap(key, operand)
+            elif operator in ("$in", "$nin"):
+                members = np.zeros(self._size, dtype=bool)
+                for value in operand:
+                    members |= self._bitmap(key, value)
+                mask &= members if operator == "$in" else ~members
+            else:
+                raise ValueError(f"Unsupported filter operator for the local vector database: {operator}")
+        return mask
+
+    def _mask(self, where):
+        """Return the rows matching a Chroma-style filter, or None when every row matches."""
+        if not where:
+            return None
+        mask = np.ones(self._size, dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                masks = [self._mask(clause) for clause in condition]
+                masks = [np.ones(self._size, dtype=bool) if clause is None else clause for clause in masks]
+                combined = np.logical_and.reduce(masks) if key == "$and" else np.logical_or.reduce(masks)
+                mask &= combined
+            else:
+                mask &= self._condition_mask(key, condition)
+        return mask
+
+    def _writable(self, rows):
+        """Return the matrix with room for `rows` more rows, copying a memory-mapped matrix into memory."""
+        needed = self._size + rows
+        if not isinstance(self._matrix, np.memmap) and len(self._matrix) >= needed:
+            return self._matrix
+        matrix = np.empty((max(needed, 2 * self._size, 64), self._matrix.shape[1]), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        return matrix
+
+    def _written(self):
+        """Invalidate what derives from the rows after a write."""
+        self._bitmaps = {}
+        self._ivf = None
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        """Add rows, replacing rows with the same ids; documents without embeddings are embedded.
+
+        Args:
+            ids (list[str]): Chunk ids.
+            embeddings (list[list[float]]): Embeddings of the chunks, or None to embed the documents.
+            documents (list[str]): Chunk texts.
+            metadatas (list[dict]): Chunk metadata.
+        """
+        if not ids:
+            return
+        documents = documents if documents is not None else [""] * len(ids)
+        metadatas = metadatas if metadatas is not None else [{}] * len(ids)
+        vectors = normalize(embeddings if embeddings is not None else self.embedding_function(documents))
+        self._record(
+            "upsert_vectors", list(ids), vectors, list(documents), [dict(metadata or {}) for metadata in metadatas]
+        )
+
+    def _upsert_vectors(self, ids, vectors, documents, metadatas):
+        """Add rows of normalised vectors without recording the change."""
+        with self._lock:
+            self._delete(ids=[chunk_id for chunk_id in ids if chunk_id in self._rows])
+            if not self._size:
+                self._matrix = np.empty((0, vectors.shape[1]), dtype=np.float32)
+            elif vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match the collection's {self._matrix.shape[1]}"
+                )
+            start = self._size
+            self._matrix = self._writable(len(ids))
+            self._matrix[start:][: len(ids)] = vectors
+            self._append_rows(ids, documents, metadatas)
+            self._written()
+
+    add = upsert
+
+    def delete(self, ids=None, where=None):
+        """Delete the rows with the given ids, or matching a filter."""
+        self._record("delete", list(ids or []), dict(where or {}))
+
+    def _delete(self, ids=None, where=None):
+        """Delete rows without recording the change."""
+        with self._lock:
+            removed = np.zeros(self._size, dtype=bool)
+            if ids:
+                removed[[self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]] = True
+            if where:
+                removed |= self._mask(where)
+            if not removed.any():
+                return
+            kept = np.flatnonzero(~removed)
+            matrix = np.array(self._matrix[kept], dtype=np.float32)
+            rows = [(self._ids[row], self._documents[row], self._metadatas[row]) for row in kept]
+            self._clear()
+            self._matrix = matrix
+            if rows:
+                self._append_rows(*zip(*rows))
+
+    def count(self):
+        """Return the number of rows."""
+        return self._size
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        """Return rows by id and filter, like Chroma's `Collection.get`.
+
+        Returns:
+            dict: The `ids` of the rows, with their `documents`, `metadatas` and `embeddings` as included.
+        """
+        with self._lock:
+            rows = range(self._size) if ids is None else [self._rows[i] for i in ids if i in self._rows]
+            mask = self._mask(where)
+            offset = offset or 0
+            rows = [row for row in rows if mask is None or mask[row]][offset:]
+            rows = rows[:limit] if limit else rows
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[row] for row in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [dict(self._metadatas[row]) for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = [self._matrix[row].tolist() for row in rows]
+        return result
+
+    def _build_ivf(self):
+        """Cluster the rows into `ivf_lists` lists with spherical k-means, returning the centroids and assignments."""
+        rng = np.random.default_rng(0)
+        matrix = self._matrix[: self._size]
+        sample = matrix[rng.choice(self._size, min(self._size, self.ivf_lists * IVF_SAMPLE_PER_LIST), replace=False)]
+        centroids = np.array(sample[rng.choice(len(sample), self.ivf_lists, replace=False)])
+        for _ in range(IVF_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for number in range(self.ivf_lists):
+                members = sample[assignments == number]
+                if len(members):
+                    centroids[number] = normalize(members.mean(axis=0))
+        return centroids, np.argmax(matrix @ centroids.T, axis=1)
+
+    def _candidates(self, vectors, where, n_results):
+        """Return the rows to score per query: those allowed by the filter and, with IVF, in the closest lists."""
+        mask = self._mask(where)
+        allowed = np.arange(self._size) if mask is None else np.flatnonzero(mask)
+        if not self.ivf_lists or self._size < self.ivf_lists * IVF_MIN_ROWS_PER_LIST:
+            return [allowed] * len(vectors)
+
+        if self._ivf is None:
+            self._ivf = self._build_ivf()
+        centroids, assignments = self._ivf
+        candidates = []
+        for vector in vectors:
+            probed = np.isin(assignments, np.argsort(centroids @ vector)[::-1][: self.ivf_probes])
+            rows = np.flatnonzero(probed if mask is None else probed & mask)
+            # Too few filtered rows in the probed lists: search every allowed row instead
+            candidates.append(rows if len(rows) >= n_results else allowed)
+        return candidates
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None):  # pylint: disable=R0914
+        """Return the rows closest to each query by cosine distance, like Chroma's `Collection.query`.
+
+        Returns:
+            dict: Per query, the `ids`, `documents`, `metadatas` and `distances` of the rows, closest first.
+        """
+        self.refresh()
+        vectors = normalize(query_embeddings if query_embeddings is not None else self.embedding_function(query_texts))
+        with self._lock:
+            # Rows are only appended or replaced wholesale, so these references stay consistent once released
+            matrix, ids, documents, metadatas = self._matrix, self._ids, self._documents, self._metadatas
+            candidates = self._candidates(vectors, where, n_results)
+
+        result: dict[str, list[list[object]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for vector, rows in zip(vectors, candidates):
+            scores = matrix[rows] @ vector if len(rows) else np.empty(0, dtype=np.float32)
+            order = top(scores, n_results)
+            rows, scores = rows[order], scores[order]
+            result["ids"].append([ids[row] for row in rows])
+            result["documents"].append([documents[row] for row in rows])
+            result["metadatas"].append([dict(metadatas[row]) for row in rows])
+            result["distances"].append([float(1 - score) for score in scores])
+        return result
+
+    def save(self):
+        """Atomically write the collection files, returning the content of the matrix and metadata files."""
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            dimension = self._matrix.shape[1]
+            matrix = np.ascontiguousarray(self._matrix[: self._size])
+            sidecar = {
+                "version": 1,
+                "dimension": dimension,
+                "ids": list(self._ids),
+                "documents": list(self._documents),
+                "metadatas": list(self._metadatas),
+            }
+            self._bitmaps = {}
+            self._precompute_bitmaps()
+        matrix_bytes = matrix.tobytes()
+        sidecar_bytes = gzip.compress(json.dumps(sidecar, separators=(",", ":")).encode("utf-8"))
+        self._write(MATRIX_FILE, matrix_bytes)
+        self._write(METADATA_FILE, sidecar_bytes)
+        return matrix_bytes, sidecar_bytes
+
+    def _write(self, name, payload):
+        """Atomically write one collection file."""
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(payload)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def reset(self):
+        """Delete every row and the collection files."""
+        self._record("reset")
+
+    def _reset(self):
+        """Delete every row and the collection files without recording the change."""
+        with self._lock:
+            self._clear()
+            for name in (MATRIX_FILE, METADATA_FILE):
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+
+    def _s3_location(self):
+        """Return the S3 client, bucket and key of the snapshot, under the snapshot key prefix."""
+        s3_client, bucket_name, prefix = super()._s3_location()
+        return s3_client, bucket_name, f"{prefix.rstrip('/')}/{SNAPSHOT_FILE}"
+
+    def _load_snapshot(self, payload):
+        """Write a downloaded snapshot to the collection directory and load it."""
+        length, payload = int.from_bytes(payload[:8], "little"), payload[8:]
+        os.makedirs(self.path, exist_ok=True)
+        # The sidecar is written last, so it is only present once the matrix is complete
+        self._write(MATRIX_FILE, payload[length:])
+        self._write(METADATA_FILE, payload[:length])
+        self._load()
+
+    def _save_snapshot(self):
+        """Write the collection files and return them as one snapshot: the metadata length, metadata and matrix."""
+        matrix, sidecar = self.save()
+        return len(sidecar).to_bytes(8, "little") + sidecar + matrix
+
+
+def default_directory():
+    """Return the default directory of local collections, under the Embedchain config directory or /tmp."""
+    return os.path.join(os.environ.get("EMBEDCHAIN_CONFIG_DIR", tempfile.gettempdir()), "local_vectordb")
+
+
+def is_local(config_data):
+    """Return whether an Embedchain configuration selects the local vector database."""
+    return (config_data.get("vectordb") or {}).get("provider") == "local"
+
+
+class LocalVectorDbConfig:  # pylint: disable=too-few-public-methods
+    """Options of the local vector database, the `vectordb.config` of the Embedchain configuration."""
+
+    def __init__(
+        self, collection_name=None, dir=None, *, ivf_lists=0, ivf_probes=8, snapshot_url=None, refresh_seconds=300
+    ):  # pylint: disable=redefined-builtin
+        """Initialize the options.
+
+        Args:
+            collection_name (str): Name of the collection, a subdirectory of `dir`.
+            dir (str): Directory of the collections, by default under the Embedchain config directory or /tmp.
+            ivf_lists (int): Number of IVF lists, or 0 to always search by brute force.
+            ivf_probes (int): IVF lists searched per query.
+            snapshot_url (str): Optional S3 bucket and key prefix under which collections are snapshotted.
+            refresh_seconds (float): Minimum seconds between checks for a newer snapshot, or None to never check.
+        """
+        self.collection_name = collection_name or "embedchain_store"
+        self.dir = dir or default_directory()
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.snapshot_url = snapshot_url
+        self.refresh_seconds = refresh_seconds
+
+
+def validate_local_config(config_data):
+    """Validate a configuration selecting the local vector database, which Embedchain's schema does not know.
+
+    Raises:
+        SchemaError: If the configuration is invalid.
+    """
+    # pylint: disable=import-outside-toplevel
+    from embedchain.utils.misc import validate_config  # type: ignore
+    from schema import SchemaError  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    validate_config({key: value for key, value in config_data.items() if key != "vectordb"})
+    try:
+        LocalVectorDbConfig(**(config_data["vectordb"].get("config") or {}))
+    except TypeError as e:
+        raise SchemaError(f"Invalid local vector database options: {e}") from e
+
+
+class LocalVectorDB:
+    """Embedchain vector database over local collections, one directory per collection."""
+
+    def __init__(self, config=None):
+        """Initialize the database.
+
+        Args:
+            config (LocalVectorDbConfig): The options.
+        """
+        self.config = config or LocalVectorDbConfig()
+        self.embedder = None
+        self.collection: LocalCollection | None = None
+        self._collections: dict[str, LocalCollection] = {}
+
+    def _set_embedder(self, embedder):
+        """Set the embedder of documents and queries."""
+        self.embedder = embedder
+
+    def _initialize(self):
+        """Open the configured collection once the embedder is set."""
+        self._get_or_create_collection(self.config.collection_name)
+
+    def _get_or_create_collection(self, name):
+        """Open a collection, reusing it if it is already open so unsaved writes are kept."""
+        embedder = self.embedder
+        if not embedder:
+            raise ValueError("Cannot open a local vector database collection without an embedder.")
+        collection = self._collections.get(name)
+        if collection is None:
+            snapshot_url = self.config.snapshot_url
+            collection = LocalCollection(
+                os.path.join(self.config.dir, name),
+                ivf_lists=self.config.ivf_lists,
+                ivf_probes=self.config.ivf_probes,
+                snapshot_url=f"{snapshot_url.rstrip('/')}/{name}" if snapshot_url else None,
+                refresh_seconds=self.config.refresh_seconds,
+            )
+            self._collections[name] = collection
+        # Reopening picks up a replaced embedding function, e.g. the embedding cache's
+        collection.embedding_function = embedder.embedding_fn
+        self.collection = collection
+        return collection
+
+    def _open_collection(self):
+        """Return the current collection.
+
+        Raises:
+            ValueError: If the database was not initialized by the app yet.
+        """
+        if self.collection is None:
+            raise ValueError("The local vector database has no open collection, it was not initialized.")
+        return self.collection
+
+    def set_collection_name(self, name):
+        """Switch to a collection."""
+        if not isinstance(name, str):
+            raise TypeError("Collection name must be a string")
+        self.config.collection_name = name
+        self._get_or_create_collection(name)
+
+    def get(self, ids=None, where=None, limit=None):
+        """Return the ids and metadata of the chunks with the given ids and matching the filter."""
+        return self._open_collection().get(ids=ids, where=where, limit=limit)
+
+    def add(self, documents, metadatas, ids, **kwargs):  # pylint: disable=unused-argument
+        """Embed and add chunks."""
+        self._open_collection().upsert(ids=ids, documents=documents, metadatas=metadatas)
+
+    def query(self, input_query, n_results, where=None, citations=False, **kwargs):  # pylint: disable=unused-argument
+        """Return the chunks closest to a query, with their metadata and distance as `score` with `citations`."""
+        result = self._open_collection().query(query_texts=[input_query], n_results=n_results, where=where)
+        contexts = []
+        for document, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0]):
+            contexts.append((document, {**metadata, "score": distance}) if citations else document)
+        return contexts
+
+    def count(self):
+        """Return the number of chunks in the collection."""
+        return self._open_collection().count()
+
+    def delete(self, where):
+        """Delete the chunks matching a filter."""
+        self._open_collection().delete(where=where)
+
+    def reset(self):
+        """Delete every chunk of the collection."""
+        self._open_collection().reset()
+
+    def snapshot(self):
+        """Save the collection and upload it to its S3 snapshot, if configured."""
+        return self._open_collection().snapshot()
+
+
+def app_from_config(config):
+    """Build an Embedchain app on the local vector database, as `App.from_config` does for its own providers.
+
+    Args:
+        config (dict): The Embedchain configuration, with `vectordb.provider: local`.
+
+    Returns:
+        App: The app.
+    """
+    # pylint: disable=import-outside-toplevel
+    from embedchain import App  # type: ignore
+    from embedchain.config import AppConfig, CacheConfig  # type: ignore
+    from embedchain.core.db.database import init_db, setup_engine  # type: ignore
+    from embedchain.factory import EmbedderFactory, LlmFactory  # type: ignore
+    from schema import SchemaError  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    try:
+        validate_local_config(config)
+    except SchemaError as e:
+        raise ValueError(f"Invalid Embedchain configuration: {e}") from e
+
+    llm_config = config.get("llm", {})
+    llm = None
+    if llm_config:
+        # Embedchain's LLMs need the metadata database for their memory
+        setup_engine(database_uri=os.environ.get("EMBEDCHAIN_DB_URI"))
+        init_db()
+        llm = LlmFactory.create(llm_config.get("provider", "openai"), llm_config.get("config", {}))
+    embedder_config = config.get("embedding_model", config.get("embedder", {}))
+    cache_config = config.get("cache")
+
+    return App(
+        config=AppConfig(**config.get("app", {}).get("config", {})),
+        llm=llm,
+        db=LocalVectorDB(LocalVectorDbConfig(**(config["vectordb"].get("config") or {}))),
+        embedding_model=EmbedderFactory.create(
+            embedder_config.get("provider", "openai"), embedder_config.get("config", {})
+        ),
+        chunker=config.get("chunker", {}),
+        cache_config=CacheConfig.from_config(cache_config) if cache_config is not None else None,
+    )
@@ -0,0 +1,131 @@
+"""Queue questions for a dedicated worker instead of answering them in the Slack-facing Lambda.
+
+Slack listeners enqueue a compact job: the question, `ask_ai` parameters and where to post the answer, a
+`response_url` or a `channel`. The worker, `lambda_question_handler`, drains jobs in batches. SQS connects them in
+AWS; an in-process queue serves tests and local development.
+"""
+
+import collections
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def make_job(question, **fields):
+    """Return a question job, leaving out unset fields.
+
+    Args:
+        question (str): The question.
+        **fields: `id`, the request id deduplicating redeliveries; `params`, keyword arguments of `ask_ai`;
+            `response_url`, or `channel` and `thread_ts`, where the answer is posted; `prefix`, text preceding it.
+    """
+    return {"question": question, **{name: value for name, value in fields.items() if value is not None}}
+
+
+class LocalQueue:
+    """In-process queue, answering jobs on a background thread when given a consumer."""
+
+    def __init__(self, consumer=None, batch_size=10):
+        """Initialize the queue.
+
+        Args:
+            consumer (callable): Called with each batch of jobs on a background thread, or None to drain manually.
+            batch_size (int): Maximum number of jobs per batch.
+        """
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self._jobs = collections.deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def send(self, job):
+        """Enqueue a job."""
+        with self._lock:
+            self._jobs.append(job)
+            if self.consumer is not None and self._thread is None:
+                self._thread = threading.Thread(target=self._consume, name="arti-question-queue", daemon=True)
+                self._thread.start()
+
+    def receive(self, max_jobs=10):
+        """Dequeue up to `max_jobs` jobs."""
+        with self._lock:
+            return [self._jobs.popleft() for _ in range(min(max_jobs, len(self._jobs)))]
+
+    def drain(self, consumer):
+        """Hand all queued jobs to `consumer` in batches, on the calling thread."""
+        while batch := self.receive(self.batch_size):
+            consumer(batch)
+
+    def _consume(self):
+        """Hand batches to the consumer until the queue is empty."""
+        while True:
+            with self._lock:
+                batch = [self._jobs.popleft() for _ in range(min(self.batch_size, len(self._jobs)))]
+                if not batch:
+                    self._thread = None
+                    return
+            try:
+                self.consumer(batch)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to answer %d queued questions", len(batch))
+
+    def __len__(self):
+        """Return the number of queued jobs."""
+        with self._lock:
+            return len(self._jobs)
+
+
+class SQSQueue:
+    """Amazon SQS queue, drained by the question worker Lambda."""
+
+    def __init__(self, queue_url, client=None):
+        """Initialize the queue.
+
+        Args:
+            queue_url (str): URL of the SQS queue.
+            client: The SQS client, created on first use by default.
+        """
+        self.queue_url = queue_url
+        self._client = client
+
+    @property
+    def client(self):
+        """Return the SQS client, created on first use."""
+        if self._client is None:
+            # pylint: disable=import-outside-toplevel
+            import boto3  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+            self._client = boto3.client("sqs")
+        return self._client
+
+    def send(self, job):
+        """Enqueue a job."""
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(job))
+
+
+def question_queue_from_env():
+    """Build the question queue from environment variables.
+
+    Returns:
+        SQSQueue | LocalQueue | None: The queue `QUESTION_QUEUE` names, `sqs` or `local`, or None to answer
+            questions in the Slack listeners.
+
+    Raises:
+        ValueError: If `QUESTION_QUEUE` names no queue.
+    """
+    kind = os.environ.get("QUESTION_QUEUE", "").lower()
+    if not kind:
+        return None
+    if kind == "sqs":
+        return SQSQueue(os.environ["QUESTION_QUEUE_URL"])
+    if kind == "local":
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.lambda_question_handler import answer_jobs
+
+        # pylint: enable=import-outside-toplevel
+        return LocalQueue(consumer=answer_jobs)
+    raise ValueError(f"Unknown question queue: {kind}")
@@ -0,0 +1,246 @@
+"""Rerank retrieved chunks before generation, so the prompt only carries the most relevant ones.
+
+Retrieval over-fetches candidates, a scorer ranks them against the question, and only the best are handed to the
+LLM. Scorers are a local cross-encoder, a single batched call to a cheap LLM, or BM25 over the candidates. When the
+stage would exceed its latency budget, or the scorer fails, the retrieval order is kept instead.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from arti_ai.keyword_index import KeywordIndex
+from arti_ai.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+LLM_RERANK_PROMPT = (
+    "Rate how relevant each numbered passage is to answering the question, from 0 (irrelevant) to 10 (answers it). "
+    "Reply with only a JSON array of numbers, one per passage, in order.\n\nQuestion: {question}\n\n{passages}"
+)
+
+
+class BM25Scorer:  # pylint: disable=too-few-public-methods
+    """Score candidates by BM25 against the question; needs no model, so it suits offline runs."""
+
+    name = "bm25"
+
+    def __call__(self, question, texts):
+        """Return a relevance score per text."""
+        index = KeywordIndex(None)
+        index.add(
+            [str(number) for number in range(len(texts))], texts, [{"number": number} for number in range(len(texts))]
+        )
+        scores = [0.0] * len(texts)
+        for _, metadata, score in index.search(question, len(texts)):
+            scores[metadata["number"]] = score
+        return scores
+
+
+class CrossEncoderScorer:  # pylint: disable=too-few-public-methods
+    """Score candidates with a sentence-transformers cross-encoder running locally, e.g. on the Lambda CPU."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model="cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        """Initialize the scorer; the model is loaded on first use.
+
+        Args:
+            model (str): Name or path of the cross-encoder model.
+        """
+        self.model = model
+
+    def __call__(self, question, texts):
+        """Return a relevance score per text."""
+        return [float(score) for score in load_cross_encoder(self.model).predict([(question, text) for text in texts])]
+
+
+@functools.cache
+def load_cross_encoder(model):
+    """Return a loaded cross-encoder, once per process.
+
+    Raises:
+        ImportError: If sentence-transformers is not installed.
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        from sentence_transformers import CrossEncoder  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "The cross-encoder reranker needs sentence-transformers: pip install sentence-transformers"
+        ) from e
+    return CrossEncoder(model, device="cpu")
+
+
+class LLMScorer:
+    """Score all candidates with one call to a cheap chat model."""
+
+    name = "llm"
+
+    def __init__(self, model="gpt-3.5-turbo", max_characters=1000, client=None):
+        """Initialize the scorer.
+
+        Args:
+            model (str): The OpenAI chat model.
+            max_characters (int): Length each candidate is truncated to in the prompt.
+            client (OpenAI): The OpenAI client, created on first use by default.
+        """
+        self.model = model
+        self.max_characters = max_characters
+        self._client = client
+
+    @property
+    def client(self):
+        """Return the OpenAI client, created on first use."""
+        if self._client is None:
+            # pylint: disable=import-outside-toplevel
+            from openai import OpenAI  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+            self._client = OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=os.environ.get("OPENAI_API_BASE"))
+        return self._client
+
+    def __call__(self, question, texts):
+        """Return a relevance score per text.
+
+        Raises:
+            ValueError: If the reply is not one score per text.
+        """
+        passages = "\n\n".join(f"[{number}] {text[: self.max_characters]}" for number, text in enumerate(texts, 1))
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": LLM_RERANK_PROMPT.format(question=question, passages=passages)}],
+            temperature=0,
+            max_tokens=4 * len(texts) + 16,
+        )
+        reply = completion.choices[0].message.content or ""
+        match = re.search(r"\[.*\]", reply, re.DOTALL)
+        scores = json.loads(match.group(0)) if match else None
+        if not isinstance(scores, list) or len(scores) != len(texts):
+            raise ValueError(f"Expected {len(texts)} relevance scores from the reranker, got: {reply[:200]}")
+        return [float(score) for score in scores]
+
+
+@functools.cache
+def get_executor():
+    """Return the thread pool scorers run on, so a slow scorer can be abandoned when over budget."""
+    return ThreadPoolExecutor(thread_name_prefix="arti-rerank")
+
+
+class Reranker:  # pylint: disable=too-few-public-methods
+    """Vector database query over-fetching candidates and keeping those the scorer ranks best."""
+
+    def __init__(self, vector_query, scorer, candidates=3, top_n=None, budget_seconds=None):
+        """Initialize the reranker.
+
+        Args:
+            vector_query (callable): The vector database's `query` method.
+            scorer (callable): Returns a relevance score per text, given the question and the texts.
+            candidates (int): Multiple of the requested number of chunks fetched for reranking.
+            top_n (int): Maximum number of chunks forwarded, to shorten prompts; the requested number by default.
+            budget_seconds (float): Seconds retrieval and reranking may take before reranking is bypassed.
+        """
+        self.vector_query = vector_query
+        self.scorer = scorer
+        self.candidates = candidates
+        self.top_n = top_n
+        self.budget_seconds = budget_seconds
+
+    def _score(self, question, texts, started_at):
+        """Score the candidates within the remaining budget, returning None to keep the retrieval order."""
+        if self.budget_seconds is None:
+            return self.scorer(question, texts)
+        remaining = self.budget_seconds - (time.perf_counter() - started_at)
+        if remaining <= 0:
+            logger.info("Reranking bypassed, retrieval used the %s second budget", self.budget_seconds)
+            return None
+        future = get_executor().submit(self.scorer, question, texts)
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.info("Reranking bypassed, scoring exceeded the %s second budget", self.budget_seconds)
+            return None
+
+    def __call__(self, input_query, n_results, where=None, citations=False, **kwargs):
+        """Query like Embedchain's vector databases, returning texts, or texts and metadata with `citations`."""
+        started_at = time.perf_counter()
+        contexts = self.vector_query(
+            input_query=input_query, n_results=n_results * self.candidates, where=where, citations=True, **kwargs
+        )
+        n_results = min(n_results, self.top_n or n_results)
+
+        with tracer.span("rerank", scorer=getattr(self.scorer, "name", None)) as rerank_span:
+            rerank_span.add("rerank_candidates", len(contexts))
+            try:
+                scores = self._score(input_query, [text for text, _ in contexts], started_at) if contexts else None
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Reranking bypassed, scoring failed: %s", e)
+                scores = None
+            rerank_span.set_attribute("bypassed", scores is None)
+
+        if scores is not None:
+            order = sorted(range(len(contexts)), key=lambda number: scores[number], reverse=True)
+            contexts = [
+                (contexts[number][0], {**contexts[number][1], "rerank_score": scores[number]}) for number in order
+            ]
+        return [context if citations else context[0] for context in contexts[:n_results]]
+
+
+def install_reranker(app, scorer, candidates=3, top_n=None, budget_seconds=None):
+    """Rerank the chunks retrieved by an Embedchain app before they reach the LLM.
+
+    Args:
+        app (App): The Embedchain app.
+        scorer (callable): Returns a relevance score per text, given the question and the texts.
+        candidates (int): Multiple of the requested number of chunks fetched for reranking.
+        top_n (int): Maximum number of chunks forwarded to the LLM.
+        budget_seconds (float): Seconds retrieval and reranking may take before reranking is bypassed.
+
+    Returns:
+        App: The same app.
+    """
+    app.db.query = Reranker(app.db.query, scorer, candidates=candidates, top_n=top_n, budget_seconds=budget_seconds)
+    return app
+
+
+def build_scorer(name, model=None):
+    """Return the scorer called `name`: `cross-encoder`, `llm` or `bm25`, with an optional model name.
+
+    Raises:
+        ValueError: If `name` names no scorer.
+    """
+    if name == "cross-encoder":
+        return CrossEncoderScorer(model) if model else CrossEncoderScorer()
+    if name == "llm":
+        return LLMScorer(model) if model else LLMScorer()
+    if name == "bm25":
+        return BM25Scorer()
+    raise ValueError(f"Unknown reranker: {name}")
+
+
+def scorer_from_env():
+    """Build the reranking scorer from environment variables.
+
+    Returns:
+        callable | None: The scorer named by `RERANKER`, or None when reranking is disabled.
+    """
+    name = os.environ.get("RERANKER", "").lower()
+    return build_scorer(name, os.environ.get("RERANK_MODEL")) if name else None
+
+
+def rerank_options_from_env():
+    """Return the candidate multiple, forwarded chunk limit and latency budget of the reranker."""
+    top_n = os.environ.get("RERANK_TOP_N")
+    budget_seconds = os.environ.get("RERANK_BUDGET_SECONDS")
+    return {
+        "candidates": int(os.environ.get("RERANK_CANDIDATES", "3")),
+        "top_n": int(top_n) if top_n else None,
+        "budget_seconds": float(budget_seconds) if budget_seconds else None,
+    }
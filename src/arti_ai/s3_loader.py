@@ -4,68 +4,325 @@ import hashlib
 import logging
 import os
 import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
 from typing import Optional
 
+from botocore.exceptions import ClientError  # type: ignore
 from embedchain.loaders.base_loader import BaseLoader  # type: ignore
 from embedchain.loaders.directory_loader import DirectoryLoader  # type: ignore
 
+from arti_ai.tracing import get_current_span, tracer
+
 logger = logging.getLogger(__name__)
 
+THROTTLING_ERROR_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "503"}
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".csv", ".json", ".yaml", ".yml", ".xml", ".log"}
+HTML_EXTENSIONS = {".html", ".htm"}
+PDF_EXTENSIONS = {".pdf"}
+
+
+def parse_text(buffer):
+    """Decode a text object."""
+    return buffer.read().decode("utf-8", errors="replace")
+
+
+def parse_html(buffer):
+    """Extract the visible text of an HTML object."""
+    # pylint: disable=import-outside-toplevel
+    from bs4 import BeautifulSoup  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    return BeautifulSoup(buffer.read(), "html.parser").get_text(separator=" ", strip=True)
+
+
+def parse_pdf(buffer):
+    """Extract the text of every page of a PDF object."""
+    # pylint: disable=import-outside-toplevel
+    from pypdf import PdfReader  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    return "\n".join(page.extract_text() or "" for page in PdfReader(buffer).pages)
+
+
+def select_parser(key, content_type=None):
+    """Return the in-memory parser for an object, or None when it has to be loaded from a file.
+
+    Args:
+        key (str): The object key, whose extension takes precedence.
+        content_type (str): The object's Content-Type, used when the extension is unknown.
+    """
+    extension = os.path.splitext(key)[1].lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if extension in PDF_EXTENSIONS or (not extension and content_type == "application/pdf"):
+        return parse_pdf
+    if extension in HTML_EXTENSIONS or (not extension and content_type == "text/html"):
+        return parse_html
+    if extension in TEXT_EXTENSIONS or (not extension and content_type.startswith("text/")):
+        return parse_text
+    return None
+
 
-class S3BucketLoader(BaseLoader):
-    """S3BucketLoader class to load data from S3 bucket."""
+def document_id(contents, url):
+    """Return the id Embedchain records for the documents loaded from a URL.
+
+    The digest is that of `str(list(contents)) + url`, computed incrementally so the contents are not copied into
+    one string.
+
+    Args:
+        contents (Iterable[str]): The document contents, in load order.
+        url (str): The loaded URL.
+
+    Returns:
+        str: A hexadecimal sha256 digest.
+    """
+    digest = hashlib.sha256(b"[")
+    for number, content in enumerate(contents):
+        digest.update(f"{', ' if number else ''}{content!r}".encode())
+    digest.update(f"]{url}".encode())
+    return digest.hexdigest()
+
+
+class S3BucketLoader(BaseLoader):  # pylint: disable=too-many-instance-attributes
+    """S3BucketLoader class to load data from S3 bucket.
+
+    Supported `config` keys:
+        s3_endpoint_url: Endpoint used to build source URLs.
+        max_workers: Number of objects downloaded concurrently.
+        max_retries: Attempts per object when S3 throttles requests.
+        retry_backoff: Base delay in seconds, doubled on every throttled attempt.
+        mode: `directory` downloads into a temporary directory for `DirectoryLoader`, `stream` parses objects
+            in memory as they are read. Either way `load_data` returns every document at once, as Embedchain's
+            `add` expects; only `iter_documents`, used by the ingestion pipeline, yields them incrementally.
+        spill_threshold: In `stream` mode, object size in bytes above which buffers spill to disk.
+    """
 
     def __init__(self, config: Optional[dict[str, str]] = None):
         """Initialize the S3BucketLoader."""
         super().__init__()
         self.config = config or {}
         self.s3_endpoint_url = self.config.get("s3_endpoint_url", "https://s3.us-east-1.amazonaws.com")
+        self.max_workers = int(self.config.get("max_workers", 8))
+        self.max_retries = int(self.config.get("max_retries", 5))
+        self.retry_backoff = float(self.config.get("retry_backoff", 0.5))
+        self.mode = self.config.get("mode", "directory")
+        self.spill_threshold = int(self.config.get("spill_threshold", 8 * 1024 * 1024))
+        self.last_stats: dict[str, float] = {}
+        self._s3_client = None
+        self._s3_client_lock = threading.Lock()
 
-    # pylint: disable=too-many-locals
-    def load_data(self, url):
-        """Load data from URL, in this case an S3 bucket and prefix."""
+    @property
+    def s3_client(self):
+        """Return the S3 client shared by every download, sized to the worker pool."""
+        with self._s3_client_lock:
+            if self._s3_client is None:
+                # pylint: disable=import-outside-toplevel
+                import boto3
+                from botocore.config import Config as BotoConfig  # type: ignore
+
+                # pylint: enable=import-outside-toplevel
+                self._s3_client = boto3.client(
+                    "s3",
+                    config=BotoConfig(
+                        max_pool_connections=max(self.max_workers, 10),
+                        retries={"max_attempts": self.max_retries, "mode": "adaptive"},
+                    ),
+                )
+            return self._s3_client
+
+    def _with_retries(self, key, operation):
+        """Run an S3 operation, backing off and retrying while S3 throttles the request."""
+        for attempt in range(self.max_retries):
+            try:
+                return operation()
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code not in THROTTLING_ERROR_CODES or attempt == self.max_retries - 1:
+                    raise
+                delay = self.retry_backoff * 2**attempt
+                logger.warning("Throttled reading %s (%s), retrying in %.2fs", key, code, delay)
+                time.sleep(delay)
+        return None
+
+    def _download(self, bucket_name, key, local_path, transfer_config):
+        """Download an object to a local path."""
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        self._with_retries(
+            key, lambda: self.s3_client.download_file(bucket_name, key, local_path, Config=transfer_config)
+        )
+
+    def _read_document(self, bucket_name, obj):
+        """Read an object into a buffer, spilling to disk above the threshold, and parse it into documents."""
+        key = obj["Key"]
+        response = self._with_retries(key, lambda: self.s3_client.get_object(Bucket=bucket_name, Key=key))
+        source_url = f"{self.s3_endpoint_url}/{bucket_name}/{key}"
+        meta_data = {"s3_bucket_name": bucket_name, "source": source_url, "url": source_url}
+
+        with tempfile.SpooledTemporaryFile(max_size=self.spill_threshold) as buffer:
+            for chunk in response["Body"].iter_chunks(chunk_size=1024 * 1024):
+                buffer.write(chunk)
+            buffer.seek(0)
+
+            parser = select_parser(key, response.get("ContentType"))
+            if parser is not None:
+                return [{"content": parser(buffer), "meta_data": meta_data}]
+
+            # Formats without an in-memory parser go through the matching Embedchain loader via a named file
+            with tempfile.NamedTemporaryFile(suffix=os.path.splitext(key)[1]) as named_file:
+                named_file.write(buffer.read())
+                named_file.flush()
+                # pylint: disable-next=protected-access
+                file_loader = DirectoryLoader()._predict_loader(Path(named_file.name))
+                return [
+                    {"content": item["content"], "meta_data": {**item["meta_data"], **meta_data}}
+                    for item in file_loader.load_data(named_file.name)["data"]
+                ]
+
+    def iter_documents(self, url):
+        """Yield documents from an S3 bucket and prefix as objects are read, without a temporary directory.
+
+        Objects are fetched and parsed by the worker pool while listing continues. At most twice the worker count
+        is buffered at once, which bounds peak memory; documents are yielded in completion order.
+
+        Args:
+            url (str): The bucket name, optionally followed by `/` and a prefix.
+
+        Yields:
+            dict: Documents with `content` and `meta_data` keys.
+        """
         query_components = url.split("/", 1)
         bucket_name = query_components[0]
         prefix = query_components[1] if len(query_components) == 2 else ""
 
-        logger.info("Loading data from S3 bucket: %s with prefix: %s", bucket_name, prefix)
+        logger.info("Streaming data from S3 bucket: %s with prefix: %s", bucket_name, prefix)
+
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-stream") as executor:
+            for obj in self._list_objects(bucket_name, prefix):
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+                pending.add(executor.submit(self._read_document, bucket_name, obj))
+            for future in as_completed(pending):
+                yield from future.result()
+
+    def _list_objects(self, bucket_name, prefix):
+        """Yield objects under a prefix as listing pages arrive, skipping directory markers.
+
+        A prefix naming an object exactly selects that object only, not siblings sharing the prefix. Keys are listed
+        in binary order, so such an object is always the first one listed.
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        first = True
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if first and obj["Key"] == prefix and not prefix.endswith("/"):
+                    yield obj
+                    return
+                first = False
+                if obj["Key"].endswith("/"):
+                    continue  # skip directories
+                yield obj
+
+    def download_objects(self, bucket_name, prefix, tmp_dir):  # pylint: disable=too-many-locals
+        """Download every object under a prefix into a directory with a bounded pool of workers.
+
+        Listing continues while earlier pages are downloading, with at most twice the worker count in flight.
+
+        Args:
+            bucket_name (str): The bucket to download from.
+            prefix (str): The key prefix to download.
+            tmp_dir (str): The local directory objects are written to, mirroring their keys.
 
+        Returns:
+            list[dict]: The downloaded objects as listed by S3.
+        """
         # pylint: disable=import-outside-toplevel
-        import boto3
+        from boto3.s3.transfer import TransferConfig  # type: ignore
 
         # pylint: enable=import-outside-toplevel
-        s3_client = boto3.client("s3")
+        transfer_config = TransferConfig(use_threads=False)
+        objects = []
+        pending = set()
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-download") as executor:
+            for obj in self._list_objects(bucket_name, prefix):
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                local_path = os.path.join(tmp_dir, obj["Key"])
+                pending.add(executor.submit(self._download, bucket_name, obj["Key"], local_path, transfer_config))
+                objects.append(obj)
+            for future in pending:
+                future.result()
+
+        elapsed = time.perf_counter() - start
+        total_bytes = sum(obj.get("Size") or 0 for obj in objects)
+        self.last_stats = {
+            "objects": len(objects),
+            "bytes": total_bytes,
+            "seconds": elapsed,
+            "objects_per_second": len(objects) / elapsed if elapsed else 0.0,
+            "bytes_per_second": total_bytes / elapsed if elapsed else 0.0,
+        }
+        logger.info(
+            "Downloaded %d objects (%d bytes) in %.2fs: %.1f objects/s, %.1f bytes/s",
+            len(objects),
+            total_bytes,
+            elapsed,
+            self.last_stats["objects_per_second"],
+            self.last_stats["bytes_per_second"],
+        )
+
+        return objects
+
+    @tracer.traced("s3.load_data")
+    def load_data(self, url):
+        """Load data from URL, in this case an S3 bucket and prefix."""
+        query_components = url.split("/", 1)
+        bucket_name = query_components[0]
+        prefix = query_components[1] if len(query_components) == 2 else ""
+
+        logger.info("Loading data from S3 bucket: %s with prefix: %s", bucket_name, prefix)
+
+        if self.mode == "stream":
+            # Documents complete in any order, sorting them keeps the document id stable
+            data = sorted(self.iter_documents(url), key=lambda item: item["meta_data"]["url"])
+            get_current_span().add("documents", len(data))
+            return {"doc_id": document_id((item["content"] for item in data), url), "data": data}
 
         with tempfile.TemporaryDirectory() as tmp_dir:
-            paginator = s3_client.get_paginator("list_objects_v2")
-            for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
-                for obj in page.get("Contents", []):
-                    local_path = os.path.join(tmp_dir, obj["Key"])
-                    if obj["Key"].endswith("/"):
-                        continue  # skip directories
-                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                    s3_client.download_file(bucket_name, obj["Key"], local_path)
+            self.download_objects(bucket_name, prefix, tmp_dir)
 
             loader = DirectoryLoader()
             loader_data = loader.load_data(tmp_dir)
 
-            data = [
-                {
-                    "content": item["content"],
-                    "meta_data": {
-                        **item["meta_data"],
-                        "s3_bucket_name": bucket_name,
-                        "source": f"{self.s3_endpoint_url}/{bucket_name}/{obj['Key']}",  # pylint: disable=W0631,W1405
-                        "url": f"{self.s3_endpoint_url}/{bucket_name}/{obj['Key']}",  # pylint: disable=W0631,W1405
-                    },
-                }
-                for item in loader_data["data"]
-            ]
-
-            data_content = [content["content"] for content in data]
-            doc_id = hashlib.sha256((str(data_content) + url).encode()).hexdigest()
+            data = []
+            for item in loader_data["data"]:
+                local_path = item["meta_data"].get("url", "")
+                key = os.path.relpath(local_path, tmp_dir) if local_path.startswith(tmp_dir + os.sep) else local_path
+                source_url = f"{self.s3_endpoint_url}/{bucket_name}/{key}"
+                data.append(
+                    {
+                        "content": item["content"],
+                        "meta_data": {
+                            **item["meta_data"],
+                            "s3_bucket_name": bucket_name,
+                            "source": source_url,
+                            "url": source_url,
+                        },
+                    }
+                )
+
+            get_current_span().add("documents", len(data))
 
             return {
-                "doc_id": doc_id,
+                "doc_id": document_id((item["content"] for item in data), url),
                 "data": data,
             }
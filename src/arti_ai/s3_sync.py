@@ -0,0 +1,175 @@
+"""Incremental synchronisation of an S3 prefix into the vector database."""
+
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.config import setting
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_PREFIX = ".arti/"
+
+
+class S3Manifest:
+    """Manifest of ingested S3 objects, persisted as JSON alongside the assets in the bucket.
+
+    Each entry maps an object key to the ETag, LastModified and size it had when it was ingested,
+    along with the Embedchain source hash used to delete its vectors.
+    """
+
+    def __init__(self, s3_client, bucket_name, key=".arti/manifest.json"):
+        """Initialize the manifest.
+
+        Args:
+            s3_client: A boto3 S3 client.
+            bucket_name (str): The bucket the manifest is stored in.
+            key (str): The object key of the manifest.
+        """
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+
+    def load(self):
+        """Load manifest entries, returning an empty manifest when none has been written yet."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return {}
+            raise
+        return json.loads(response["Body"].read()).get("objects", {})
+
+    def save(self, entries):
+        """Persist manifest entries."""
+        body = json.dumps({"version": 1, "objects": entries}, sort_keys=True).encode("utf-8")
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=self.key, Body=body, ContentType="application/json")
+
+
+def internal_prefixes(bucket_name, config_data):
+    """Return the key prefixes of the objects arti writes to a bucket itself, which must not be ingested.
+
+    Besides everything under `.arti/`, these are the manifest and any snapshot configured in the bucket.
+
+    Args:
+        bucket_name (str): The bucket the objects are in.
+        config_data (dict): The Embedchain configuration, which may snapshot the local vector database.
+
+    Returns:
+        tuple[str]: The key prefixes; a snapshot of a single file is its own prefix.
+    """
+    prefixes = [INTERNAL_PREFIX, os.getenv("ASSETS_MANIFEST_KEY", ".arti/manifest.json")]
+    snapshot_urls = [os.getenv("KEYWORD_INDEX_SNAPSHOT_URL"), os.getenv("EMBEDDING_CACHE_SNAPSHOT_URL")]
+    vectordb_snapshot_url = setting(config_data, "vectordb", "config", "snapshot_url")
+    if setting(config_data, "vectordb", "provider") == "local" and vectordb_snapshot_url:
+        # The local vector database snapshots a directory of files per collection
+        snapshot_urls.append(vectordb_snapshot_url.rstrip("/") + "/")
+    for snapshot_url in filter(None, snapshot_urls):
+        snapshot_bucket, _, key = snapshot_url.partition("/")
+        if snapshot_bucket == bucket_name and key:
+            prefixes.append(key)
+    return tuple(prefixes)
+
+
+def object_fingerprint(obj):
+    """Return the manifest fingerprint of an object from a `list_objects_v2` listing."""
+    last_modified = obj.get("LastModified")
+    return {
+        "etag": obj.get("ETag", "").strip('"'),
+        "last_modified": last_modified.isoformat() if hasattr(last_modified, "isoformat") else last_modified,
+        "size": obj.get("Size"),
+    }
+
+
+class S3IncrementalSync:
+    """Only ingest objects that changed since the last run, and delete vectors of removed objects."""
+
+    def __init__(self, app, loader, s3_client, manifest_key=None, config_data=None):
+        """Initialize the synchroniser.
+
+        Args:
+            app (App): The Embedchain app to add data to and delete data from.
+            loader (BaseLoader): The loader used to ingest a single S3 object.
+            s3_client: A boto3 S3 client.
+            manifest_key (str): The object key of the manifest, defaults to `ASSETS_MANIFEST_KEY`.
+            config_data (dict): The Embedchain configuration, used to skip the local vector database's snapshot.
+        """
+        self.app = app
+        self.loader = loader
+        self.s3_client = s3_client
+        self.manifest_key = manifest_key or os.getenv("ASSETS_MANIFEST_KEY", ".arti/manifest.json")
+        self.config_data = config_data or {}
+
+    def list_objects(self, bucket_name, prefix):
+        """Return the objects under a prefix keyed by object key, skipping directory markers and arti's own objects."""
+        skipped_prefixes = internal_prefixes(bucket_name, self.config_data) + (self.manifest_key,)
+        objects = {}
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith("/") or obj["Key"].startswith(skipped_prefixes):
+                    continue
+                objects[obj["Key"]] = obj
+        return objects
+
+    def _ingest(self, bucket_name, key):
+        """Ingest a single object and return its Embedchain source hash."""
+        return self.app.add(f"{bucket_name}/{key}", loader=self.loader)
+
+    def sync(self, url):
+        """Synchronise an S3 bucket and prefix with the vector database.
+
+        Args:
+            url (str): The bucket name, optionally followed by `/` and a prefix.
+
+        Returns:
+            dict: Counts of added, updated, deleted, skipped and failed objects.
+        """
+        query_components = url.split("/", 1)
+        bucket_name = query_components[0]
+        prefix = query_components[1] if len(query_components) == 2 else ""
+
+        logger.info("Synchronising S3 bucket: %s with prefix: %s", bucket_name, prefix)
+
+        manifest = S3Manifest(self.s3_client, bucket_name, self.manifest_key)
+        entries = manifest.load()
+        objects = self.list_objects(bucket_name, prefix)
+        counts = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0}
+
+        for key, obj in objects.items():
+            fingerprint = object_fingerprint(obj)
+            entry = entries.get(key)
+            if entry is not None and entry["etag"] == fingerprint["etag"] and entry["size"] == fingerprint["size"]:
+                counts["skipped"] += 1
+                continue
+
+            try:
+                if entry is not None:
+                    self.app.delete(entry["source_hash"])
+                source_hash = self._ingest(bucket_name, key)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("Failed to ingest %s: %s", key, e)
+                counts["failed"] += 1
+                continue
+
+            entries[key] = {**fingerprint, "source_hash": source_hash}
+            counts["updated" if entry is not None else "added"] += 1
+
+        for key in [key for key in entries if key.startswith(prefix) and key not in objects]:
+            try:
+                self.app.delete(entries[key]["source_hash"])
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("Failed to delete vectors for %s: %s", key, e)
+                counts["failed"] += 1
+                continue
+            del entries[key]
+            counts["deleted"] += 1
+
+        if counts["added"] or counts["updated"] or counts["deleted"]:
+            manifest.save(entries)
+
+        logger.info("Synchronised S3 bucket: %s with prefix: %s %s", bucket_name, prefix, counts)
+
+        return counts
@@ -0,0 +1,190 @@
+"""Cache of AWS Secrets Manager secrets with TTL, background refresh and batched retrieval."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class SecretsCache:  # pylint: disable=too-many-instance-attributes
+    """Keep decoded secrets in memory, and optionally encrypted on disk, so they are fetched once per TTL.
+
+    A secret read within `refresh_ahead` seconds of its expiry is refreshed by a background thread while the
+    cached value is returned, so callers only block on the very first fetch.
+    """
+
+    def __init__(self, client_getter, ttl=3600, refresh_ahead=300, path=None, encryption_key=None):
+        """Initialize the cache.
+
+        Args:
+            client_getter (callable): Returns the Secrets Manager client, so it can be created on first use.
+            ttl (float): Seconds a secret is served from the cache.
+            refresh_ahead (float): Seconds before expiry from which a read triggers a background refresh.
+            path (str): Optional file, e.g. under /tmp, persisting the cache across process restarts.
+            encryption_key (str): Fernet key encrypting the file; the file is not used without one.
+        """
+        self.client_getter = client_getter
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.path = path
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._fernet = self._load_fernet(encryption_key) if path and encryption_key else None
+        if self._fernet is not None:
+            self._load()
+
+    @staticmethod
+    def _load_fernet(encryption_key):
+        """Return a Fernet cipher for the key, or None when `cryptography` is not installed."""
+        try:
+            # pylint: disable=import-outside-toplevel
+            from cryptography.fernet import Fernet  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+        except ImportError:
+            logger.warning("cryptography is not installed, secrets are not cached on disk")
+            return None
+        return Fernet(encryption_key)
+
+    def _load(self):
+        """Read the encrypted cache file, ignoring a missing, expired or unreadable file."""
+        try:
+            with open(self.path, "rb") as file:
+                entries = json.loads(self._fernet.decrypt(file.read()))
+        except FileNotFoundError:
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Ignoring unreadable secrets cache %s: %s", self.path, e)
+            return
+        self._entries = {name: (value, fetched_at) for name, (value, fetched_at) in entries.items()}
+
+    def _save(self):
+        """Atomically write the encrypted cache file, readable by the owner only."""
+        if self._fernet is None:
+            return
+        payload = self._fernet.encrypt(json.dumps(self._entries).encode("utf-8"))
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(payload)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def _store(self, secrets):
+        """Cache decoded secrets keyed by secret id."""
+        if not secrets:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries.update({secret_id: (value, now) for secret_id, value in secrets.items()})
+            self._save()
+
+    def _age(self, secret_id):
+        """Return the age in seconds of a cached secret, or None when it is not cached."""
+        entry = self._entries.get(secret_id)
+        return None if entry is None else time.time() - entry[1]
+
+    def _is_fresh(self, secret_id):
+        """Return whether a secret is cached and has not expired."""
+        age = self._age(secret_id)
+        return age is not None and age < self.ttl
+
+    def _fetch(self, secret_id):
+        """Fetch and decode a single secret."""
+        response = self.client_getter().get_secret_value(SecretId=secret_id)
+        return json.loads(response["SecretString"])
+
+    def _refresh(self, secret_id):
+        """Refetch a secret, keeping the cached value if that fails."""
+        try:
+            self._store({secret_id: self._fetch(secret_id)})
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Background refresh of secret %s failed: %s", secret_id, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(secret_id)
+
+    def _refresh_in_background(self, secret_id):
+        """Start a refresh of a secret unless one is already running."""
+        with self._lock:
+            if secret_id in self._refreshing:
+                return
+            self._refreshing.add(secret_id)
+        threading.Thread(target=self._refresh, args=(secret_id,), daemon=True).start()
+
+    def get(self, secret_id):
+        """Return a decoded secret, fetching it when it is not cached or has expired.
+
+        Args:
+            secret_id (str): The name or ARN of the secret.
+
+        Raises:
+            ClientError: If the secret has to be fetched and cannot be.
+        """
+        if self._is_fresh(secret_id):
+            if self._age(secret_id) >= self.ttl - self.refresh_ahead:
+                self._refresh_in_background(secret_id)
+            return self._entries[secret_id][0]
+
+        secret = self._fetch(secret_id)
+        self._store({secret_id: secret})
+        return secret
+
+    def prefetch(self, secret_ids):
+        """Fetch every secret that is not freshly cached in a single batched request.
+
+        Secrets the batch could not return are left to be fetched individually by `get`.
+
+        Args:
+            secret_ids (Iterable[str]): Names or ARNs of the secrets.
+
+        Returns:
+            dict: The secrets fetched, keyed by secret id.
+        """
+        missing = [secret_id for secret_id in dict.fromkeys(secret_ids) if not self._is_fresh(secret_id)]
+        if not missing:
+            return {}
+
+        secrets = {}
+        kwargs = {"SecretIdList": missing}
+        try:
+            while True:
+                response = self.client_getter().batch_get_secret_value(**kwargs)
+                for secret in response.get("SecretValues", []):
+                    secret_ids = {secret.get("Name"), secret.get("ARN")}.intersection(missing)
+                    secrets.update(dict.fromkeys(secret_ids, json.loads(secret["SecretString"])))
+                for error in response.get("Errors", []):
+                    logger.warning("Failed to prefetch secret %s: %s", error.get("SecretId"), error.get("Message"))
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+        except (BotoCoreError, ClientError) as e:
+            logger.warning("Batched secret retrieval failed, secrets will be fetched individually: %s", e)
+
+        self._store(secrets)
+        return secrets
+
+
+def secrets_cache_from_env(client_getter):
+    """Build the secrets cache from environment variables.
+
+    Args:
+        client_getter (callable): Returns the Secrets Manager client.
+
+    Returns:
+        SecretsCache: The configured cache.
+    """
+    return SecretsCache(
+        client_getter,
+        ttl=float(os.environ.get("SECRETS_CACHE_TTL_SECONDS", "3600")),
+        refresh_ahead=float(os.environ.get("SECRETS_CACHE_REFRESH_SECONDS", "300")),
+        path=os.environ.get("SECRETS_CACHE_PATH"),
+        encryption_key=os.environ.get("SECRETS_CACHE_ENCRYPTION_KEY"),
+    )
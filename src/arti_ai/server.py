@@ -0,0 +1,226 @@
+"""Long-running arti server for container hosts, keeping apps, clients, caches and indexes warm between requests.
+
+The Slack Bolt app is served over HTTP by a WSGI server with a bounded pool of worker threads, or connected to Slack
+through Socket Mode. Either way `/healthz` reports readiness and `/metrics` the counters of the server and of the
+warm Embedchain app pool and caches, as JSON.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from arti_ai import app as arti_app
+from arti_ai.startup import profiler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+HTTP_STATUS = {200: "200 OK", 404: "404 Not Found", 503: "503 Service Unavailable"}
+
+
+class ServerMetrics:
+    """Request counters of the server, by route and status."""
+
+    def __init__(self):
+        """Initialize the counters, starting the uptime clock."""
+        self.started_at = time.monotonic()
+        self.in_flight = 0
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Count a request being handled."""
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, route, status):
+        """Count a handled request."""
+        key = f"{route} {status.split(' ', 1)[0]}"
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def snapshot(self):
+        """Return the counters."""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+                "in_flight": self.in_flight,
+                "requests": dict(self.requests),
+            }
+
+
+def app_metrics(question_queue=None):
+    """Return the counters of the warm Embedchain app pool, caches and question queue."""
+    metrics = {"app_pool": arti_app.app_pool.stats()}
+    for name in ("answer_cache", "embedding_cache"):
+        cache = getattr(arti_app, name)
+        if cache is not None:
+            metrics[name] = cache.stats()
+    if question_queue is not None and hasattr(question_queue, "__len__"):
+        metrics["queued_questions"] = len(question_queue)
+    return metrics
+
+
+def warm():
+    """Build the pooled Embedchain app before serving, so the first question does not pay for it.
+
+    Returns:
+        bool: Whether the app was built; failures are logged and left for the first question to retry.
+    """
+    try:
+        with profiler.phase("warm"):
+            arti_app.get_app()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Warming the Embedchain app failed: %s", e)
+        return False
+    return True
+
+
+def create_wsgi_app(slack_handler, metrics, checks, question_queue=None):
+    """Return the WSGI application routing Slack requests and serving the health and metrics endpoints.
+
+    Args:
+        slack_handler (callable): WSGI application of the Slack Bolt app, or None in Socket Mode.
+        metrics (ServerMetrics): The request counters.
+        checks (dict): Maps the name of each readiness check to a callable returning whether it passes.
+        question_queue: The question queue, whose depth is reported when it has one.
+    """
+
+    def respond_json(start_response, status, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        start_response(HTTP_STATUS[status], [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def route(environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path == "/healthz":
+            results = {name: bool(check()) for name, check in checks.items()}
+            status = 200 if all(results.values()) else 503
+            return respond_json(start_response, status, {"status": "ok" if status == 200 else "unavailable", **results})
+        if path == "/metrics":
+            return respond_json(start_response, 200, {**metrics.snapshot(), **app_metrics(question_queue)})
+        if slack_handler is not None and path == "/slack/events":
+            return slack_handler(environ, start_response)
+        return respond_json(start_response, 404, {"error": "not_found"})
+
+    def application(environ, start_response):
+        statuses = []
+
+        def counted_start_response(status, headers, exc_info=None):
+            statuses.append(status)
+            return start_response(status, headers, exc_info)
+
+        metrics.start()
+        try:
+            return route(environ, counted_start_response)
+        finally:
+            metrics.finish(environ.get("PATH_INFO", ""), statuses[-1] if statuses else "500")
+
+    return application
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI server handling requests on a bounded pool of worker threads."""
+
+    def __init__(self, server_address, handler_class, workers=8, bind_and_activate=True):
+        """Initialize the server.
+
+        Args:
+            server_address (tuple): Host and port to listen on.
+            handler_class (type): The request handler class.
+            workers (int): Requests handled at once.
+            bind_and_activate (bool): Whether to bind and listen right away.
+        """
+        super().__init__(server_address, handler_class, bind_and_activate=bind_and_activate)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arti-serve")
+
+    def process_request(self, request, client_address):
+        """Handle a request on the worker pool."""
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        """Handle a request and close its connection."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stop listening and wait for the requests being handled."""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler logging requests at debug level instead of printing them to stderr."""
+
+    def log_message(self, format, *args):
+        """Log a request."""
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(application, host="0.0.0.0", port=8080, workers=8):  # nosec B104
+    """Return a pooled WSGI server for an application, listening on `host` and `port`."""
+    return make_server(
+        host,
+        port,
+        application,
+        server_class=functools.partial(PooledWSGIServer, workers=workers),
+        handler_class=QuietRequestHandler,
+    )
+
+
+def serve(mode="http", host="0.0.0.0", port=8080, workers=8):  # nosec B104
+    """Serve the Slack app until interrupted, with the health and metrics endpoints.
+
+    Args:
+        mode (str): `http` to receive Slack requests on `/slack/events`, or `socket` to connect through Socket Mode
+            with the app-level token in `SLACK_APP_TOKEN`.
+        host (str): Host the HTTP server listens on.
+        port (int): Port the HTTP server listens on.
+        workers (int): HTTP requests handled at once.
+    """
+    with profiler.phase("import arti_ai.slack_app"):
+        # pylint: disable=import-outside-toplevel
+        from arti_ai import slack_app
+
+        # pylint: enable=import-outside-toplevel
+    warm()
+
+    checks = {"app": lambda: arti_app.app_pool.stats()["size"] > 0 or warm()}
+    socket_handler = slack_handler = None
+    if mode == "socket":
+        # pylint: disable=import-outside-toplevel
+        from slack_bolt.adapter.socket_mode import SocketModeHandler
+
+        # pylint: enable=import-outside-toplevel
+        socket_handler = SocketModeHandler(slack_app.app, os.environ["SLACK_APP_TOKEN"])
+        socket_handler.connect()
+        checks["socket_mode"] = socket_handler.client.is_connected
+    else:
+        # pylint: disable=import-outside-toplevel
+        from slack_bolt.adapter.wsgi import SlackRequestHandler
+
+        # pylint: enable=import-outside-toplevel
+        slack_handler = SlackRequestHandler(slack_app.app)
+
+    application = create_wsgi_app(slack_handler, ServerMetrics(), checks, question_queue=slack_app.question_queue)
+    server = create_server(application, host=host, port=port, workers=workers)
+    profiler.emit_once()
+    logger.info("Serving arti on %s:%d in %s mode with %d workers", host, port, mode, workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping arti")
+    finally:
+        server.server_close()
+        if socket_handler is not None:
+            socket_handler.close()
@@ -1,18 +1,175 @@
 """Slackbot entrypoint to arti."""
 
+import functools
 import json
+import logging
 import os
+import threading
+import time
 from pathlib import Path
 
 import boto3
 import requests
+from requests.adapters import HTTPAdapter
 from slack_bolt import App
+from slack_sdk.errors import SlackApiError
 
 from arti_ai.app import ask_ai, config, list_data_sources
+from arti_ai.idempotency import idempotency_store_from_env, idempotent, request_key
+from arti_ai.question_queue import make_job, question_queue_from_env
+from arti_ai.startup import profiler
+from arti_ai.streaming import answer_text
+from arti_ai.tracing import get_current_span, tracer
+
+with profiler.phase("init slack credentials"):
+    config.prefetch_secrets()
+    slack_bot_token, slack_bot_signing_secret = config.get_slack_credentials()
+with profiler.phase("init slack_bolt.App"):
+    app = App(process_before_response=True, token=slack_bot_token, signing_secret=slack_bot_signing_secret)
+
+# Lazy listeners run again when Slack retries a request or Lambda retries their invocation
+idempotency_store = idempotency_store_from_env()
+# Questions are answered by the queue's worker when one is configured, instead of in the lazy listeners
+question_queue = question_queue_from_env()
+
+
+# Errors after which the cached bot identity may belong to a revoked or rotated token
+AUTH_ERRORS = {"account_inactive", "invalid_auth", "not_authed", "token_expired", "token_revoked"}
+# Replaces an empty streamed answer, since Slack rejects a message update without text
+EMPTY_ANSWER = "Sorry, I could not come up with an answer."
+
+
+def count_slack_http_call(response, *args, **kwargs):  # pylint: disable=unused-argument
+    """Count a direct HTTP call to Slack on the active span; a `requests` response hook."""
+    get_current_span().add("slack_http_calls")
+
+
+@functools.cache
+def get_http_session():
+    """Return the HTTP session shared by direct Slack HTTP calls, keeping connections to Slack open."""
+    session = requests.Session()
+    pool_size = int(os.getenv("SLACK_HTTP_POOL_SIZE", "10"))
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    session.hooks["response"].append(count_slack_http_call)
+    return session
+
+
+class SlackIdentity:
+    """The bot's Slack identity, as returned by `auth.test`, resolved once per container and token."""
+
+    def __init__(self, token_provider):
+        """Initialize the cache.
+
+        Args:
+            token_provider (callable): Returns the current bot token, so a rotated token is resolved again.
+        """
+        self.token_provider = token_provider
+        self._token = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def remember(self, token, identity):
+        """Cache the identity of a token, e.g. the one Bolt resolved when authorizing a request."""
+        with self._lock:
+            self._token, self._identity = token, dict(identity)
+
+    def invalidate(self):
+        """Forget the identity, so the next lookup calls `auth.test` again."""
+        with self._lock:
+            self._token = self._identity = None
+
+    def peek(self):
+        """Return the cached identity of the current token without calling `auth.test`, or an empty dict."""
+        token = self.token_provider()
+        with self._lock:
+            return self._identity if self._identity is not None and self._token == token else {}
+
+    def get(self):
+        """Return the identity of the current token, calling `auth.test` only when it is not cached.
+
+        Returns:
+            dict: The `auth.test` response, e.g. `user_id`, `bot_id` and `team_id`, or an empty dict on failure.
+        """
+        token = self.token_provider()
+        with self._lock:
+            if self._identity is not None and self._token == token:
+                return self._identity
+
+        response = get_http_session().post(
+            "https://slack.com/api/auth.test", headers={"Authorization": f"Bearer {token}"}, timeout=30
+        )
+        identity = response.json() if response.status_code == 200 else {}
+        if not identity.get("ok"):
+            logging.getLogger(__name__).warning(
+                "Slack auth.test failed: %s", identity.get("error", response.status_code)
+            )
+            return {}
+        self.remember(token, identity)
+        return identity
+
+    @property
+    def bot_user_id(self):
+        """Return the bot's user id, or None if it cannot be resolved."""
+        return self.get().get("user_id")
+
+
+slack_identity = SlackIdentity(lambda: slack_bot_token)
+
+
+@app.middleware
+def instrument_slack_request(context, body, next_):
+    """Trace each Slack request, counting its Slack API calls, and keep the bot identity Bolt resolved."""
+    if context.bot_token and context.bot_user_id:
+        slack_identity.remember(
+            context.bot_token, {"user_id": context.bot_user_id, "bot_id": context.bot_id, "team_id": context.team_id}
+        )
+
+    client = context.client
+    api_call = client.api_call
+
+    def counted_api_call(api_method, **kwargs):
+        span = get_current_span()
+        span.add("slack_api_calls")
+        span.add(f"slack_api.{api_method}")
+        return api_call(api_method, **kwargs)
+
+    client.api_call = counted_api_call
+    request_type = (body.get("event") or {}).get("type") or body.get("command") or body.get("type")
+    with tracer.span("slack.request", request_type=request_type):
+        next_()
+
+
+def forget_identity_on_auth_error(error):
+    """Invalidate the cached bot identity when a Slack API error says its token is no longer valid."""
+    if isinstance(error, SlackApiError) and error.response.get("error") in AUTH_ERRORS:
+        slack_identity.invalidate()
+
+
+@app.error
+def handle_listener_error(error, logger):
+    """Log an error raised by a listener or its ack function, forgetting the bot identity on auth errors."""
+    forget_identity_on_auth_error(error)
+    logger.exception(f"Failed to run listener function (error: {error})")
+
+
+def forgets_identity_on_auth_error(function):
+    """Decorate a lazy listener to invalidate the cached bot identity on auth errors, which Bolt only logs."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except SlackApiError as e:
+            forget_identity_on_auth_error(e)
+            raise
 
-slack_bot_token, slack_bot_signing_secret = config.get_slack_credentials()
-app = App(process_before_response=True, token=slack_bot_token, signing_secret=slack_bot_signing_secret)
-s3_client = boto3.client("s3", region_name=os.environ["AWS_REGION"])
+    return wrapper
+
+
+@functools.cache
+def get_s3_client():
+    """Return the S3 client, created on first use rather than at import."""
+    return boto3.client("s3", region_name=os.environ["AWS_REGION"])
 
 
 def format_as_block_kit(summary, details):
@@ -44,16 +201,76 @@ def format_as_block_kit(summary, details):
     return message
 
 
-def get_bot_user_id():
-    """Get the bot user id."""
-    response = requests.post(
-        "https://slack.com/api/auth.test", headers={"Authorization": f"Bearer {slack_bot_token}"}, timeout=30
-    )
-    if response.status_code == 200 and response.json()["ok"]:
-        return response.json()["user_id"]
+def streaming_enabled():
+    """Return whether answers are streamed into Slack messages as they are generated."""
+    return os.getenv("SLACK_STREAMING_ENABLED", "false").lower() == "true"
+
+
+def retry_after(error, default=1.0):
+    """Return the seconds to wait after a rate limited Slack API call, or None for any other error."""
+    if error.response.status_code != 429 and error.response.get("error") != "ratelimited":
+        return None
+    return float(error.response.headers.get("Retry-After", default))
+
+
+def call_with_backoff(function, *args, attempts=3, **kwargs):
+    """Call a Slack API method, waiting out rate limits before retrying."""
+    for attempt in range(attempts):
+        try:
+            return function(*args, **kwargs)
+        except SlackApiError as e:
+            wait = retry_after(e)
+            if wait is None or attempt == attempts - 1:
+                raise
+            time.sleep(wait)
     return None
 
 
+def stream_answer(answer_stream, update, interval=None, max_updates=None):
+    """
+    Show a streamed answer growing in a Slack message.
+
+    The partial text is sent through `update` at most once per `interval` seconds; a rate limited update pushes the
+    next one back by the Retry-After delay instead of blocking the stream. The caller sends the final text.
+
+    Args:
+        answer_stream (Iterable[str]): Tokens of the answer.
+        update (callable): Replaces the message text.
+        interval (float): Minimum seconds between updates, `SLACK_STREAM_UPDATE_SECONDS` by default.
+        max_updates (int): Maximum number of partial updates, for channels allowing a limited number of edits.
+
+    Returns:
+        str: The complete answer text.
+    """
+    if interval is None:
+        interval = float(os.getenv("SLACK_STREAM_UPDATE_SECONDS", "1.0"))
+
+    text = ""
+    updates = 0
+    next_update_at = 0.0
+    for token in answer_stream:
+        text += token
+        now = time.monotonic()
+        if now < next_update_at or not text.strip() or (max_updates is not None and updates >= max_updates):
+            continue
+        try:
+            update(text)
+            updates += 1
+            next_update_at = now + interval
+        except SlackApiError as e:
+            wait = retry_after(e, default=interval)
+            if wait is None:
+                raise
+            logging.getLogger(__name__).warning("Slack rate limited streamed updates, waiting %s seconds", wait)
+            next_update_at = now + wait
+    return text
+
+
+def get_bot_user_id():
+    """Get the bot user id, from the identity cache."""
+    return slack_identity.bot_user_id
+
+
 def ack_arti_request(ack):
     """Ack arti request."""
     ack("Thinking...")
@@ -79,10 +296,13 @@ def ack_smarti_request(ack):
     ack()
 
 
-def handle_app_mention(event, say, client):
+@forgets_identity_on_auth_error
+@idempotent(idempotency_store)
+@tracer.traced("slack.handle_app_mention")
+def handle_app_mention(event, say, client, body=None):
     """Handle bot mentions."""
     text = event["text"]
-    bot_user_id = client.auth_test()["user_id"]
+    bot_user_id = slack_identity.bot_user_id
 
     # Strip the mention of the bot to isolate the command and arguments
     command_text = text.split(f"<@{bot_user_id}>")[1].strip() if f"<@{bot_user_id}>" in text else text
@@ -98,7 +318,17 @@ def handle_app_mention(event, say, client):
     args = parts[1] if len(parts) > 1 else ""
 
     if command == "ask":
-        if args:
+        if args and question_queue is not None:
+            question_queue.send(make_job(args, id=request_key(body), channel=event["channel"]))
+        elif args and streaming_enabled():
+            message = say("Thinking...")
+
+            def update(text):
+                client.chat_update(channel=message["channel"], ts=message["ts"], text=text)
+
+            answer = stream_answer(ask_ai(question=args, stream=True), update)
+            call_with_backoff(update, answer if answer.strip() else EMPTY_ANSWER)
+        elif args:
             response = ask_ai(question=args)
             say(response)
         else:
@@ -109,9 +339,28 @@ def handle_app_mention(event, say, client):
         say(f"Sorry, I don't recognize the command `{command}`.")
 
 
+@forgets_identity_on_auth_error
+@idempotent(idempotency_store)
+@tracer.traced("slack.handle_arti_request")
 def handle_arti_request(respond, body):
     """Process the request and respond to the user."""
     question = body["text"]
+    if question_queue is not None:
+        question_queue.send(
+            make_job(question, id=request_key(body), response_url=body["response_url"], prefix=f"Q: _{question}_ A: ")
+        )
+        return
+
+    if streaming_enabled():
+
+        def update(text):
+            respond(text=f"Q: _{question}_ A: {text}", replace_original=True)
+
+        # A response_url accepts five messages, so keep one for the final answer.
+        answer = stream_answer(ask_ai(question=question, stream=True), update, max_updates=4)
+        update(answer)
+        return
+
     response = ask_ai(question=question)
     respond(f"Q: _{question}_ A: {response}")
 
@@ -149,9 +398,11 @@ def handle_app_home_opened(client, event, logger):
 
         client.views_publish(user_id=event["user"], view={"type": "home", "blocks": blocks})
     except Exception as e:  # pylint: disable=broad-exception-caught
+        forget_identity_on_auth_error(e)
         logger.error(f"Failed to publish Home tab: {e}")
 
 
+@tracer.traced("slack.handle_file_uploads")
 def handle_file_uploads(event, say, client, logger):
     """Handle file uploads by bridging to S3."""
     file_id = event["file"]["id"]
@@ -162,10 +413,12 @@ def handle_file_uploads(event, say, client, logger):
         file_url = file_info["url_private_download"]
 
         headers = {"Authorization": f"Bearer {slack_bot_token}"}
-        response = requests.get(file_url, headers=headers, stream=True, timeout=30)
+        response = get_http_session().get(file_url, headers=headers, stream=True, timeout=30)
 
         if response.status_code == 200:
-            s3_client.upload_fileobj(Fileobj=response.raw, Bucket=os.getenv("APP_BUCKET_NAME"), Key=file_info["name"])
+            get_s3_client().upload_fileobj(
+                Fileobj=response.raw, Bucket=os.getenv("APP_BUCKET_NAME"), Key=file_info["name"]
+            )
 
             # Fetch recent messages to find the correct timestamp
             messages = client.conversations_history(channel=channel_id, limit=10)["messages"]
@@ -184,6 +437,7 @@ def handle_file_uploads(event, say, client, logger):
             logger.error("No valid message found for reaction.")
 
     except Exception as e:  # pylint: disable=broad-exception-caught
+        forget_identity_on_auth_error(e)
         logger.error(f"Error processing file: {str(e)}")
         # Use the initially captured message_ts if available for error handling in thread
         if "message_ts" in locals():
@@ -197,7 +451,7 @@ def handle_list_s3_objects(ack, body, client, logger):
     """Handle button click to list S3 objects."""
     ack()
     try:
-        response = s3_client.list_objects_v2(Bucket=os.getenv("APP_BUCKET_NAME"))
+        response = get_s3_client().list_objects_v2(Bucket=os.getenv("APP_BUCKET_NAME"))
         objects = response.get("Contents", [])
         if not objects:
             message_text = "No objects found in the S3 bucket."
@@ -207,6 +461,7 @@ def handle_list_s3_objects(ack, body, client, logger):
         # Update the message to show the objects or a not-found message
         client.chat_postMessage(channel=body["user"]["id"], text=message_text)
     except Exception as e:  # pylint: disable=broad-exception-caught
+        forget_identity_on_auth_error(e)
         logger.error(f"Error listing S3 objects: {e}")
         client.chat_postMessage(channel=body["user"]["id"], text="Failed to list objects in S3.")
 
@@ -254,6 +509,8 @@ def open_smarti_modal(ack, body, client):
     client.views_open(trigger_id=body["trigger_id"], view=modal_view)
 
 
+@idempotent(idempotency_store)
+@tracer.traced("slack.handle_smarti_submission")
 def handle_smarti_submission(client, logger, body, view):  # pylint: disable=R0914
     """Handle smarti submission."""
     logger.info("Handling smarti submission")
@@ -270,7 +527,8 @@ def handle_smarti_submission(client, logger, body, view):  # pylint: disable=R09
         citation_options = values["citations"]["input"].get("selected_options", [])
         citations = any(option["value"] == "true" for option in citation_options)
 
-        ai_response = ask_ai(
+        ask = functools.partial(
+            ask_ai,
             question=question,
             model=model,
             temperature=temperature,
@@ -285,17 +543,43 @@ def handle_smarti_submission(client, logger, body, view):  # pylint: disable=R09
         if not channel_id:
             channel_id = body["user"]["id"]
 
+        placeholder = None
+        if streaming_enabled():
+            # Post a placeholder right away and grow it while the answer is generated
+            answer_stream = ask(stream=True)
+            placeholder = client.chat_postMessage(channel=channel_id, text="Thinking...")
+
+            def update(text):
+                client.chat_update(channel=placeholder["channel"], ts=placeholder["ts"], text=text)
+
+            stream_answer(answer_stream, update)
+            ai_response = answer_stream.response
+        else:
+            ai_response = ask()
+
+        details = []
         if isinstance(ai_response, tuple) and len(ai_response) == 2:
             summary, details = ai_response
             initial_response = format_as_block_kit(summary, [])  # Send only summary initially
         else:
             initial_response = {"text": ai_response}
 
-        # Post the initial summary to the channel or user DM
-        result = client.chat_postMessage(
-            channel=channel_id, blocks=initial_response.get("blocks"), text=initial_response.get("text")
-        )
-        thread_ts = result["ts"]  # Timestamp of the message to start threading
+        if placeholder is not None:
+            # Replace the streamed text with the final summary
+            call_with_backoff(
+                client.chat_update,
+                channel=placeholder["channel"],
+                ts=placeholder["ts"],
+                blocks=initial_response.get("blocks"),
+                text=initial_response.get("text") or answer_text(ai_response),
+            )
+            thread_ts = placeholder["ts"]
+        else:
+            # Post the initial summary to the channel or user DM
+            result = client.chat_postMessage(
+                channel=channel_id, blocks=initial_response.get("blocks"), text=initial_response.get("text")
+            )
+            thread_ts = result["ts"]  # Timestamp of the message to start threading
 
         if isinstance(ai_response, tuple) and details:
             # If details are available, post them in a thread
@@ -303,6 +587,7 @@ def handle_smarti_submission(client, logger, body, view):  # pylint: disable=R09
             client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, blocks=detailed_response.get("blocks"))
 
     except Exception as e:  # pylint: disable=broad-exception-caught
+        forget_identity_on_auth_error(e)
         logger.error(f"Error handling modal submission: {e}")
         user_id = body.get("user", {}).get("id", "default_user_id")
         client.chat_postMessage(channel=user_id, text="Failed to process your request. Please try again.")
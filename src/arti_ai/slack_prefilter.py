@@ -0,0 +1,161 @@
+"""Cheap filtering of Slack events before they reach Bolt.
+
+Events arti never acts on, such as bot messages or reactions on other users' messages, and Slack retries of events
+already handled are acknowledged straight away, skipping request verification, authorization and listener dispatch.
+Requests Bolt must see, e.g. slash commands, interactions and its own lazy listener invocations, always pass.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecentEvents:
+    """Ids of the Slack events handled recently, each kept for a time to live and capped in number."""
+
+    def __init__(self, ttl_seconds=600, max_entries=1024):
+        """Initialize the cache.
+
+        Args:
+            ttl_seconds (float): Seconds an event id is remembered; Slack retries within a few minutes.
+            max_entries (int): Number of event ids remembered, the oldest being forgotten first.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        """Forget the event ids older than the time to live."""
+        while self._seen and (next(iter(self._seen.values())) <= now - self.ttl_seconds):
+            self._seen.popitem(last=False)
+
+    def add(self, event_id):
+        """Remember an event id."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._seen.pop(event_id, None)
+            self._seen[event_id] = now
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+
+    def __contains__(self, event_id):
+        """Return whether an event id was handled within the time to live."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return event_id in self._seen
+
+    def __len__(self):
+        """Return the number of event ids remembered."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._seen)
+
+
+def lower_headers(event):
+    """Return the headers of an API Gateway event with lowercase names."""
+    return {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+
+
+def decode_body(event):
+    """Return the body of an API Gateway event as text."""
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    return body
+
+
+def event_callback(event):
+    """Return the Events API payload of an API Gateway event, or None for other requests or unparsable bodies."""
+    body = decode_body(event)
+    # Slash commands and interactions are form encoded, only the Events API posts JSON
+    if not body.lstrip().startswith("{"):
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) and payload.get("type") == "event_callback" else None
+
+
+def ignored_event_reason(slack_event, bot_user_id=None):
+    """Return why arti's listeners would ignore a Slack event, or None if they may act on it.
+
+    Args:
+        slack_event (dict): The `event` of an Events API payload.
+        bot_user_id (str): The bot's user id, or None when it is not known yet.
+    """
+    event_type = slack_event.get("type")
+    if event_type == "message" and (slack_event.get("bot_id") or slack_event.get("subtype")):
+        return "bot_message"
+    if event_type == "reaction_added" and bot_user_id and slack_event.get("item_user") != bot_user_id:
+        return "reaction_not_on_bot_message"
+    return None
+
+
+class EventPrefilter:
+    """Acknowledge Slack requests arti would ignore or has already answered, without dispatching them."""
+
+    def __init__(self, recent_events=None):
+        """Initialize the prefilter.
+
+        Args:
+            recent_events (RecentEvents): Ids of the events handled recently, or None to not deduplicate retries.
+        """
+        self.recent_events = recent_events
+
+    def check(self, event, bot_user_id=None):
+        """Return why a request can be acknowledged without dispatching it, and the id of its Slack event.
+
+        Args:
+            event (dict): The API Gateway event.
+            bot_user_id (str): The bot's user id, or None when it is not known yet.
+
+        Returns:
+            tuple[str | None, str | None]: The reason to skip the request or None, and the Slack event id if any.
+        """
+        headers = lower_headers(event)
+        if headers.get("x-slack-bolt-lazy-only"):
+            # Bolt invoking its lazy listeners with the original request, which carries the same event id
+            return None, None
+        if headers.get("x-slack-retry-num") and headers.get("x-slack-retry-reason") == "http_timeout":
+            # The first delivery timed out waiting for its acknowledgement, but is still being handled
+            return "retry_after_timeout", None
+
+        payload = event_callback(event)
+        if payload is None:
+            return None, None
+        event_id = payload.get("event_id")
+        if self.recent_events is not None and event_id and event_id in self.recent_events:
+            return "duplicate_event", event_id
+        return ignored_event_reason(payload.get("event") or {}, bot_user_id), event_id
+
+    def handled(self, event_id, response):
+        """Remember an event Bolt accepted, so its retries are skipped.
+
+        Only events Bolt acknowledged are remembered: their signature was verified, so forged requests cannot
+        suppress genuine events.
+        """
+        if self.recent_events is not None and event_id and (response or {}).get("statusCode") == 200:
+            self.recent_events.add(event_id)
+
+
+def skipped_response():
+    """Return the acknowledgement of a skipped request, asking Slack not to retry it."""
+    return {"statusCode": 200, "headers": {"X-Slack-No-Retry": "1"}, "body": ""}
+
+
+def prefilter_from_env():
+    """Build the Slack event prefilter from environment variables.
+
+    Returns:
+        EventPrefilter | None: The prefilter, or None when `SLACK_EVENT_PREFILTER` disables it.
+    """
+    if os.environ.get("SLACK_EVENT_PREFILTER", "true").lower() != "true":
+        return None
+    ttl_seconds = float(os.environ.get("SLACK_EVENT_DEDUPE_TTL_SECONDS", "600"))
+    return EventPrefilter(RecentEvents(ttl_seconds) if ttl_seconds > 0 else None)
@@ -0,0 +1,146 @@
+"""In-memory indexes snapshotted to one S3 object, merging the snapshots of concurrent writers."""
+
+import abc
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ATTEMPTS = 5
+SNAPSHOT_CONFLICT_CODES = ("412", "PreconditionFailed", "409", "ConditionalRequestConflict")
+
+
+class SnapshottedIndex(abc.ABC):
+    """Index held in memory, saved to local files and optionally snapshotted to S3.
+
+    Changes go through `_record`, which applies the change `_<operation>` and remembers it until it is part of an
+    uploaded snapshot. A container that only queries reloads the snapshot when its ETag changes, checked at most
+    every `refresh_seconds`, so it picks up changes made elsewhere. Changes made since the last snapshot are
+    replayed on top of a reloaded snapshot, so containers writing at the same time do not overwrite each other.
+    """
+
+    snapshot_name = "index"
+
+    def __init__(self, snapshot_url=None, refresh_seconds=300):
+        """Initialize the snapshot state.
+
+        Args:
+            snapshot_url (str): Optional S3 bucket and key of the snapshot.
+            refresh_seconds (float): Minimum seconds between checks for a newer snapshot, or None to never check.
+        """
+        self.snapshot_url = snapshot_url
+        self.refresh_seconds = refresh_seconds
+        self._etag: str | None = None
+        self._pending: list[tuple[str, tuple[object, ...]]] = []
+        self._checked_at = time.monotonic()
+        self._lock = threading.RLock()
+
+    @abc.abstractmethod
+    def save(self):
+        """Atomically write the local files."""
+
+    @abc.abstractmethod
+    def _load_snapshot(self, payload: bytes) -> None:
+        """Replace the index with a downloaded snapshot; called holding the lock."""
+
+    @abc.abstractmethod
+    def _save_snapshot(self) -> bytes:
+        """Write the local files and return the snapshot to upload; called holding the lock."""
+
+    def _record(self, operation, *args):
+        """Apply a change, remembering it until the next snapshot when snapshots are configured."""
+        with self._lock:
+            getattr(self, f"_{operation}")(*args)
+            if self.snapshot_url:
+                self._pending.append((operation, args))
+
+    def _replay(self):
+        """Apply the changes made since the last snapshot again, e.g. after loading a newer snapshot."""
+        with self._lock:
+            for operation, args in self._pending:
+                getattr(self, f"_{operation}")(*args)
+
+    def _s3_location(self):
+        """Return the S3 client, bucket and key of the snapshot."""
+        # pylint: disable=import-outside-toplevel
+        import boto3
+
+        # pylint: enable=import-outside-toplevel
+        bucket_name, key = self.snapshot_url.split("/", 1)
+        return boto3.client("s3"), bucket_name, key
+
+    def restore(self):
+        """Load the S3 snapshot unless it is the one already loaded.
+
+        Returns:
+            bool: Whether a snapshot was loaded.
+        """
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import ClientError  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        s3_client, bucket_name, key = self._s3_location()
+        conditions = {"IfNoneMatch": self._etag} if self._etag else {}
+        try:
+            response = s3_client.get_object(Bucket=bucket_name, Key=key, **conditions)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("304", "NotModified"):
+                logger.info("No %s snapshot restored from %s: %s", self.snapshot_name, self.snapshot_url, e)
+            return False
+        payload = response["Body"].read()
+        with self._lock:
+            self._load_snapshot(payload)
+            self._replay()
+            self._etag = response.get("ETag")
+        logger.info("Restored %s snapshot from %s", self.snapshot_name, self.snapshot_url)
+        return True
+
+    def refresh(self):
+        """Reload a newer S3 snapshot, checking at most once every `refresh_seconds`."""
+        if not self.snapshot_url or self.refresh_seconds is None:
+            return False
+        if time.monotonic() - self._checked_at < self.refresh_seconds:
+            return False
+        self._checked_at = time.monotonic()
+        return self.restore()
+
+    def snapshot(self):
+        """Save the local files and upload the snapshot to S3, if a snapshot location is configured.
+
+        The changes made here are merged into the latest snapshot first, and the upload is conditioned on that
+        snapshot's ETag, so a snapshot uploaded meanwhile by another container is merged again, not overwritten.
+
+        Raises:
+            RuntimeError: If the snapshot kept changing during `SNAPSHOT_ATTEMPTS` uploads.
+        """
+        if not self.snapshot_url:
+            self.save()
+            return False
+
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import ClientError  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        s3_client, bucket_name, key = self._s3_location()
+        for _ in range(SNAPSHOT_ATTEMPTS):
+            self.restore()
+            with self._lock:
+                merged = len(self._pending)
+                payload = self._save_snapshot()
+                conditions = {"IfMatch": self._etag} if self._etag else {"IfNoneMatch": "*"}
+            try:
+                response = s3_client.put_object(Bucket=bucket_name, Key=key, Body=payload, **conditions)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in SNAPSHOT_CONFLICT_CODES:
+                    raise
+                logger.info(
+                    "The %s snapshot %s changed during the upload, merging again", self.snapshot_name, self.snapshot_url
+                )
+                continue
+            with self._lock:
+                self._etag = response.get("ETag")
+                del self._pending[:merged]
+            logger.info("Saved %s snapshot to %s", self.snapshot_name, self.snapshot_url)
+            return True
+        raise RuntimeError(f"The {self.snapshot_name} snapshot {self.snapshot_url} kept changing, it was not saved")
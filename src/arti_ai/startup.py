@@ -0,0 +1,113 @@
+"""Cold-start profiling and opt-in pre-warming for the Lambda handlers."""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class StartupProfiler:
+    """Record how long each import and initialisation step of a cold start takes.
+
+    Phases may nest; each records its inclusive duration and the packages it loaded for the first time, and the
+    whole breakdown is logged as a single JSON line on the first invocation.
+    """
+
+    def __init__(self):
+        """Initialize the profiler, starting the clock."""
+        self.started_at = time.perf_counter()
+        self.phases = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a startup phase.
+
+        Args:
+            name (str): Name of the phase, e.g. `import arti_ai.slack_app` or `init slack_bolt.App`.
+        """
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            packages = {}
+            for module in set(sys.modules) - modules_before:
+                package = module.split(".", 1)[0]
+                packages[package] = packages.get(package, 0) + 1
+            with self._lock:
+                self.phases.append(
+                    {
+                        "name": name,
+                        "seconds": round(seconds, 6),
+                        "offset_seconds": round(start - self.started_at, 6),
+                        "modules_loaded": packages,
+                    }
+                )
+
+    def report(self):
+        """Return the startup breakdown.
+
+        Returns:
+            dict: The phases in the order they finished, and the seconds from profiler start to the report.
+        """
+        with self._lock:
+            return {
+                "event": "cold_start",
+                "seconds_to_first_invocation": round(time.perf_counter() - self.started_at, 6),
+                "phases": list(self.phases),
+            }
+
+    def report_on_first_call(self, handler):
+        """Decorate a Lambda handler so the startup breakdown is logged on its first invocation."""
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            self.emit_once()
+            return handler(*args, **kwargs)
+
+        return wrapper
+
+    def emit_once(self):
+        """Log the startup breakdown on the first invocation only."""
+        with self._lock:
+            if self.reported:
+                return
+            self.reported = True
+        logger.info(json.dumps(self.report()))
+
+
+profiler = StartupProfiler()
+
+
+def prewarm(build_app):
+    """Build the pooled Embedchain app during Lambda's init phase when `ARTI_PREWARM` is true.
+
+    Credentials, the Embedchain app and its vector database connection are then ready before the first event.
+    Failures are logged and left for the first invocation to retry.
+
+    Args:
+        build_app (callable): Returns the pooled app, building it on first use.
+
+    Returns:
+        bool: Whether the app was pre-warmed.
+    """
+    if os.environ.get("ARTI_PREWARM", "false").lower() != "true":
+        return False
+
+    try:
+        with profiler.phase("prewarm"):
+            build_app()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Pre-warming failed: %s", e)
+        return False
+    return True
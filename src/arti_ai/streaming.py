@@ -0,0 +1,84 @@
+"""Stream answers token by token while the LLM generates them."""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def token_callback_handler(tokens):
+    """Return a LangChain callback handler putting every new LLM token on a queue.
+
+    Args:
+        tokens (queue.Queue): The queue receiving tokens.
+    """
+    # pylint: disable=import-outside-toplevel
+    from langchain_core.callbacks import BaseCallbackHandler  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+
+    class TokenQueueCallbackHandler(BaseCallbackHandler):  # pylint: disable=abstract-method
+        """Forward streamed tokens to a queue."""
+
+        def on_llm_new_token(self, token, **kwargs):
+            """Queue a new token."""
+            tokens.put(token)
+
+    return TokenQueueCallbackHandler()
+
+
+def answer_text(response):
+    """Return the text of an answer that may carry citations."""
+    return response[0] if isinstance(response, tuple) else response
+
+
+class AnswerStream:  # pylint: disable=too-few-public-methods
+    """Iterate over the tokens of an answer as they are generated.
+
+    The query runs on a background thread with a callback handler feeding a queue, which the iterator drains. Once
+    exhausted, `response` holds the complete answer, with citations when they were requested. A query that produces
+    no tokens, such as a cached answer, yields its whole text at once.
+    """
+
+    def __init__(self, query, on_complete=None):
+        """Initialize the stream.
+
+        Args:
+            query (callable): Runs the query given a list of LangChain callbacks, returning the complete response.
+            on_complete (callable): Called with the complete response once the stream is exhausted.
+        """
+        self.query = query
+        self.on_complete = on_complete
+        self.response = None
+
+    def __iter__(self):
+        """Yield answer tokens while the query runs."""
+        tokens = queue.Queue()
+        errors = []
+
+        def run():
+            try:
+                self.response = self.query([token_callback_handler(tokens)])
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                errors.append(e)
+            finally:
+                tokens.put(_DONE)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        streamed = False
+        while (token := tokens.get()) is not _DONE:
+            streamed = True
+            yield token
+        thread.join()
+
+        if errors:
+            raise errors[0]
+        if not streamed and self.response:
+            yield answer_text(self.response)
+        if self.on_complete is not None:
+            self.on_complete(self.response)
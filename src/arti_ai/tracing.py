@@ -0,0 +1,293 @@
+"""Lightweight tracing of request stages, logged as JSON and as CloudWatch Embedded Metric Format.
+
+Spans are plain in-process objects, so tracing needs no dependency; when OpenTelemetry is installed every span is
+mirrored to it as well.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import types
+import uuid
+from contextlib import ExitStack, contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:  # pylint: disable=too-many-instance-attributes
+    """A timed stage of a request, with attributes, counters and child stages."""
+
+    def __init__(self, name, parent=None, attributes=None):
+        """Initialize the span, starting its clock.
+
+        Args:
+            name (str): Name of the stage, e.g. `retrieve`.
+            parent (Span): The enclosing span, or None for the root of a trace.
+            attributes (dict): Initial attributes.
+        """
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.attributes = dict(attributes or {})
+        self.counters = {}
+        self.children = []
+        self.started_at = time.perf_counter()
+        self.seconds = None
+
+    def set_attribute(self, key, value):
+        """Set an attribute, e.g. the model used."""
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        """Add to a counter, e.g. tokens used or cache hits."""
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def walk(self):
+        """Yield the span and all its descendants."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self):
+        """Return the span tree as a JSON-serializable dictionary."""
+        return {
+            "name": self.name,
+            "duration_ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "attributes": self.attributes,
+            "counters": self.counters,
+            "spans": [child.to_dict() for child in self.children],
+        }
+
+
+class NoopSpan:
+    """Span handed out when tracing is disabled."""
+
+    def set_attribute(self, key, value):
+        """Ignore the attribute."""
+
+    def add(self, key, amount=1):
+        """Ignore the counter."""
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def get_current_span():
+    """Return the innermost active span, or a no-op span outside any trace."""
+    return current_span.get() or NOOP_SPAN
+
+
+def embedded_metrics(root, namespace):
+    """Return a trace as a CloudWatch Embedded Metric Format record.
+
+    Durations of spans sharing a name are summed, as are counters, and published with the root span's name as the
+    `Operation` dimension.
+
+    Args:
+        root (Span): The finished root span.
+        namespace (str): The CloudWatch namespace.
+
+    Returns:
+        dict: The EMF record.
+    """
+    values = {}
+    units = {}
+    for span in root.walk():
+        metric = f"{span.name}.duration"
+        values[metric] = values.get(metric, 0.0) + span.seconds * 1000
+        units[metric] = "Milliseconds"
+        for counter, amount in span.counters.items():
+            values[counter] = values.get(counter, 0) + amount
+            units[counter] = "Count"
+
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [["Operation"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+                }
+            ],
+        },
+        "Operation": root.name,
+        "TraceId": root.trace_id,
+        **{name: round(value, 3) for name, value in values.items()},
+    }
+
+
+class Tracer:
+    """Create spans around request stages and emit each finished trace."""
+
+    def __init__(self, enabled=False, emf_namespace=None):
+        """Initialize the tracer.
+
+        Args:
+            enabled (bool): Whether spans are recorded; disabled spans cost a context variable lookup.
+            emf_namespace (str): CloudWatch namespace of the EMF records printed for each trace, or None.
+        """
+        self.enabled = enabled
+        self.emf_namespace = emf_namespace
+        self._otel_tracer = self._load_otel_tracer() if enabled else None
+
+    @staticmethod
+    def _load_otel_tracer():
+        """Return an OpenTelemetry tracer, or None when OpenTelemetry is not installed."""
+        try:
+            # pylint: disable=import-outside-toplevel
+            from opentelemetry import trace  # type: ignore
+
+            # pylint: enable=import-outside-toplevel
+        except ImportError:
+            return None
+        return trace.get_tracer("arti_ai")
+
+    def _start_otel_span(self, stack, name):
+        """Start an OpenTelemetry span mirroring an in-process span, if OpenTelemetry is available."""
+        if self._otel_tracer is None:
+            return None
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry import trace  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        return stack.enter_context(trace.use_span(self._otel_tracer.start_span(name), end_on_exit=True))
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a stage as a child of the active span, or as the root of a new trace.
+
+        Args:
+            name (str): Name of the stage.
+            **attributes: Initial attributes of the span.
+
+        Yields:
+            Span | NoopSpan: The span, to set attributes and counters on.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = current_span.get()
+        span = Span(name, parent=parent, attributes=attributes)
+        token = current_span.set(span)
+        with ExitStack() as stack:
+            otel_span = self._start_otel_span(stack, name)
+            try:
+                yield span
+            except BaseException as e:
+                span.set_attribute("error", f"{type(e).__name__}: {e}")
+                raise
+            finally:
+                span.seconds = time.perf_counter() - span.started_at
+                current_span.reset(token)
+                if otel_span is not None:
+                    otel_span.set_attributes(
+                        {
+                            key: value
+                            for key, value in {**span.attributes, **span.counters}.items()
+                            if isinstance(value, (str, bool, int, float))
+                        }
+                    )
+                if parent is not None:
+                    parent.children.append(span)
+                else:
+                    self.emit(span)
+
+    def traced(self, name):
+        """Decorate a function so each call is a span."""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def emit(self, root):
+        """Log a finished trace as JSON, and print it as EMF for CloudWatch when a namespace is configured."""
+        logger.info(json.dumps({"event": "trace", "trace_id": root.trace_id, **root.to_dict()}, default=str))
+        if self.emf_namespace:
+            # CloudWatch only extracts EMF from log lines that are bare JSON, so bypass the log formatter
+            print(json.dumps(embedded_metrics(root, self.emf_namespace)), flush=True)
+
+
+def tracer_from_env():
+    """Build the tracer from environment variables."""
+    return Tracer(
+        enabled=os.environ.get("TRACING_ENABLED", "false").lower() == "true",
+        emf_namespace=os.environ.get("TRACING_EMF_NAMESPACE"),
+    )
+
+
+tracer = tracer_from_env()
+
+
+def instrument_app(app):
+    """Trace the embedding, retrieval and generation stages of an Embedchain app.
+
+    Generation records the OpenAI token usage when LangChain's OpenAI callback is available.
+
+    Args:
+        app (App): The Embedchain app.
+
+    Returns:
+        App: The same app.
+    """
+    if not tracer.enabled:
+        return app
+
+    # pylint: disable=import-outside-toplevel
+    from embedchain.embedder.base import EmbeddingFunc  # type: ignore
+
+    # pylint: enable=import-outside-toplevel
+    embedding_fn = app.embedding_model.embedding_fn
+
+    def embed(texts):
+        with tracer.span("embed") as embed_span:
+            embed_span.add("embedded_texts", len(texts))
+            return embedding_fn(texts)
+
+    app.embedding_model.set_embedding_fn(EmbeddingFunc(embed))
+    if hasattr(app.db, "collection"):
+        # Chroma captures the embedding function when the collection is opened
+        app.db.set_collection_name(app.db.config.collection_name)
+
+    app.db.query = tracer.traced("retrieve")(app.db.query)
+
+    get_answer_from_llm = type(app.llm).get_answer_from_llm
+
+    # Bound to the LLM rather than closing over it, so a copy made for one query generates with its own config
+    @functools.wraps(get_answer_from_llm)
+    def generate(llm, prompt):
+        with tracer.span("generate", model=getattr(llm.config, "model", None)) as generate_span:
+            with openai_usage() as usage:
+                answer = get_answer_from_llm(llm, prompt)
+            for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                if getattr(usage, name, None):
+                    generate_span.add(name, getattr(usage, name))
+            return answer
+
+    app.llm.get_answer_from_llm = types.MethodType(generate, app.llm)
+    return app
+
+
+def openai_usage():
+    """Return a context manager collecting the OpenAI token usage of LangChain calls, or a null context."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        from langchain_community.callbacks import get_openai_callback  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+    except ImportError:
+        return nullcontext()
+    return get_openai_callback()
@@ -3,11 +3,13 @@
 import argparse
 import io
 import json
+import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import patch
 
-from arti_ai.__main__ import handle_ask, main
+from arti_ai.__main__ import handle_ask, handle_ask_batch, main
 
 
 class TestCLIEntrypoint(unittest.TestCase):
@@ -83,6 +85,68 @@ class TestCLIEntrypoint(unittest.TestCase):
 
         mock_reset_data.assert_called_once()
 
+    @patch("arti_ai.__main__.sync_data")
+    @patch("argparse.ArgumentParser.parse_args")
+    def test_main_sync_command(self, mock_parse_args, mock_sync_data):
+        """Test the main function with the 'sync' command."""
+        mock_parse_args.return_value = argparse.Namespace(command="sync")
+        mock_sync_data.return_value = {"added": 1, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0}
+
+        main()
+
+        mock_sync_data.assert_called_once()
+        self.assertEqual(json.loads(self.parser_output.getvalue())["added"], 1)
+
+    @patch("arti_ai.__main__.sync_data", side_effect=ValueError("Incremental sync needs an S3 bucket"))
+    @patch("argparse.ArgumentParser.parse_args")
+    def test_main_sync_command_without_bucket(self, mock_parse_args, _mock_sync_data):
+        """Test the 'sync' command reports a missing S3 bucket as a usage error instead of printing null."""
+        mock_parse_args.return_value = argparse.Namespace(command="sync")
+
+        with patch("sys.stderr", new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit):
+            main()
+
+        self.assertIn("Incremental sync needs an S3 bucket", stderr.getvalue())
+        self.assertEqual(self.parser_output.getvalue(), "")
+
+    @patch("arti_ai.server.serve")
+    @patch("argparse.ArgumentParser.parse_args")
+    def test_main_serve_command(self, mock_parse_args, mock_serve):
+        """Test the main function with the 'serve' command."""
+        mock_parse_args.return_value = argparse.Namespace(
+            command="serve", mode="socket", host="127.0.0.1", port=9000, workers=4
+        )
+
+        main()
+
+        mock_serve.assert_called_once_with(mode="socket", host="127.0.0.1", port=9000, workers=4)
+
+    @patch("arti_ai.__main__.ask_many")
+    def test_handle_ask_batch_resumes(self, mock_ask_many):
+        """Test ask-batch skips questions already answered in the output file and appends new results."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "questions.jsonl")
+            output_path = os.path.join(tmp_dir, "results.jsonl")
+            with open(input_path, "w", encoding="utf-8") as file:
+                file.write('"First?"\n"Second?"\n')
+            with open(output_path, "w", encoding="utf-8") as file:
+                file.write('{"id": 1, "answer": "One", "latency_seconds": 1.0, "usage": {}}\n')
+
+            def fake_ask_many(questions, concurrency, skip_ids, on_result):
+                result = {"id": 2, "answer": "Two", "latency_seconds": 1.0, "usage": {}}
+                self.assertEqual([item["id"] for item in questions], [1, 2])
+                self.assertEqual((concurrency, skip_ids), (3, {"1"}))
+                on_result(result)
+                return [result]
+
+            mock_ask_many.side_effect = fake_ask_many
+            with patch("sys.stderr", io.StringIO()) as mock_stderr:
+                handle_ask_batch(input_path, output_path=output_path, concurrency=3, resume=True)
+
+            with open(output_path, "r", encoding="utf-8") as file:
+                self.assertEqual([json.loads(line)["id"] for line in file], [1, 2])
+            self.assertEqual(json.loads(mock_stderr.getvalue())["questions"], 1)
+
     @patch("argparse.ArgumentParser.parse_args")
     def test_main_not_command(self, mock_parse_args):
         """Test the main function with a command other than ask."""
@@ -0,0 +1,202 @@
+"""Unit tests for the semantic answer cache."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from arti_ai.answer_cache import (
+    AnswerCache,
+    DynamoDBAnswerStore,
+    MemoryAnswerStore,
+    SqliteAnswerStore,
+    answer_cache_from_env,
+    cosine_similarities,
+    parameters_key,
+)
+
+
+class StubDynamoDB:
+    """In-memory stand-in for the DynamoDB client calls of the answer store."""
+
+    def __init__(self):
+        """Start with an empty table."""
+        self.items = {}
+
+    def get_item(self, Key, **_kwargs):  # pylint: disable=invalid-name
+        """Return the item with a key."""
+        item = self.items.get((Key["key"]["S"], Key["id"]["S"]))
+        return {"Item": item} if item else {}
+
+    def put_item(self, Item, **_kwargs):  # pylint: disable=invalid-name
+        """Store an item."""
+        self.items[(Item["key"]["S"], Item["id"]["S"])] = Item
+
+    def query(self, ExpressionAttributeValues, **_kwargs):  # pylint: disable=invalid-name
+        """Return the unexpired items of a partition key."""
+        values = ExpressionAttributeValues
+        return {
+            "Items": [
+                item
+                for (key, _), item in self.items.items()
+                if key == values[":key"]["S"] and int(item["expires_at"]["N"]) > int(values[":now"]["N"])
+            ]
+        }
+
+    def update_item(self, Key, **_kwargs):  # pylint: disable=invalid-name
+        """Increment the generation counter."""
+        item = self.items.setdefault((Key["key"]["S"], Key["id"]["S"]), {"generation": {"N": "0"}})
+        item["generation"] = {"N": str(int(item["generation"]["N"]) + 1)}
+        return {"Attributes": {"generation": item["generation"]}}
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Test the AnswerCache class and its stores."""
+
+    def setUp(self):
+        """Set up the test."""
+        self.cache = AnswerCache(threshold=0.9)
+        self.parameters = {"model": "gpt-3.5-turbo", "temperature": 0.5, "where": None}
+
+    def test_cosine_similarities(self):
+        """Test cosine similarity to parallel, orthogonal and all-zero vectors, and of an all-zero vector."""
+        self.assertEqual(cosine_similarities([1, 0], [[2, 0], [0, 1], [0, 0]]).tolist(), [1.0, 0.0, 0.0])
+        self.assertEqual(cosine_similarities([0, 0], [[1, 1]]).tolist(), [0.0])
+        self.assertEqual(cosine_similarities([1, 0], []).tolist(), [])
+
+    def test_answers_of_another_dimension_are_ignored(self):
+        """Test answers embedded by a model with another dimension are not compared."""
+        self.cache.store("What is arti?", [1.0, 0.0, 0.1, 0.0], "A slack bot.", **self.parameters)
+        self.cache.store("What is arti?", [1.0, 0.0, 0.1], "A slack app.", **self.parameters)
+
+        self.assertEqual(self.cache.lookup("What's arti?", [1.0, 0.0, 0.12], **self.parameters), "A slack app.")
+
+    def test_near_duplicate_question_hits(self):
+        """Test a question close to a cached one returns the cached answer."""
+        self.cache.store("What is arti?", [1.0, 0.0, 0.1], "A slack bot.", **self.parameters)
+
+        answer = self.cache.lookup("what's arti", [1.0, 0.05, 0.1], **self.parameters)
+
+        self.assertEqual(answer, "A slack bot.")
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 0})
+
+    def test_dissimilar_question_misses(self):
+        """Test a question below the similarity threshold misses."""
+        self.cache.store("What is arti?", [1.0, 0.0], "A slack bot.", **self.parameters)
+
+        self.assertIsNone(self.cache.lookup("Where is the bucket?", [0.0, 1.0], **self.parameters))
+
+    def test_parameters_are_part_of_the_key(self):
+        """Test the same question asked with other parameters misses."""
+        self.cache.store("What is arti?", [1.0, 0.0], "A slack bot.", **self.parameters)
+
+        answer = self.cache.lookup("What is arti?", [1.0, 0.0], **{**self.parameters, "temperature": 0.9})
+
+        self.assertIsNone(answer)
+
+    def test_citations_round_trip(self):
+        """Test answers with citations are returned as a tuple."""
+        response = ("A slack bot.", [("context", {"url": "https://example.com", "score": 0.5})])
+        self.cache.store("What is arti?", [1.0, 0.0], response, **self.parameters)
+
+        self.assertEqual(self.cache.lookup("What is arti?", [1.0, 0.0], **self.parameters), response)
+
+    def test_clear(self):
+        """Test clearing the cache invalidates every answer."""
+        self.cache.store("What is arti?", [1.0, 0.0], "A slack bot.", **self.parameters)
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.lookup("What is arti?", [1.0, 0.0], **self.parameters))
+
+    def test_memory_store_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        store = MemoryAnswerStore(max_entries=2)
+        first = store.put("key", "first", [1.0], "1")
+        store.put("key", "second", [1.0], "2")
+        store.touch(first)
+        store.put("key", "third", [1.0], "3")
+
+        self.assertEqual(sorted(payload for _, _, payload in store.candidates("key")), ["1", "3"])
+
+    @patch("arti_ai.answer_cache.time.time")
+    def test_memory_store_ttl_eviction(self, mock_time):
+        """Test entries expire after the TTL."""
+        store = MemoryAnswerStore(ttl=10)
+        mock_time.return_value = 100
+        store.put("key", "question", [1.0], "answer")
+
+        mock_time.return_value = 105
+        self.assertEqual(len(store.candidates("key")), 1)
+        mock_time.return_value = 111
+        self.assertEqual(store.candidates("key"), [])
+
+    def test_persistent_tier_survives_new_memory_tier(self):
+        """Test answers stored in SQLite are found by a cache with an empty memory tier."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "answers.sqlite3")
+            AnswerCache(persistent_store=SqliteAnswerStore(path)).store(
+                "What is arti?", [1.0, 0.0], "A slack bot.", **self.parameters
+            )
+
+            cache = AnswerCache(persistent_store=SqliteAnswerStore(path))
+
+            self.assertEqual(cache.lookup("What is arti?", [1.0, 0.0], **self.parameters), "A slack bot.")
+            self.assertEqual(len(cache.memory_store.candidates(parameters_key(**self.parameters))), 1)
+
+    def test_sqlite_store_evicts_least_recently_used(self):
+        """Test the SQLite tier keeps at most max_entries answers."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = SqliteAnswerStore(os.path.join(tmp_dir, "answers.sqlite3"), max_entries=1)
+            store.put("key", "first", [1.0], "1")
+            store.put("key", "second", [1.0], "2")
+
+            self.assertEqual([payload for _, _, payload in store.candidates("key")], ["2"])
+
+    def test_sqlite_store_commits_expiry(self):
+        """Test expired answers deleted on lookup stay deleted for other connections."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "answers.sqlite3")
+            store = SqliteAnswerStore(path, ttl=10)
+            with patch("arti_ai.answer_cache.time.time", return_value=100):
+                store.put("key", "first", [1.0], "1")
+            with patch("arti_ai.answer_cache.time.time", return_value=200):
+                self.assertEqual(store.candidates("key"), [])
+
+            self.assertEqual(SqliteAnswerStore(path, ttl=1000).candidates("key"), [])
+
+    def test_shared_tier_clear_invalidates_other_containers(self):
+        """Test clearing the DynamoDB tier in one container drops the answers another container kept in memory."""
+        client = StubDynamoDB()
+        ingesting = AnswerCache(persistent_store=DynamoDBAnswerStore("answers", refresh_seconds=0, client=client))
+        answering = AnswerCache(persistent_store=DynamoDBAnswerStore("answers", refresh_seconds=0, client=client))
+        ingesting.store("What is arti?", [1.0, 0.0], "A slack bot.", **self.parameters)
+
+        self.assertEqual(answering.lookup("What is arti?", [1.0, 0.0], **self.parameters), "A slack bot.")
+        ingesting.clear()
+
+        self.assertIsNone(answering.lookup("What is arti?", [1.0, 0.0], **self.parameters))
+        self.assertEqual(answering.memory_store.candidates(parameters_key(**self.parameters)), [])
+
+    def test_answer_cache_from_env(self):
+        """Test the cache is only built when enabled."""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(answer_cache_from_env())
+        with patch.dict(os.environ, {"ANSWER_CACHE_ENABLED": "true", "ANSWER_CACHE_SIMILARITY_THRESHOLD": "0.8"}):
+            cache = answer_cache_from_env()
+            self.assertEqual(cache.threshold, 0.8)
+            self.assertIsNone(cache.persistent_store)
+        with patch.dict(os.environ, {"ANSWER_CACHE_ENABLED": "true", "ANSWER_CACHE_TABLE": "answers"}):
+            self.assertEqual(answer_cache_from_env().persistent_store.table_name, "answers")
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(
+            os.environ,
+            {
+                "ANSWER_CACHE_ENABLED": "true",
+                "ANSWER_CACHE_DB_PATH": os.path.join(tmp_dir, "answers.db"),
+                "ANSWER_CACHE_DB_MAX_ENTRIES": "16",
+            },
+        ):
+            self.assertEqual(answer_cache_from_env().persistent_store.max_entries, 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,26 @@
 """Unit tests for the Arti AI app."""
 
+import asyncio
 import importlib
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 from embedchain.config import BaseLlmConfig  # type: ignore
 
+from arti_ai.config import EmbedchainConfig
+
 
 class TestArtiApp(unittest.TestCase):
     """Test the Arti AI app."""
 
+    def setUp(self):
+        """Start every test with an empty app pool."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import app_pool
+
+        # pylint: enable=import-outside-toplevel
+        app_pool.invalidate()
+
     @patch("builtins.print")
     @patch("embedchain.App.from_config")
     @patch("embedchain.loaders.directory_loader.DirectoryLoader")
@@ -38,6 +50,28 @@ class TestArtiApp(unittest.TestCase):
 
         self.assertEqual(response, expected_response)
 
+    @patch("embedchain.App.from_config")
+    def test_ask_ai_queries_a_pooled_app_concurrently(self, mock_from_config):
+        """Test concurrent questions query the shared pooled app at the same time, each with its own LLM config."""
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        from arti_ai.app import ask_ai
+
+        # pylint: enable=import-outside-toplevel
+        barrier = threading.Barrier(4, timeout=5)
+
+        def query(**kwargs):
+            barrier.wait()
+            return kwargs["config"].model
+
+        mock_from_config.return_value.query.side_effect = query
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            answers = list(executor.map(lambda number: ask_ai(question="Question?", model=f"model-{number}"), range(4)))
+
+        self.assertEqual(answers, [f"model-{number}" for number in range(4)])
+
     @patch("os.getenv")
     def test_config_args_with_env_var(self, mock_getenv):
         """Test config_args when APP_CONFIG_FILE environment variable is set."""
@@ -103,7 +137,7 @@ class TestArtiApp(unittest.TestCase):
         _ = load_data()
         mock_app_from_config.assert_called_once()
 
-    @patch("arti_ai.app.config.get_embedchain_config", return_value={})
+    @patch("arti_ai.app.config.load_embedchain_config", return_value=EmbedchainConfig({}, "digest", None))
     @patch("embedchain.App.from_config")
     def test_reset_data(self, mock_from_config, _mock_get_config):
         """Test reset_data correctly resets the vector database."""
@@ -119,6 +153,186 @@ class TestArtiApp(unittest.TestCase):
 
         mock_app_instance.reset.assert_called_once()
 
+    @patch("arti_ai.app.get_app")
+    def test_ask_ai_answer_cache(self, mock_get_app):
+        """Test ask_ai serves repeated questions from the answer cache."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.answer_cache import AnswerCache
+        from arti_ai.app import ask_ai
+
+        # pylint: enable=import-outside-toplevel
+
+        mock_app_instance = mock_get_app.return_value
+        mock_app_instance.embedding_model.to_embeddings.return_value = [0.1, 0.2, 0.3]
+        mock_app_instance.query.return_value = "Mocked response"
+
+        with patch("arti_ai.app.answer_cache", AnswerCache()):
+            first_response = ask_ai(question="What is arti?")
+            second_response = ask_ai(question="What is arti?")
+
+        self.assertEqual(first_response, "Mocked response")
+        self.assertEqual(second_response, "Mocked response")
+        mock_app_instance.query.assert_called_once()
+
+    @patch("arti_ai.app.get_app")
+    def test_ask_ai_stream(self, mock_get_app):
+        """Test ask_ai streams tokens from the LLM callbacks and caches the complete answer."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.answer_cache import AnswerCache
+        from arti_ai.app import ask_ai
+
+        # pylint: enable=import-outside-toplevel
+
+        def query(config, **_kwargs):
+            for token in ["Mocked ", "response"]:
+                config.callbacks[0].on_llm_new_token(token)
+            return "Mocked response"
+
+        mock_app_instance = mock_get_app.return_value
+        mock_app_instance.embedding_model.to_embeddings.return_value = [0.1, 0.2, 0.3]
+        mock_app_instance.query.side_effect = query
+
+        with patch("arti_ai.app.answer_cache", AnswerCache()):
+            tokens = list(ask_ai(question="What is arti?", stream=True))
+            cached_tokens = list(ask_ai(question="What is arti?", stream=True))
+
+        self.assertEqual(tokens, ["Mocked ", "response"])
+        self.assertEqual(cached_tokens, ["Mocked response"])
+        mock_app_instance.query.assert_called_once()
+
+    @patch("arti_ai.app.generate", new_callable=AsyncMock, return_value="Mocked response")
+    @patch("arti_ai.app.get_app")
+    def test_ask_ai_async(self, mock_get_app, mock_generate):
+        """Test ask_ai_async merges concurrent retrievals and returns citations."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import ask_ai_async
+
+        # pylint: enable=import-outside-toplevel
+
+        mock_app_instance = mock_get_app.return_value
+        mock_app_instance.db.query.side_effect = [[("first", {"url": "a"})], [("second", {"url": "b"})]]
+
+        with patch("arti_ai.app.answer_cache", None):
+            response = asyncio.run(
+                ask_ai_async(
+                    question="What is arti?",
+                    citations=True,
+                    retrievals=[{"where": {"team": "a"}}, {"namespace": "b"}],
+                )
+            )
+
+        self.assertEqual(response, ("Mocked response", [("first", {"url": "a"}), ("second", {"url": "b"})]))
+        self.assertEqual(mock_app_instance.db.query.call_count, 2)
+        self.assertEqual(mock_generate.call_args.args[2], ["first", "second"])
+
+    @patch("arti_ai.app.get_loader_and_asset_root", return_value=(MagicMock(), "assets"))
+    @patch("arti_ai.app.get_app")
+    def test_load_data_clears_answer_cache(self, _mock_get_app, _):
+        """Test ingesting new content invalidates cached answers."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import load_data
+
+        # pylint: enable=import-outside-toplevel
+
+        with patch("arti_ai.app.answer_cache") as mock_answer_cache:
+            load_data()
+
+        mock_answer_cache.clear.assert_called_once()
+
+    @patch("arti_ai.app.get_loader_and_asset_root", return_value=(MagicMock(), "assets"))
+    @patch("arti_ai.app.ingestion_pipeline_from_env")
+    @patch("arti_ai.app.get_app")
+    def test_load_data_uses_ingestion_pipeline(self, mock_get_app, mock_pipeline_from_env, _):
+        """Test load_data ingests through the pipeline when it is enabled."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import load_data
+
+        # pylint: enable=import-outside-toplevel
+
+        load_data()
+
+        mock_pipeline_from_env.assert_called_once_with(mock_get_app.return_value)
+        mock_pipeline_from_env.return_value.run.assert_called_once()
+        mock_get_app.return_value.add.assert_not_called()
+
+    @patch("arti_ai.app.get_loader_and_asset_root")
+    @patch("arti_ai.app.get_app")
+    def test_ingest_objects(self, mock_get_app, mock_get_loader):
+        """Test created objects replace their vectors, removed objects are deleted and failures are reported."""
+        # pylint: disable=import-outside-toplevel
+        import hashlib
+
+        from arti_ai.app import ingest_objects
+
+        # pylint: enable=import-outside-toplevel
+
+        loader = MagicMock()
+        mock_get_loader.return_value = (loader, "bucket/assets")
+        mock_app = mock_get_app.return_value
+        mock_app.add.side_effect = ["hash", RuntimeError("bad")]
+
+        result = ingest_objects("bucket", created_keys=["assets/a.md", "assets/bad.md"], removed_keys=["assets/b.md"])
+
+        self.assertEqual(result, {"added": 1, "deleted": 1, "failed": ["assets/bad.md"]})
+        mock_get_app.assert_called_once()
+        mock_get_loader.assert_called_once()
+        mock_app.add.assert_any_call("bucket/assets/a.md", loader=loader)
+        mock_app.delete.assert_any_call(hashlib.md5(b"bucket/assets/b.md").hexdigest())  # nosec B324
+
+    @patch("os.getenv", side_effect=lambda key, default=None: "my-test-bucket" if key == "APP_BUCKET_NAME" else default)
+    @patch("arti_ai.app.config.load_embedchain_config", return_value=EmbedchainConfig({}, "digest", None))
+    @patch("arti_ai.s3_sync.S3IncrementalSync")
+    @patch("arti_ai.app.get_app")
+    @patch("boto3.client")
+    def test_sync_data(self, _mock_boto3_client, _mock_get_app, mock_sync, _mock_load_config, _mock_getenv):
+        """Test sync_data synchronises the S3 asset root incrementally."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import sync_data
+
+        # pylint: enable=import-outside-toplevel
+
+        mock_sync.return_value.sync.return_value = {"added": 1, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0}
+
+        counts = sync_data()
+
+        mock_sync.return_value.sync.assert_called_once_with("my-test-bucket/assets")
+        self.assertEqual(counts["added"], 1)
+
+    @patch("os.getenv", side_effect=lambda key, default=None: default)
+    @patch("arti_ai.app.load_data")
+    def test_sync_data_without_bucket_fails(self, mock_load_data, _mock_getenv):
+        """Test sync_data refuses to run without an S3 bucket instead of silently loading everything."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import sync_data
+
+        # pylint: enable=import-outside-toplevel
+
+        with self.assertRaisesRegex(ValueError, "APP_BUCKET_NAME"):
+            sync_data()
+        mock_load_data.assert_not_called()
+
+    @patch(
+        "arti_ai.app.config.load_embedchain_config",
+        return_value=EmbedchainConfig({"app": {"config": {"id": "arti"}}}, "digest", None),
+    )
+    @patch("embedchain.App.from_config")
+    def test_get_app_reuses_pooled_app(self, mock_from_config, _mock_get_config):
+        """Test the Embedchain app is built once and reused across calls, keyed by the configuration digest."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.app import app_pool, get_app
+
+        # pylint: enable=import-outside-toplevel
+
+        with patch("arti_ai.app_pool.config_hash") as mock_config_hash:
+            first_app = get_app()
+            second_app = get_app()
+
+        mock_config_hash.assert_not_called()
+
+        self.assertIs(first_app, second_app)
+        mock_from_config.assert_called_once_with(config={"app": {"config": {"id": "arti"}}})
+        self.assertEqual(app_pool.stats()["hits"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
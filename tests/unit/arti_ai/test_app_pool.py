@@ -0,0 +1,122 @@
+"""Unit tests for the Embedchain app pool."""
+
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.app_pool import AppPool, config_hash, query_view
+
+
+class TestAppPool(unittest.TestCase):
+    """Test the AppPool class."""
+
+    def setUp(self):
+        """Set up the test."""
+        self.factory = MagicMock(side_effect=lambda config: MagicMock(name=str(config)))
+        self.pool = AppPool(factory=self.factory)
+
+    def test_config_hash_is_order_independent(self):
+        """Test equivalent configurations hash to the same key."""
+        self.assertEqual(config_hash({"a": 1, "b": {"c": 2}}), config_hash({"b": {"c": 2}, "a": 1}))
+        self.assertNotEqual(config_hash({"a": 1}), config_hash({"a": 2}))
+
+    def test_get_builds_once_and_reuses(self):
+        """Test an app is built on the first call and reused afterwards."""
+        first_app = self.pool.get({"llm": {"provider": "openai"}})
+        second_app = self.pool.get({"llm": {"provider": "openai"}})
+
+        self.assertIs(first_app, second_app)
+        self.factory.assert_called_once_with(config={"llm": {"provider": "openai"}})
+        stats = self.pool.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertGreaterEqual(stats["total_construction_seconds"], 0)
+
+    def test_config_change_evicts_previous_app(self):
+        """Test a changed configuration builds a new app and evicts the stale one."""
+        first_app = self.pool.get({"llm": {"provider": "openai"}})
+        second_app = self.pool.get({"llm": {"provider": "anthropic"}})
+
+        self.assertIsNot(first_app, second_app)
+        self.assertEqual(self.pool.stats()["size"], 1)
+        self.assertEqual(self.pool.stats()["evictions"], 1)
+
+    def test_get_and_invalidate_by_key(self):
+        """Test apps can be pooled under a precomputed digest instead of hashing the configuration."""
+        with patch("arti_ai.app_pool.config_hash") as mock_config_hash:
+            first_app = self.pool.get({"llm": {"provider": "openai"}}, key="digest")
+            second_app = self.pool.get({"llm": {"provider": "openai"}}, key="digest")
+            self.pool.invalidate(key="digest")
+
+        mock_config_hash.assert_not_called()
+        self.assertIs(first_app, second_app)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+    def test_query_view_has_its_own_llm(self):
+        """Test a query view's LLM config is its own, and methods patched onto the LLM are bound to the copy."""
+
+        class FakeLlm:  # pylint: disable=too-few-public-methods
+            """An LLM generating with its current config."""
+
+            config = "default"
+
+            def get_answer_from_llm(self, prompt):
+                """Return the prompt and the config it was answered with."""
+                return f"{prompt} with {self.config}"
+
+        def traced(llm, prompt):
+            return "traced " + FakeLlm.get_answer_from_llm(llm, prompt)
+
+        app = self.pool.get({})
+        app.llm = FakeLlm()
+        app.llm.get_answer_from_llm = types.MethodType(traced, app.llm)
+
+        first_view, second_view = query_view(app), query_view(app)
+        first_view.llm.config, second_view.llm.config = "gpt-4", "gpt-3.5-turbo"
+
+        self.assertEqual(first_view.llm.get_answer_from_llm("Why?"), "traced Why? with gpt-4")
+        self.assertEqual(second_view.llm.get_answer_from_llm("Why?"), "traced Why? with gpt-3.5-turbo")
+        self.assertEqual(app.llm.get_answer_from_llm("Why?"), "traced Why? with default")
+        self.assertIs(first_view.db, app.db)
+
+    def test_unhealthy_app_is_rebuilt(self):
+        """Test an app failing its health check is rebuilt."""
+        pool = AppPool(factory=self.factory, health_check=MagicMock(return_value=False))
+
+        pool.get({})
+        pool.get({})
+
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_health_check_exception_rebuilds(self):
+        """Test an exception raised by the health check is treated as unhealthy."""
+        pool = AppPool(factory=self.factory, health_check=MagicMock(side_effect=RuntimeError("db gone")))
+
+        pool.get({})
+        pool.get({})
+
+        self.assertEqual(self.factory.call_count, 2)
+
+    @patch("arti_ai.app_pool.time.monotonic", side_effect=[0, 20, 20])
+    def test_expired_app_is_rebuilt(self, _mock_monotonic):
+        """Test an app older than max_age is rebuilt."""
+        pool = AppPool(factory=self.factory, max_age=10)
+
+        pool.get({})
+        pool.get({})
+
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_invalidate(self):
+        """Test invalidation drops pooled apps."""
+        self.pool.get({})
+        self.pool.invalidate({})
+        self.pool.get({})
+        self.pool.invalidate()
+
+        self.assertEqual(self.factory.call_count, 2)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Unit tests for the asyncio question answering building blocks."""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from arti_ai.async_engine import (
+    StageTimeouts,
+    generate,
+    merge_contexts,
+    retrieve,
+    run_stage,
+    stage_timeouts_from_env,
+    token_usage,
+)
+
+
+class TestAsyncEngine(unittest.TestCase):
+    """Test the asyncio question answering building blocks."""
+
+    def test_merge_contexts_interleaves_and_deduplicates(self):
+        """Test contexts are interleaved by rank and repeated texts kept once."""
+        merged = merge_contexts([[("a", {}), ("b", {})], [("a", {"other": True}), ("c", {}), ("d", {})]])
+
+        self.assertEqual(merged, [("a", {}), ("b", {}), ("c", {}), ("d", {})])
+
+    def test_retrieve_runs_queries_concurrently(self):
+        """Test every retrieval is queried at the same time with its own filter."""
+        barrier = threading.Barrier(2, timeout=5)
+        app = MagicMock()
+        app.config.id = "arti"
+
+        def query(**kwargs):
+            barrier.wait()
+            return [(f"text {kwargs['where']}", {"score": 0.5})]
+
+        app.db.query.side_effect = query
+
+        contexts = asyncio.run(retrieve(app, "question?", [{"where": None}, {"where": {"team": "a"}}], 3, 5))
+
+        self.assertEqual(
+            contexts, [("text {'app_id': 'arti'}", {"score": 0.5}), ("text {'team': 'a'}", {"score": 0.5})]
+        )
+
+    def test_retrieve_cancels_queries_on_failure(self):
+        """Test a failing retrieval cancels the others still waiting for their stage."""
+        app = MagicMock()
+        app.config.id = "arti"
+        cancelled = []
+
+        async def fake_run_stage(_name, _timeout, _function, **kwargs):
+            if kwargs["where"] == {"team": "a"}:
+                raise RuntimeError("vector database unavailable")
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(kwargs["where"])
+                raise
+
+        with patch("arti_ai.async_engine.run_stage", side_effect=fake_run_stage):
+            with self.assertRaisesRegex(RuntimeError, "unavailable"):
+                asyncio.run(retrieve(app, "question?", [{"where": None}, {"where": {"team": "a"}}], 3, 5))
+
+        self.assertEqual(cancelled, [{"app_id": "arti"}])
+
+    @patch("arti_ai.async_engine.get_async_openai_client")
+    def test_generate_times_out(self, mock_get_client):
+        """Test a generation exceeding its timeout raises a TimeoutError naming the stage."""
+
+        async def slow_create(**_kwargs):
+            await asyncio.sleep(5)
+
+        mock_get_client.return_value.chat.completions.create = slow_create
+        app = MagicMock()
+        type(app.llm).__name__ = "OpenAILlm"
+        app.llm.generate_prompt.return_value = "Prompt"
+
+        with self.assertRaisesRegex(TimeoutError, "generate"):
+            asyncio.run(generate(app, "question?", ["context"], MagicMock(system_prompt=None), 0.01))
+
+    def test_run_stage_times_out(self):
+        """Test a stage exceeding its timeout raises a TimeoutError naming the stage."""
+        with self.assertRaisesRegex(TimeoutError, "retrieve"):
+            asyncio.run(run_stage("retrieve", 0.01, time.sleep, 0.5))
+
+    @patch("arti_ai.async_engine.get_async_openai_client")
+    def test_generate_with_openai(self, mock_get_client):
+        """Test OpenAI answers are generated through the async client with the per-question config."""
+        # pylint: disable=import-outside-toplevel
+        from embedchain.config import BaseLlmConfig  # type: ignore
+
+        # pylint: enable=import-outside-toplevel
+        completion = MagicMock()
+        completion.choices[0].message.content = "Answer"
+        completion.usage.prompt_tokens, completion.usage.completion_tokens, completion.usage.total_tokens = 7, 3, 10
+        mock_create = AsyncMock(return_value=completion)
+        mock_get_client.return_value.chat.completions.create = mock_create
+        app = MagicMock()
+        type(app.llm).__name__ = "OpenAILlm"
+        app.llm.generate_prompt.return_value = "Prompt"
+        llm_config = BaseLlmConfig(model="gpt-4", system_prompt="Be brief.", temperature=0.1)
+
+        usage = {}
+
+        async def run():
+            token_usage.set(usage)
+            return await generate(app, "question?", ["context"], llm_config, 5)
+
+        answer = asyncio.run(run())
+
+        self.assertEqual(answer, "Answer")
+        self.assertEqual(usage, {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10})
+        self.assertEqual(
+            mock_create.call_args.kwargs["messages"],
+            [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Prompt"}],
+        )
+        self.assertEqual(mock_create.call_args.kwargs["model"], "gpt-4")
+
+    def test_stage_timeouts_from_env(self):
+        """Test stage timeouts are read from the environment."""
+        with patch.dict("os.environ", {"ASYNC_GENERATE_TIMEOUT_SECONDS": "30"}):
+            self.assertEqual(stage_timeouts_from_env(), StageTimeouts(embed=10.0, retrieve=10.0, generate=30.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
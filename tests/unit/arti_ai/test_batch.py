@@ -0,0 +1,79 @@
+"""Unit tests for batch question answering."""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from arti_ai.async_engine import token_usage
+from arti_ai.batch import ask_many, completed_ids, percentile, read_questions, summarize
+
+
+class TestBatch(unittest.TestCase):
+    """Test batch question answering."""
+
+    def test_read_questions(self):
+        """Test questions are read from strings or objects and numbered when they have no id."""
+        lines = ['"What is arti?"\n', "\n", '{"id": "q2", "question": "Who?", "citations": true}\n']
+
+        self.assertEqual(
+            list(read_questions(lines)),
+            [{"question": "What is arti?", "id": 1}, {"id": "q2", "question": "Who?", "citations": True}],
+        )
+
+    def test_completed_ids(self):
+        """Test only questions answered without error are treated as done, ignoring a truncated last line."""
+        lines = ['{"id": 1, "answer": "a"}\n', '{"id": 2, "error": "boom"}\n', '{"id": 3, "ans']
+
+        self.assertEqual(completed_ids(lines), {"1"})
+
+    def test_ask_many(self):
+        """Test questions are answered concurrently up to the limit, skipping completed ones."""
+        in_flight = []
+        peak = []
+
+        async def fake_ask_ai_async(question, **_kwargs):
+            in_flight.append(question)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(question)
+            token_usage.get()["total_tokens"] = 10
+            if question == "bad":
+                raise RuntimeError("boom")
+            return (f"answer to {question}", [("context", {"url": "u"})])
+
+        questions = [{"id": number, "question": question} for number, question in enumerate("abcdx", 1)]
+        questions.append({"id": 6, "question": "bad"})
+        streamed = []
+
+        with patch("arti_ai.batch.ask_ai_async", side_effect=fake_ask_ai_async):
+            results = ask_many(questions, concurrency=2, skip_ids=["5"], on_result=streamed.append)
+
+        self.assertEqual(streamed, results)
+        self.assertEqual(sorted(result["id"] for result in results), [1, 2, 3, 4, 6])
+        self.assertLessEqual(max(peak), 2)
+        result = next(result for result in results if result["id"] == 1)
+        self.assertEqual(result["answer"], "answer to a")
+        self.assertEqual(result["citations"], [["context", {"url": "u"}]])
+        self.assertEqual(result["usage"], {"total_tokens": 10})
+        self.assertEqual(next(result for result in results if result["id"] == 6)["error"], "RuntimeError: boom")
+
+    def test_summarize(self):
+        """Test the summary reports counts, throughput, latency percentiles and tokens."""
+        results = [
+            {"id": 1, "latency_seconds": 1.0, "usage": {"total_tokens": 5}},
+            {"id": 2, "latency_seconds": 3.0, "usage": {}, "error": "boom"},
+        ]
+
+        summary = summarize(results, 2.0)
+
+        self.assertEqual(summary["questions"], 2)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["questions_per_second"], 1.0)
+        self.assertEqual(summary["latency_p50_seconds"], 1.0)
+        self.assertEqual(summary["latency_p95_seconds"], 3.0)
+        self.assertEqual(summary["total_tokens"], 5)
+        self.assertIsNone(percentile([], 0.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
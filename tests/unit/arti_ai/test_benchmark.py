@@ -0,0 +1,52 @@
+"""Unit tests for the offline retrieval benchmark."""
+
+import math
+import unittest
+
+from arti_ai.benchmark import FakeEmbedder, StageTimer, fake_answer, run_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test the offline retrieval benchmark."""
+
+    def test_fake_embedder_is_deterministic_and_normalised(self):
+        """Test equal texts embed equally into unit vectors of the requested length."""
+        embedder = FakeEmbedder(dimensions=16)
+
+        vectors = embedder(["The code name of project 7", "the code name of project 7"])
+
+        self.assertEqual(vectors[0], vectors[1])
+        self.assertEqual(len(vectors[0]), 16)
+        self.assertAlmostEqual(math.sqrt(sum(value * value for value in vectors[0])), 1.0)
+
+    def test_fake_answer(self):
+        """Test the fake LLM answers with the first context sentence."""
+        prompt = "Context information:\n----------------------\nThe code name is amber1. Filler.\n"
+
+        self.assertEqual(fake_answer(prompt), "The code name is amber1.")
+
+    def test_stage_timer_report(self):
+        """Test stage durations are summarised as percentiles."""
+        timer = StageTimer()
+        for seconds in [0.1, 0.2, 0.3, 0.4]:
+            timer.record("retrieve", seconds)
+
+        report = timer.report()["retrieve"]
+
+        self.assertEqual(report["count"], 4)
+        self.assertEqual(report["p50_seconds"], 0.2)
+        self.assertEqual(report["p99_seconds"], 0.4)
+
+    def test_run_benchmark(self):
+        """Test a small corpus is ingested and queried offline through load_data and ask_ai."""
+        report = run_benchmark(documents=5, questions=3, top_k=2, dimensions=64)
+
+        self.assertEqual(report["parameters"]["questions"], 3)
+        self.assertEqual(set(report["query"]["stages"]), {"embed", "retrieve", "generate", "total"})
+        self.assertEqual(report["query"]["stages"]["retrieve"]["count"], 3)
+        self.assertGreater(report["query"]["recall_at_2"], 0)
+        self.assertGreater(report["memory"]["max_rss_mb"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
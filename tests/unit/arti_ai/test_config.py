@@ -2,6 +2,7 @@
 
 import json
 import os
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, mock_open, patch
@@ -9,7 +10,7 @@ from unittest.mock import MagicMock, mock_open, patch
 import yaml
 from botocore.exceptions import ClientError  # type: ignore
 
-from arti_ai.config import Config
+from arti_ai.config import Config, EmbedchainConfig
 
 
 class TestConfig(unittest.TestCase):
@@ -20,15 +21,74 @@ class TestConfig(unittest.TestCase):
         self.config = Config(secrets_manager_client=MagicMock())
         self.config.project_root = Path(__file__).parent
 
-    @patch("builtins.open", new_callable=mock_open, read_data="test: data")
+    @patch("builtins.open", new_callable=mock_open, read_data="app:\n  config:\n    id: test")
     def test_get_embedchain_config_success(self, mock_file):
         """Test successful loading of the EmbedChain app configuration."""
         config = Config()
         config.config_file = "dummy_path.yaml"
         result = config.get_embedchain_config()
-        self.assertEqual(result, {"test": "data"})
+        self.assertEqual(result, {"app": {"config": {"id": "test"}}})
         mock_file.assert_called_with("dummy_path.yaml", "r", encoding="utf-8")
 
+    def test_embedchain_config_is_cached_until_the_file_changes(self):
+        """Test the file is parsed once, and parsed again with reload hooks run once it changes."""
+        hook = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.config_file = Path(tmp_dir, "config.yaml")
+            self.config.config_file.write_text("app:\n  config:\n    id: first\n", encoding="utf-8")
+            self.config.add_reload_hook(hook)
+
+            first = self.config.load_embedchain_config()
+            with patch("builtins.open") as mock_file:
+                self.assertIs(self.config.get_embedchain_config(), first.data)
+            mock_file.assert_not_called()
+
+            self.config.config_file.write_text("app:\n  config:\n    id: second-app\n", encoding="utf-8")
+            second = self.config.load_embedchain_config()
+            self.config.reload()
+
+        self.assertEqual(first.app_id, "first")
+        self.assertEqual(second.app_id, "second-app")
+        self.assertEqual(second.vectordb_provider, "chroma")
+        hook.assert_called_once_with(second)
+
+    def test_embedchain_config_settings(self):
+        """Test the settings read from an Embedchain configuration fall back to Embedchain's defaults."""
+        configured = EmbedchainConfig(
+            {"embedder": {"provider": "huggingface"}, "llm": {"config": {"model": "gpt-4o"}}}, "digest", None
+        )
+        empty = EmbedchainConfig({"app": None, "llm": {"config": "gpt-4o"}}, "digest", None)
+
+        self.assertEqual(configured.embedder_provider, "huggingface")
+        self.assertEqual(configured.llm_model, "gpt-4o")
+        self.assertEqual(empty.embedder_provider, "openai")
+        self.assertIsNone(empty.app_id)
+        self.assertIsNone(empty.llm_model)
+
+    def test_get_embedchain_config_invalid_schema(self):
+        """Test a configuration Embedchain would reject fails when it is loaded."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.config_file = Path(tmp_dir, "config.yaml")
+            self.config.config_file.write_text("vectordb:\n  provider: unknown\n", encoding="utf-8")
+
+            with self.assertRaises(ValueError):
+                self.config.get_embedchain_config()
+
+    def test_get_embedchain_config_local_vectordb(self):
+        """Test the local vector database is accepted with its own options, which are validated."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.config_file = Path(tmp_dir, "config.yaml")
+            self.config.config_file.write_text(
+                "vectordb:\n  provider: local\n  config:\n    ivf_lists: 16\n", encoding="utf-8"
+            )
+            self.assertEqual(self.config.load_embedchain_config().vectordb_provider, "local")
+
+            self.config.config_file.write_text(
+                "vectordb:\n  provider: local\n  config:\n    host: x\n", encoding="utf-8"
+            )
+            with self.assertRaises(ValueError):
+                self.config.reload()
+
     @patch("builtins.open", side_effect=FileNotFoundError("Configuration file not found"), create=True)
     def test_get_embedchain_config_file_not_found(self, _mock_file):
         """Test file not found error when loading the EmbedChain app configuration."""
@@ -93,6 +153,16 @@ class TestConfig(unittest.TestCase):
         with patch.dict(os.environ, {}, clear=True), self.assertRaises(EnvironmentError):
             Config.get_env_variable("MISSING_VAR")
 
+    @patch("arti_ai.config.boto3.client")
+    def test_secrets_manager_client_is_created_on_first_use(self, mock_boto_client):
+        """Test constructing the configuration does not create a Secrets Manager client."""
+        config = Config()
+
+        mock_boto_client.assert_not_called()
+        self.assertIs(config.secrets_manager_client, mock_boto_client.return_value)
+        self.assertIs(config.secrets_manager_client, mock_boto_client.return_value)
+        mock_boto_client.assert_called_once_with("secretsmanager")
+
     @patch("arti_ai.config.boto3.client")
     def test_get_secret(self, mock_boto_client):
         """Test getting a secret from AWS Secrets Manager."""
@@ -108,6 +178,19 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(result["apiKey"], "test_api_key")
         mock_boto_client.assert_called_once_with("secretsmanager")
 
+    @patch.dict(
+        os.environ,
+        {"OPENAI_API_KEY_SECRET_NAME": "openai", "PINECONE_API_KEY": "key", "SLACK_BOT_TOKEN_SECRET_NAME": "slack"},
+        clear=True,
+    )
+    def test_prefetch_secrets(self):
+        """Test secrets not provided through the environment are prefetched in one batch."""
+        secrets_cache = MagicMock()
+
+        Config(secrets_cache=secrets_cache).prefetch_secrets()
+
+        secrets_cache.prefetch.assert_called_once_with(["openai", "slack"])
+
     @patch("arti_ai.config.boto3.client")
     def test_get_secret_client_error(self, mock_boto_client):
         """Test getting a secret that does not exist."""
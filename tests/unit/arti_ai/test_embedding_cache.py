@@ -0,0 +1,122 @@
+"""Unit tests for the embedding cache."""
+
+import itertools
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.embedding_cache import (
+    CachedEmbeddingFunction,
+    EmbeddingCache,
+    embedding_cache_from_env,
+    embedding_key,
+    install_embedding_cache,
+)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test the EmbeddingCache class."""
+
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp_dir.name, "embeddings.db")
+        self.cache = EmbeddingCache(self.path, max_entries=2)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_put_and_get_many_round_trip_float32(self):
+        """Test embeddings survive a round trip through SQLite as float32."""
+        self.cache.put_many({"a": [0.5, 0.25]})
+
+        self.assertEqual(self.cache.get_many(["a", "b"]), {"a": [0.5, 0.25]})
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+        self.assertEqual(EmbeddingCache(self.path).get_many(["a"]), {"a": [0.5, 0.25]})
+
+    @patch("arti_ai.embedding_cache.time.time")
+    def test_evicts_least_recently_used(self, mock_time):
+        """Test the least recently used embedding is evicted above the size bound."""
+        mock_time.side_effect = itertools.count()
+        self.cache.put_many({"a": [1.0]})
+        self.cache.put_many({"b": [2.0]})
+        self.cache.get_many(["a"])
+        self.cache.put_many({"c": [3.0]})
+
+        self.assertEqual(set(self.cache.get_many(["a", "b", "c"])), {"a", "c"})
+
+    @patch("arti_ai.embedding_cache.time.time")
+    def test_evicts_in_batches_and_buffers_access_times(self, mock_time):
+        """Test lookups do not write, and eviction only runs above the bound, removing a batch at once."""
+        cache = EmbeddingCache(os.path.join(self.tmp_dir.name, "batched.db"), max_entries=40)
+        mock_time.side_effect = itertools.count()
+        statements = []
+        cache._connection.set_trace_callback(statements.append)  # pylint: disable=protected-access
+
+        for index in range(40):
+            cache.put_many({str(index): [float(index)]})
+        cache.get_many(["0", "1"])
+        writes = [statement for statement in statements if statement.startswith(("UPDATE", "DELETE"))]
+        cache.put_many({"40": [40.0]})
+
+        self.assertEqual(writes, [])
+        self.assertEqual(sum(statement.startswith("DELETE") for statement in statements), 1)
+        self.assertEqual(cache.stats()["entries"], 38)
+        self.assertEqual(set(cache.get_many(["0", "1", "2", "3", "4", "5"])), {"0", "1", "5"})
+
+    def test_cached_embedding_function_only_embeds_misses(self):
+        """Test only texts missing from the cache reach the embedder, each once."""
+        embedding_fn = MagicMock(side_effect=lambda texts: [[float(len(text))] for text in texts])
+        cached_fn = CachedEmbeddingFunction(embedding_fn, self.cache, provider="OpenAIEmbedder", model="ada")
+        self.cache.put_many({embedding_key("OpenAIEmbedder", "ada", "known"): [9.0]})
+
+        self.assertEqual(cached_fn(["known", "new", "new"]), [[9.0], [3.0], [3.0]])
+        self.assertEqual(cached_fn(["new"]), [[3.0]])
+        embedding_fn.assert_called_once_with(["new"])
+
+    def test_embedding_key_depends_on_provider_and_model(self):
+        """Test the same text embedded by another model is cached separately."""
+        self.assertNotEqual(embedding_key("OpenAIEmbedder", "a", "text"), embedding_key("OpenAIEmbedder", "b", "text"))
+        self.assertNotEqual(embedding_key("OpenAIEmbedder", "a", "text"), embedding_key("HuggingFace", "a", "text"))
+
+    @patch("boto3.client")
+    def test_snapshot_restore_and_upload(self, mock_boto3_client):
+        """Test a missing database is restored from S3 and snapshots are uploaded."""
+        path = os.path.join(self.tmp_dir.name, "restored.db")
+
+        cache = EmbeddingCache(path, snapshot_url="my-test-bucket/cache/embeddings.db")
+        cache.snapshot()
+
+        mock_boto3_client.return_value.download_file.assert_called_once_with(
+            "my-test-bucket", "cache/embeddings.db", path
+        )
+        upload_args = mock_boto3_client.return_value.upload_file.call_args.args
+        self.assertEqual(upload_args[1:], ("my-test-bucket", "cache/embeddings.db"))
+        self.assertFalse(self.cache.snapshot())
+
+    def test_install_embedding_cache_reopens_chroma_collection(self):
+        """Test the app's embedder is wrapped and Chroma picks up the wrapped function."""
+        app = MagicMock()
+        app.embedding_model.embedding_fn = MagicMock(return_value=[[1.0]])
+        app.embedding_model.config.model = "ada"
+
+        install_embedding_cache(app, self.cache)
+
+        wrapped = app.embedding_model.set_embedding_fn.call_args.args[0]
+        self.assertEqual(wrapped(["text"]), [[1.0]])
+        self.assertEqual(wrapped(["text"]), [[1.0]])
+        app.embedding_model.embedding_fn.assert_called_once_with(["text"])
+        app.db.set_collection_name.assert_called_once_with(app.db.config.collection_name)
+
+    def test_embedding_cache_from_env(self):
+        """Test the cache is only built when enabled."""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(embedding_cache_from_env())
+        with patch.dict(os.environ, {"EMBEDDING_CACHE_ENABLED": "true", "EMBEDDING_CACHE_DB_PATH": self.path}):
+            self.assertEqual(embedding_cache_from_env().path, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
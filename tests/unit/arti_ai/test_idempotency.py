@@ -0,0 +1,134 @@
+"""Unit tests for running Slack listeners once per request."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.idempotency import (
+    COMPLETED,
+    IN_FLIGHT,
+    DynamoDBStore,
+    MemoryStore,
+    SQLiteStore,
+    TieredStore,
+    idempotency_store_from_env,
+    idempotent,
+)
+
+
+class ConditionalCheckFailedException(Exception):
+    """Stand-in for the DynamoDB client's conditional check error."""
+
+
+class TestIdempotency(unittest.TestCase):
+    """Test the idempotency stores and the listener decorator."""
+
+    def setUp(self):
+        """Create a temporary directory for SQLite stores."""
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp_dir.name, "idempotency.sqlite3")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_run_once_returns_recorded_result(self):
+        """Test a completed request returns its recorded result without running again."""
+        store = MemoryStore()
+        function = MagicMock(return_value={"answer": "42"})
+
+        self.assertEqual(store.run_once("request", function), {"answer": "42"})
+        self.assertEqual(store.run_once("request", function), {"answer": "42"})
+        function.assert_called_once()
+
+    def test_failed_run_releases_claim(self):
+        """Test a failing run can be retried, and an in-flight claim expires after its lease."""
+        store = MemoryStore(lease_seconds=0)
+
+        with self.assertRaises(RuntimeError):
+            store.run_once("request", MagicMock(side_effect=RuntimeError("LLM unavailable")))
+        self.assertEqual(store.claim("request"), (True, None))
+        self.assertEqual(store.claim("request"), (True, None))
+
+    def test_sqlite_store_is_shared(self):
+        """Test SQLite stores on the same file see each other's claims and results."""
+        first, second = SQLiteStore(self.path), SQLiteStore(self.path)
+
+        self.assertEqual(first.claim("request"), (True, None))
+        claimed, record = second.claim("request")
+        self.assertFalse(claimed)
+        self.assertEqual(record["status"], IN_FLIGHT)
+
+        first.complete("request", "Answer.")
+        self.assertEqual(second.run_once("request", MagicMock()), "Answer.")
+
+        second.release("request")
+        self.assertEqual(first.claim("request"), (True, None))
+
+    def test_tiered_store_caches_persistent_records(self):
+        """Test records found in the persistent tier are answered from memory afterwards."""
+        persistent = SQLiteStore(self.path)
+        persistent.claim("request")
+        persistent.complete("request", "Answer.")
+        store = TieredStore(MemoryStore(), persistent)
+
+        with patch.object(persistent, "claim", wraps=persistent.claim) as mock_claim:
+            self.assertEqual(store.run_once("request", MagicMock()), "Answer.")
+            self.assertEqual(store.run_once("request", MagicMock()), "Answer.")
+
+        mock_claim.assert_called_once_with("request")
+        self.assertEqual(store.memory.claim("request")[1]["status"], COMPLETED)
+
+    def test_dynamodb_store(self):
+        """Test DynamoDB claims are conditional writes, and failed ones return the existing record."""
+        client = MagicMock()
+        client.exceptions.ConditionalCheckFailedException = ConditionalCheckFailedException
+        store = DynamoDBStore("arti-idempotency", client=client)
+
+        self.assertEqual(store.claim("request"), (True, None))
+        self.assertIn("ConditionExpression", client.put_item.call_args.kwargs)
+
+        client.put_item.side_effect = ConditionalCheckFailedException()
+        client.get_item.return_value = {
+            "Item": {"status": {"S": COMPLETED}, "result": {"S": '"Answer."'}, "expires_at": {"N": "1"}}
+        }
+        self.assertEqual(store.claim("request"), (False, {"status": COMPLETED, "result": "Answer.", "expires_at": 1.0}))
+
+    def test_idempotent_listener(self):
+        """Test the decorator keys runs by listener and request id, and runs requests without one."""
+        store = MemoryStore()
+        calls = []
+
+        @idempotent(store)
+        def listener(body, say):
+            calls.append(body)
+            say("Answer.")
+
+        say = MagicMock()
+        listener(body={"event_id": "Ev1"}, say=say)
+        listener(body={"event_id": "Ev1"}, say=say)
+        listener(body={"trigger_id": "T1"}, say=say)
+        listener(body={}, say=say)
+        listener(body={}, say=say)
+
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(say.call_count, 4)
+        self.assertEqual(store.claim("listener:Ev1")[1]["status"], COMPLETED)
+        self.assertIs(idempotent(None)(listener), listener)
+
+    def test_store_from_env(self):
+        """Test the store is configured by environment variables."""
+        with patch.dict("os.environ", {"IDEMPOTENCY_STORE": "none"}):
+            self.assertIsNone(idempotency_store_from_env())
+        with patch.dict("os.environ", {"IDEMPOTENCY_STORE": "memory", "IDEMPOTENCY_TTL_SECONDS": "60"}):
+            self.assertEqual(idempotency_store_from_env().ttl_seconds, 60.0)
+        with patch.dict("os.environ", {"IDEMPOTENCY_STORE": "sqlite", "IDEMPOTENCY_SQLITE_PATH": self.path}):
+            self.assertIsInstance(idempotency_store_from_env().persistent, SQLiteStore)
+        with patch.dict("os.environ", {"IDEMPOTENCY_STORE": "redis"}):
+            with self.assertRaises(ValueError):
+                idempotency_store_from_env()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""Unit tests for the staged ingestion pipeline."""
+
+import hashlib
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.ingest import IngestionPipeline, Stage, content_hash, ingestion_pipeline_from_env, upsert_embeddings
+
+
+class FakeLoader:  # pylint: disable=too-few-public-methods
+    """Loader returning a fixed set of documents."""
+
+    def __init__(self, documents):
+        """Initialize the loader."""
+        self.documents = documents
+
+    def load_data(self, _url):
+        """Return the documents."""
+        return {"doc_id": "doc", "data": self.documents}
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    """Test the IngestionPipeline class."""
+
+    def setUp(self):
+        """Set up the test."""
+        self.app = MagicMock()
+        self.app.config.id = "arti"
+        self.app.chunker = None
+        self.app.db.get.return_value = {"ids": []}
+        self.app.embedding_model.embedding_fn.side_effect = lambda texts: [[float(len(text))] for text in texts]
+
+    def upserted_ids(self):
+        """Return every chunk id written to the vector database."""
+        return [chunk_id for call in self.app.db.collection.upsert.call_args_list for chunk_id in call.kwargs["ids"]]
+
+    @patch("embedchain.core.db.models.DataSource")
+    def test_run_embeds_and_upserts_in_batches(self, _mock_data_source):
+        """Test chunks are embedded in batches of N and written in batches of M."""
+        documents = [
+            {"content": f"document number {index}", "meta_data": {"url": f"s3://{index}"}} for index in range(7)
+        ]
+        pipeline = IngestionPipeline(self.app, embed_batch_size=3, upsert_batch_size=2)
+
+        result = pipeline.run("bucket/assets", FakeLoader(documents))
+
+        self.assertEqual(result["documents"], 7)
+        self.assertEqual(result["chunks"], 7)
+        self.assertEqual(result["embedded"], 7)
+        self.assertEqual(result["upserted"], 7)
+        self.assertEqual(
+            sorted(len(call.args[0]) for call in self.app.embedding_model.embedding_fn.call_args_list), [1, 3, 3]
+        )
+        self.assertTrue(all(len(call.kwargs["ids"]) <= 2 for call in self.app.db.collection.upsert.call_args_list))
+        self.assertEqual(len(set(self.upserted_ids())), 7)
+        self.assertTrue(all(chunk_id.startswith("arti--") for chunk_id in self.upserted_ids()))
+        self.assertEqual(set(result["stages"]), {"load", "chunk", "dedupe", "embed", "upsert"})
+        self.app.db_session.commit.assert_called_once()
+
+    @patch("embedchain.core.db.models.DataSource")
+    def test_run_skips_duplicate_and_existing_chunks(self, _mock_data_source):
+        """Test repeated chunks and chunks already in the vector database are not embedded."""
+        documents = [
+            {"content": "same text", "meta_data": {"url": "s3://a"}},
+            {"content": "same text", "meta_data": {"url": "s3://a"}},
+            {"content": "already stored", "meta_data": {"url": "s3://b"}},
+        ]
+        pipeline = IngestionPipeline(self.app, embed_batch_size=10)
+        stored_id = "arti--" + hashlib.sha256(b"already stored" + b"s3://b").hexdigest()
+        self.app.db.get.side_effect = lambda ids: {"ids": [chunk_id for chunk_id in ids if chunk_id == stored_id]}
+
+        result = pipeline.run("bucket/assets", FakeLoader(documents))
+
+        self.assertEqual(result["duplicates"], 2)
+        self.assertEqual(result["embedded"], 1)
+        self.app.embedding_model.embedding_fn.assert_called_once_with(["same text"])
+
+    @patch("embedchain.core.db.models.DataSource")
+    def test_run_reuses_embeddings_of_known_content(self, _mock_data_source):
+        """Test content already stored or repeated under another URL is not sent to the embedder again."""
+        documents = [
+            {"content": "moved  text", "meta_data": {"url": "s3://new"}},
+            {"content": "copied text", "meta_data": {"url": "s3://a"}},
+            {"content": "copied\ntext", "meta_data": {"url": "s3://b"}},
+        ]
+        self.app.db.collection.get.return_value = {
+            "metadatas": [{"content_hash": content_hash("moved text")}],
+            "embeddings": [[42.0]],
+        }
+        pipeline = IngestionPipeline(self.app, embed_batch_size=10)
+
+        result = pipeline.run("bucket/assets", FakeLoader(documents))
+
+        self.assertEqual(result["embedded"], 1)
+        self.assertEqual(result["reused"], 2)
+        self.app.embedding_model.embedding_fn.assert_called_once_with(["copied text"])
+        upsert = self.app.db.collection.upsert.call_args.kwargs
+        self.assertEqual(upsert["embeddings"], [[42.0], [11.0], [11.0]])
+        self.assertEqual(len(set(upsert["ids"])), 3)
+
+    def test_content_hash_ignores_layout(self):
+        """Test chunks differing only in whitespace share a content hash."""
+        self.assertEqual(content_hash(" a\n\tb "), content_hash("a b"))
+        self.assertNotEqual(content_hash("a b"), content_hash("a c"))
+
+    def test_run_raises_stage_errors(self):
+        """Test a failing stage stops the run and raises its error."""
+        self.app.embedding_model.embedding_fn.side_effect = RuntimeError("rate limited")
+        documents = [{"content": f"document {index}", "meta_data": {"url": f"s3://{index}"}} for index in range(50)]
+        pipeline = IngestionPipeline(self.app, embed_batch_size=2, queue_size=1)
+
+        with self.assertRaises(RuntimeError):
+            pipeline.run("bucket/assets", FakeLoader(documents))
+
+        self.app.db_session.commit.assert_not_called()
+
+    def test_stage_propagates_end_marker_after_flush(self):
+        """Test a stage flushes trailing items before signalling the end downstream."""
+        # pylint: disable=import-outside-toplevel
+        import queue
+
+        from arti_ai.ingest import _DONE
+
+        # pylint: enable=import-outside-toplevel
+        inbox, outbox = queue.Queue(), queue.Queue()
+        stage = Stage("double", lambda item: [item * 2], flush=lambda: ["flushed"])
+        inbox.put(1)
+        inbox.put(_DONE)
+
+        stage.work(inbox, outbox, [])
+
+        self.assertEqual([outbox.get(), outbox.get(), outbox.get()], [2, "flushed", _DONE])
+        self.assertEqual(stage.timings()["items_out"], 2)
+
+    def test_upsert_embeddings_pinecone(self):
+        """Test Pinecone receives precomputed vectors with the text in its metadata."""
+        db = MagicMock(spec=["pinecone_index"])
+
+        upsert_embeddings(db, ids=["1"], documents=["text"], metadatas=[{"url": "u"}], embeddings=[[0.5]])
+
+        db.pinecone_index.upsert.assert_called_once_with(
+            [{"id": "1", "values": [0.5], "metadata": {"url": "u", "text": "text"}}]
+        )
+
+    def test_upsert_embeddings_fallback(self):
+        """Test other databases fall back to add."""
+        db = MagicMock(spec=["add"])
+
+        upsert_embeddings(db, ids=["1"], documents=["text"], metadatas=[{}], embeddings=[[0.5]])
+
+        db.add.assert_called_once_with(documents=["text"], metadatas=[{}], ids=["1"])
+
+    def test_ingestion_pipeline_from_env(self):
+        """Test the pipeline is only built when enabled."""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(ingestion_pipeline_from_env(self.app))
+        with patch.dict(os.environ, {"INGEST_PIPELINE_ENABLED": "true", "INGEST_EMBED_CONCURRENCY": "8"}):
+            self.assertEqual(ingestion_pipeline_from_env(self.app).concurrency["embed"], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""Unit tests for the BM25 keyword index and hybrid retrieval."""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.keyword_index import (
+    HybridRetriever,
+    KeywordIndex,
+    install_keyword_index,
+    keyword_index_from_env,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+class TestKeywordIndex(unittest.TestCase):
+    """Test the BM25 keyword index and hybrid retrieval."""
+
+    def setUp(self):
+        """Create an index in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp_dir.name, "keyword_index.json.gz")
+        self.index = KeywordIndex(self.path)
+        self.index.add(
+            ["1", "2", "3"],
+            [
+                "Restart the worker when ERR_CONN_RESET appears.",
+                "Timeouts are configured in config.yaml under app.",
+                "The worker processes jobs from the queue.",
+            ],
+            [{"app_id": "arti", "hash": "a"}, {"app_id": "arti", "hash": "b"}, {"app_id": "other", "hash": "c"}],
+        )
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_tokenize_keeps_identifiers(self):
+        """Test identifiers are kept whole as well as split into their parts."""
+        self.assertEqual(tokenize("See config.yaml"), ["see", "config.yaml", "config", "yaml"])
+        self.assertIn("err_conn_reset", tokenize("ERR_CONN_RESET"))
+
+    def test_search_ranks_exact_identifiers(self):
+        """Test an exact identifier ranks its chunk first, and filters restrict the results."""
+        self.assertEqual(self.index.search("what does ERR_CONN_RESET mean?", 2)[0][0].split()[4], "ERR_CONN_RESET")
+        self.assertEqual(
+            [text for text, _, _ in self.index.search("worker", 5, where={"app_id": "other"})],
+            ["The worker processes jobs from the queue."],
+        )
+
+    def test_remove_where_and_replace(self):
+        """Test chunks are removed by metadata filter and re-added chunks replace older ones."""
+        self.index.remove_where({"hash": "a"})
+        self.index.add(["2"], ["Nothing about timeouts"], [{"app_id": "arti", "hash": "b"}])
+
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search("ERR_CONN_RESET", 5), [])
+        self.assertEqual(self.index.search("config.yaml", 5), [])
+
+    def test_save_and_load(self):
+        """Test the saved index loads back with the same search results."""
+        self.index.save()
+
+        loaded = KeywordIndex(self.path)
+
+        self.assertEqual(loaded.search("worker queue", 3), self.index.search("worker queue", 3))
+
+    def test_snapshot_and_refresh(self):
+        """Test snapshots are uploaded and reloaded only when their ETag changed."""
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        mock_s3_client.put_object.return_value = {"ETag": '"1"'}
+        self.index.snapshot_url = "bucket/.arti/keyword_index.json.gz"
+        self.index.refresh_seconds = 0
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            self.assertTrue(self.index.snapshot())
+            payload = mock_s3_client.put_object.call_args.kwargs["Body"]
+            self.assertEqual(mock_s3_client.put_object.call_args.kwargs["IfNoneMatch"], "*")
+            mock_s3_client.get_object.side_effect = ClientError({"Error": {"Code": "304"}}, "GetObject")
+            self.assertFalse(self.index.refresh())
+            mock_s3_client.get_object.side_effect = None
+            mock_s3_client.get_object.return_value = {"Body": io.BytesIO(payload), "ETag": '"2"'}
+            self.assertTrue(self.index.refresh())
+
+        self.assertEqual(mock_s3_client.get_object.call_args.kwargs["IfNoneMatch"], '"1"')
+        self.assertEqual(len(self.index), 3)
+
+    def test_snapshot_merges_concurrent_snapshot(self):
+        """Test a snapshot uploaded by another container meanwhile is merged with the changes made here."""
+        other = KeywordIndex(None)
+        other.add(["9"], ["Deploys are rolled back with the previous image."], [{"app_id": "arti", "hash": "z"}])
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.side_effect = [
+            ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"),
+            ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"),
+            {"Body": io.BytesIO(other._dump()), "ETag": '"other"'},  # pylint: disable=protected-access
+        ]
+        mock_s3_client.put_object.side_effect = [
+            ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject"),
+            {"ETag": '"merged"'},
+        ]
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            index = KeywordIndex(self.path, snapshot_url="bucket/.arti/keyword_index.json.gz")
+            index.add(["1"], ["Restart the worker when ERR_CONN_RESET appears."], [{"app_id": "arti", "hash": "a"}])
+            self.assertTrue(index.snapshot())
+
+        self.assertEqual(mock_s3_client.put_object.call_args.kwargs["IfMatch"], '"other"')
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(KeywordIndex(self.path)), 2)
+        self.assertEqual(index._pending, [])  # pylint: disable=protected-access
+
+    def test_reciprocal_rank_fusion(self):
+        """Test keys ranked well by both rankings come first."""
+        self.assertEqual(reciprocal_rank_fusion([["a", "b", "c"], ["b"]]), ["b", "a", "c"])
+
+    def test_hybrid_retriever(self):
+        """Test chunks ranked by both vector and keyword search come first."""
+        vector_query = MagicMock(
+            return_value=[
+                ("Timeouts are configured in config.yaml under app.", {"score": 0.1}),
+                ("Restart the worker when ERR_CONN_RESET appears.", {"score": 0.2}),
+            ]
+        )
+        retriever = HybridRetriever(vector_query, self.index, candidates=2)
+
+        contexts = retriever(input_query="ERR_CONN_RESET worker", n_results=2, where={"app_id": "arti"})
+
+        vector_query.assert_called_once_with(
+            input_query="ERR_CONN_RESET worker", n_results=4, where={"app_id": "arti"}, citations=True
+        )
+        self.assertEqual(
+            contexts,
+            ["Restart the worker when ERR_CONN_RESET appears.", "Timeouts are configured in config.yaml under app."],
+        )
+        self.assertEqual(retriever(input_query="ERR_CONN_RESET", n_results=1, citations=True)[0][1]["score"], 0.2)
+
+    def test_install_keyword_index(self):
+        """Test the vector database's writes keep the index in step and queries become hybrid."""
+        app = MagicMock()
+        del app.db.collection
+        index = KeywordIndex(os.path.join(self.tmp_dir.name, "other.json.gz"))
+
+        install_keyword_index(app, index)
+        app.db.add(documents=["new chunk"], metadatas=[{"hash": "n"}], ids=["n1"])
+        self.assertEqual(len(index), 1)
+        app.db.delete(where={"hash": "n"})
+        self.assertEqual(len(index), 0)
+
+        self.assertIsInstance(app.db.query, HybridRetriever)
+        self.assertIs(app.db.keyword_index, index)
+
+    def test_keyword_index_from_env(self):
+        """Test the index is only built when hybrid retrieval is enabled."""
+        with patch.dict("os.environ", {"HYBRID_RETRIEVAL_ENABLED": "false"}):
+            self.assertIsNone(keyword_index_from_env())
+        with patch.dict("os.environ", {"HYBRID_RETRIEVAL_ENABLED": "true", "KEYWORD_INDEX_PATH": self.path}):
+            self.assertEqual(keyword_index_from_env().path, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@
 import base64
 import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 
 class TestLambdaApiHandler(unittest.TestCase):
@@ -33,6 +33,35 @@ class TestLambdaApiHandler(unittest.TestCase):
         self.assertEqual(response["statusCode"], 200)
         self.assertIn("OK", json.loads(response["body"])["data"]["text"])
 
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_handler_reuse_and_retry_deduplication(self, _):
+        """Test the Slack handler is created once and retries of an accepted event are not dispatched again."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai import lambda_api_handler
+        from arti_ai.slack_prefilter import EventPrefilter, RecentEvents
+
+        # pylint: enable=import-outside-toplevel
+
+        body = json.dumps({"type": "event_callback", "event_id": "Ev1", "event": {"type": "app_mention"}})
+        event = {"body": body, "isBase64Encoded": False, "headers": {}}
+        retry = {**event, "headers": {"X-Slack-Retry-Num": "1", "X-Slack-Retry-Reason": "http_error"}}
+
+        with patch.object(lambda_api_handler, "SlackRequestHandler") as mock_slack_request_handler, patch.object(
+            lambda_api_handler, "prefilter", EventPrefilter(RecentEvents())
+        ):
+            mock_slack_request_handler.return_value.handle.return_value = {"statusCode": 200, "body": ""}
+            lambda_api_handler.get_slack_handler.cache_clear()
+            try:
+                lambda_api_handler.handler(event, {})
+                response = lambda_api_handler.handler(retry, {})
+            finally:
+                lambda_api_handler.get_slack_handler.cache_clear()
+
+        mock_slack_request_handler.assert_called_once()
+        mock_slack_request_handler.return_value.handle.assert_called_once_with(event, {})
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(response["headers"]["X-Slack-No-Retry"], "1")
+
     @patch("arti_ai.lambda_api_handler.logger.info")
     @patch("arti_ai.lambda_api_handler.logger.debug")
     def test_url_verification(self, mock_debug, mock_info):
@@ -1,6 +1,7 @@
 """Test Lambda function to handle S3 event."""
 
 import json
+import os
 import unittest
 from unittest.mock import patch
 
@@ -25,6 +26,19 @@ class TestLambdaEventHandler(unittest.TestCase):
         self.assertEqual(response["statusCode"], 200)
         self.assertEqual(response["body"], json.dumps("Event processed successfully!"))
 
+    @patch.dict(os.environ, {"ASSETS_SYNC_MODE": "incremental"})
+    @patch("arti_ai.lambda_event_handler.load_data")
+    @patch("arti_ai.lambda_event_handler.sync_data")
+    def test_handler_incremental_sync(self, mock_sync_data, mock_load_data):
+        """Test the handler synchronises incrementally when configured to."""
+        mock_sync_data.return_value = {"added": 1, "updated": 0, "deleted": 0, "skipped": 3, "failed": 0}
+
+        response = handler({}, {})
+
+        mock_sync_data.assert_called_once()
+        mock_load_data.assert_not_called()
+        self.assertEqual(response["statusCode"], 200)
+
 
 if __name__ == "__main__":
     unittest.main()
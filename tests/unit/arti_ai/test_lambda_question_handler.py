@@ -0,0 +1,94 @@
+"""Test Lambda function answering questions queued by the Slack app."""
+
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.idempotency import MemoryStore
+from arti_ai.lambda_question_handler import answer_jobs, handler, post_answer
+
+
+def sqs_record(message_id, job):
+    """Return an SQS record carrying a question job."""
+    return {"messageId": message_id, "body": json.dumps(job)}
+
+
+class TestLambdaQuestionHandler(unittest.TestCase):
+    """AWS Lambda handler tests for queued questions."""
+
+    @patch("arti_ai.lambda_question_handler.get_http_session")
+    @patch("arti_ai.lambda_question_handler.get_slack_client")
+    def test_post_answer(self, mock_get_slack_client, mock_get_http_session):
+        """Test answers go to the job's response URL, or else to its channel."""
+        post_answer({"response_url": "https://hooks.slack.com/1", "prefix": "Q: _Why?_ A: "}, ("Because.", []))
+        post_answer({"channel": "C1", "thread_ts": "1.2"}, "Because.")
+
+        mock_get_http_session.return_value.post.assert_called_once_with(
+            "https://hooks.slack.com/1", json={"text": "Q: _Why?_ A: Because."}, timeout=30
+        )
+        mock_get_slack_client.return_value.chat_postMessage.assert_called_once_with(
+            channel="C1", thread_ts="1.2", text="Because."
+        )
+
+    @patch("arti_ai.lambda_question_handler.post_answer")
+    @patch("arti_ai.lambda_question_handler.ask_ai", return_value="Because.")
+    def test_answer_jobs_once_each(self, mock_ask_ai, mock_post_answer):
+        """Test redelivered jobs are answered once, with their parameters, and failures are reported."""
+        jobs = [
+            {"id": "T1", "question": "Why?", "params": {"model": "gpt-4"}},
+            {"id": "T1", "question": "Why?", "params": {"model": "gpt-4"}},
+            {"question": "How?"},
+            {"id": "T2"},
+        ]
+
+        with patch("arti_ai.lambda_question_handler.idempotency_store", MemoryStore()):
+            failed = answer_jobs(jobs, max_workers=1)
+
+        self.assertEqual(failed, [3])
+        self.assertEqual(mock_ask_ai.call_count, 2)
+        mock_ask_ai.assert_any_call(question="Why?", model="gpt-4")
+        mock_ask_ai.assert_any_call(question="How?")
+        self.assertEqual(mock_post_answer.call_count, 2)
+
+    @patch("arti_ai.lambda_question_handler.post_answer")
+    @patch("embedchain.App.from_config")
+    def test_answer_jobs_concurrently(self, mock_from_config, mock_post_answer):
+        """Test queued questions are answered at the same time by the shared pooled app."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def query(**kwargs):
+            barrier.wait()
+            return f"Answer to {kwargs['input_query']}"
+
+        mock_from_config.return_value.query.side_effect = query
+        jobs = [{"question": f"Question {number}?", "channel": "C1"} for number in range(3)]
+
+        with patch("arti_ai.lambda_question_handler.idempotency_store", None):
+            failed = answer_jobs(jobs, max_workers=3)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(
+            sorted(call.args[1] for call in mock_post_answer.call_args_list),
+            [f"Answer to Question {number}?" for number in range(3)],
+        )
+
+    @patch("arti_ai.lambda_question_handler.answer_jobs", return_value=[1])
+    def test_handler_reports_failed_messages(self, mock_answer_jobs):
+        """Test only messages of failed questions are retried and undecodable messages are dropped."""
+        event = {
+            "Records": [
+                sqs_record("1", {"question": "Why?"}),
+                {"messageId": "2", "body": "not json"},
+                sqs_record("3", {"question": "How?"}),
+            ]
+        }
+
+        response = handler(event, MagicMock())
+
+        mock_answer_jobs.assert_called_once_with([{"question": "Why?"}, {"question": "How?"}])
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "3"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Test Lambda function to handle S3 events from SQS messages."""
+
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from arti_ai.lambda_sqs_handler import coalesce_s3_events, handler
+
+
+def sqs_record(message_id, *s3_records):
+    """Return an SQS record wrapping S3 event records of `(event name, key, sequencer)`."""
+    body = {
+        "Records": [
+            {"eventName": event_name, "s3": {"object": {"key": key, "sequencer": sequencer}}}
+            for event_name, key, sequencer in s3_records
+        ]
+    }
+    return {"messageId": message_id, "body": json.dumps(body)}
+
+
+@patch.dict(os.environ, {"APP_BUCKET_NAME": "my-test-bucket"})
+class TestLambdaSqsHandler(unittest.TestCase):
+    """AWS Lambda handler tests for SQS messages."""
+
+    def test_coalesce_s3_events_keeps_latest_event_per_key(self):
+        """Test repeated keys collapse to their latest event and remember every message mentioning them."""
+        records = [
+            sqs_record(
+                "1", ("ObjectCreated:Put", "assets/my+file.md", "0A"), ("ObjectCreated:Put", "assets/b.md", "01")
+            ),
+            sqs_record("2", ("ObjectRemoved:Delete", "assets/b.md", "0B")),
+            sqs_record("3", ("ObjectCreated:Put", "assets/my+file.md", "09")),
+            {"messageId": "4", "body": "not json"},
+        ]
+
+        changes = coalesce_s3_events(records)
+
+        self.assertEqual(set(changes), {"assets/my file.md", "assets/b.md"})
+        self.assertEqual(changes["assets/my file.md"]["event"], "ObjectCreated:Put")
+        self.assertEqual(changes["assets/my file.md"]["sequencer"], "0A")
+        self.assertEqual(changes["assets/my file.md"]["message_ids"], ["1", "3"])
+        self.assertEqual(changes["assets/b.md"]["event"], "ObjectRemoved:Delete")
+
+    @patch("arti_ai.lambda_sqs_handler.config.load_embedchain_config")
+    @patch("arti_ai.lambda_sqs_handler.ingest_objects")
+    def test_handler_ingests_batch_once_and_reports_failures(self, mock_ingest_objects, mock_load_config):
+        """Test the batch is ingested in one call and only messages of failed objects are retried."""
+        mock_load_config.return_value.data = {}
+        mock_ingest_objects.return_value = {"added": 1, "deleted": 1, "failed": ["assets/a.md"]}
+        event = {
+            "Records": [
+                sqs_record("1", ("ObjectCreated:Put", "assets/a.md", "01")),
+                sqs_record("2", ("ObjectCreated:Put", "assets/a.md", "02"), ("ObjectCreated:Put", "assets/c.md", "01")),
+                sqs_record("3", ("ObjectRemoved:Delete", "assets/b.md", "01")),
+                sqs_record("4", ("ObjectCreated:Put", ".arti/manifest.json", "01")),
+            ]
+        }
+
+        response = handler(event, {})
+
+        mock_ingest_objects.assert_called_once_with(
+            "my-test-bucket", created_keys=["assets/a.md", "assets/c.md"], removed_keys=["assets/b.md"]
+        )
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(response["batchItemFailures"], [{"itemIdentifier": "1"}, {"itemIdentifier": "2"}])
+
+    @patch("arti_ai.lambda_sqs_handler.config.load_embedchain_config")
+    @patch("arti_ai.lambda_sqs_handler.ingest_objects", return_value={"added": 1, "deleted": 0, "failed": []})
+    def test_handler_skips_internal_objects(self, mock_ingest_objects, mock_load_config):
+        """Test objects arti writes to the bucket itself, such as snapshots, are not ingested."""
+        mock_load_config.return_value.data = {
+            "vectordb": {"provider": "local", "config": {"snapshot_url": "my-test-bucket/vectordb"}}
+        }
+        keys = [
+            ".arti/keyword_index.json.gz",
+            "snapshots/embeddings.sqlite3",
+            "vectordb/arti-ai/rows.json",
+            "vectordb-notes.md",
+            "assets/a.md",
+        ]
+        event = {
+            "Records": [sqs_record(str(number), ("ObjectCreated:Put", key, "01")) for number, key in enumerate(keys)]
+        }
+
+        with patch.dict(
+            os.environ,
+            {
+                "EMBEDDING_CACHE_SNAPSHOT_URL": "my-test-bucket/snapshots/embeddings.sqlite3",
+                "KEYWORD_INDEX_SNAPSHOT_URL": "other-bucket/assets/a.md",
+            },
+        ):
+            handler(event, {})
+
+        mock_ingest_objects.assert_called_once_with(
+            "my-test-bucket", created_keys=["vectordb-notes.md", "assets/a.md"], removed_keys=[]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
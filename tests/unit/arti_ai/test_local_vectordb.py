@@ -0,0 +1,207 @@
+"""Unit tests for the local in-process vector database."""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.local_vectordb import LocalCollection, LocalVectorDB, LocalVectorDbConfig, app_from_config
+
+
+def embed(texts):
+    """Embed texts as counts of the letters a, b and c."""
+    return [[text.count("a"), text.count("b"), text.count("c")] for text in texts]
+
+
+class TestLocalVectorDB(unittest.TestCase):
+    """Test the local vector database."""
+
+    def setUp(self):
+        """Create a collection in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp_dir.name, "collection")
+        self.collection = LocalCollection(self.path, embedding_function=embed)
+        self.collection.upsert(
+            ids=["1", "2", "3"],
+            documents=["aaa", "bbb", "abc"],
+            metadatas=[{"app_id": "arti", "hash": "x"}, {"app_id": "arti", "hash": "y"}, {"app_id": "other"}],
+        )
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_query(self):
+        """Test rows are returned closest first, by cosine distance, within the filter."""
+        result = self.collection.query(query_texts=["aab"], n_results=2)
+
+        self.assertEqual(result["ids"], [["1", "3"]])
+        self.assertAlmostEqual(result["distances"][0][0], 1 - 2 / np.sqrt(5), places=5)
+        self.assertEqual(
+            self.collection.query(query_texts=["aaa"], n_results=5, where={"app_id": "other"})["ids"], [["3"]]
+        )
+
+    def test_filters(self):
+        """Test equality, operator and combined filters."""
+        self.assertEqual(self.collection.get(where={"hash": {"$in": ["x", "y"]}})["ids"], ["1", "2"])
+        self.assertEqual(
+            self.collection.get(where={"$and": [{"app_id": "arti"}, {"hash": {"$ne": "x"}}]})["ids"], ["2"]
+        )
+        self.assertEqual(self.collection.get(where={"app_id": "arti", "hash": "y"}, limit=1)["ids"], ["2"])
+        with self.assertRaises(ValueError):
+            self.collection.get(where={"hash": {"$gt": "x"}})
+
+    def test_upsert_replaces_and_delete(self):
+        """Test upserted ids replace their rows and deleted rows are no longer found."""
+        self.collection.upsert(ids=["1"], embeddings=[[0, 0, 1]], documents=["ccc"], metadatas=[{"app_id": "arti"}])
+        self.collection.delete(where={"hash": "y"})
+
+        result = self.collection.get(include=["documents", "embeddings"])
+        self.assertEqual(result["ids"], ["3", "1"])
+        self.assertEqual(result["documents"], ["abc", "ccc"])
+        self.assertEqual(result["embeddings"][1], [0.0, 0.0, 1.0])
+        self.assertEqual(self.collection.query(query_texts=["c"], n_results=1)["ids"], [["1"]])
+
+    def test_save_and_load(self):
+        """Test a saved collection loads memory-mapped, with the same results and writable afterwards."""
+        self.collection.save()
+
+        loaded = LocalCollection(self.path, embedding_function=embed)
+        self.assertIsInstance(loaded._matrix, np.memmap)  # pylint: disable=protected-access
+        self.assertEqual(
+            loaded.query(query_texts=["bb"], n_results=3), self.collection.query(query_texts=["bb"], n_results=3)
+        )
+        loaded.upsert(ids=["4"], documents=["cc"], metadatas=[{"app_id": "arti"}])
+        self.assertEqual(loaded.count(), 4)
+
+    def test_ivf(self):
+        """Test IVF search finds the nearest rows and falls back to brute force for narrow filters."""
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(256, 8))
+        collection = LocalCollection(self.path, ivf_lists=4, ivf_probes=2)
+        collection.upsert(
+            ids=[str(number) for number in range(256)],
+            embeddings=vectors.tolist(),
+            documents=[str(number) for number in range(256)],
+            metadatas=[{"even": number % 2 == 0, "number": number} for number in range(256)],
+        )
+
+        self.assertEqual(collection.query(query_embeddings=[vectors[7]], n_results=1)["ids"], [["7"]])
+        self.assertEqual(
+            collection.query(query_embeddings=[vectors[7]], n_results=1, where={"number": 9})["ids"], [["9"]]
+        )
+
+    def test_snapshot_and_restore(self):
+        """Test the collection is uploaded as one object and restored at cold start."""
+        uploaded: dict[str, bytes] = {}
+
+        def get_object(Bucket, Key, **_conditions):  # pylint: disable=invalid-name,unused-argument
+            if Key not in uploaded:
+                raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+            return {"Body": io.BytesIO(uploaded[Key]), "ETag": '"1"'}
+
+        def put_object(Bucket, Key, Body, **_conditions):  # pylint: disable=invalid-name,unused-argument
+            uploaded[Key] = Body
+            return {"ETag": '"1"'}
+
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.side_effect = get_object
+        mock_s3_client.put_object.side_effect = put_object
+        self.collection.snapshot_url = "bucket/.arti/vectors/collection"
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            self.assertTrue(self.collection.snapshot())
+            restored = LocalCollection(
+                os.path.join(self.tmp_dir.name, "restored"),
+                embedding_function=embed,
+                snapshot_url="bucket/.arti/vectors/collection",
+            )
+
+        self.assertEqual(sorted(uploaded), [".arti/vectors/collection/snapshot.bin"])
+        self.assertEqual(mock_s3_client.put_object.call_args.kwargs["IfNoneMatch"], "*")
+        self.assertEqual(restored.get()["ids"], ["1", "2", "3"])
+
+    def test_query_refreshes_snapshot(self):
+        """Test queries reload the snapshot once its ETag changed, checking at most every refresh interval."""
+        other = LocalCollection(os.path.join(self.tmp_dir.name, "other"), embedding_function=embed)
+        other.upsert(ids=["4"], documents=["cccc"], metadatas=[{"app_id": "arti"}])
+        matrix, sidecar = other.save()
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.return_value = {
+            "Body": io.BytesIO(len(sidecar).to_bytes(8, "little") + sidecar + matrix),
+            "ETag": '"2"',
+        }
+        self.collection.snapshot_url = "bucket/.arti/vectors/collection"
+        self.collection.refresh_seconds = 0
+        self.collection._etag = '"1"'  # pylint: disable=protected-access
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            result = self.collection.query(query_embeddings=[[0, 0, 1]], n_results=1)
+            mock_s3_client.get_object.side_effect = ClientError({"Error": {"Code": "304"}}, "GetObject")
+            self.collection.query(query_embeddings=[[0, 0, 1]], n_results=1)
+
+        self.assertEqual(result["ids"], [["4"]])
+        self.assertEqual(mock_s3_client.get_object.call_args.kwargs["IfNoneMatch"], '"2"')
+
+    def test_snapshot_merges_concurrent_snapshot(self):
+        """Test a snapshot uploaded by another container meanwhile is merged with the writes made here."""
+        other = LocalCollection(os.path.join(self.tmp_dir.name, "other"), embedding_function=embed)
+        other.upsert(ids=["4"], documents=["cccc"], metadatas=[{"app_id": "arti"}])
+        matrix, sidecar = other.save()
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.side_effect = [
+            ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"),
+            ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"),
+            {"Body": io.BytesIO(len(sidecar).to_bytes(8, "little") + sidecar + matrix), "ETag": '"other"'},
+        ]
+        mock_s3_client.put_object.side_effect = [
+            ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject"),
+            {"ETag": '"merged"'},
+        ]
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            collection = LocalCollection(
+                os.path.join(self.tmp_dir.name, "merged"), embedding_function=embed, snapshot_url="bucket/.arti/c"
+            )
+            collection.upsert(ids=["1", "2"], documents=["aaa", "bbb"], metadatas=[{}, {}])
+            collection.delete(ids=["2"])
+            self.assertTrue(collection.snapshot())
+
+        self.assertEqual(mock_s3_client.put_object.call_args.kwargs["IfMatch"], '"other"')
+        self.assertEqual(sorted(collection.get()["ids"]), ["1", "4"])
+        self.assertEqual(collection._pending, [])  # pylint: disable=protected-access
+
+    def test_vector_database(self):
+        """Test the Embedchain database adds, queries with citations and keeps open collections."""
+        db = LocalVectorDB(LocalVectorDbConfig(collection_name="chunks", dir=self.tmp_dir.name))
+        with self.assertRaises(ValueError):
+            db.count()
+        db._set_embedder(MagicMock(embedding_fn=embed))  # pylint: disable=protected-access
+        db._initialize()  # pylint: disable=protected-access
+
+        db.add(documents=["aaa", "bbb"], metadatas=[{"url": "a"}, {"url": "b"}], ids=["a", "b"])
+        db.set_collection_name("chunks")
+
+        self.assertEqual(db.count(), 2)
+        self.assertEqual(db.query(input_query="b", n_results=1), ["bbb"])
+        self.assertEqual(db.query(input_query="b", n_results=1, citations=True), [("bbb", {"url": "b", "score": 0.0})])
+        db.delete(where={"url": "b"})
+        self.assertEqual(db.get()["ids"], ["a"])
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+    def test_app_from_config(self):
+        """Test an Embedchain app is built on the local database."""
+        app = app_from_config(
+            {"app": {"config": {"id": "test"}}, "vectordb": {"provider": "local", "config": {"dir": self.tmp_dir.name}}}
+        )
+
+        self.assertIsInstance(app.db, LocalVectorDB)
+        self.assertEqual(app.db.collection.path, os.path.join(self.tmp_dir.name, "embedchain_store"))
+
+
+if __name__ == "__main__":
+    unittest.main()
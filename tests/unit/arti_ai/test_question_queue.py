@@ -0,0 +1,76 @@
+"""Unit tests for the question queue."""
+
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.question_queue import LocalQueue, SQSQueue, make_job, question_queue_from_env
+
+
+class TestQuestionQueue(unittest.TestCase):
+    """Test the question queue backends."""
+
+    def test_make_job_leaves_out_unset_fields(self):
+        """Test jobs only carry the fields that are set."""
+        self.assertEqual(
+            make_job("What is arti?", id="T1", channel="C1", thread_ts=None),
+            {"question": "What is arti?", "id": "T1", "channel": "C1"},
+        )
+
+    def test_local_queue_drains_in_batches(self):
+        """Test queued jobs are handed over in batches of at most the batch size."""
+        queue = LocalQueue(batch_size=2)
+        for number in range(5):
+            queue.send(make_job(f"Question {number}?"))
+        batches = []
+
+        queue.drain(batches.append)
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(len(queue), 0)
+
+    def test_local_queue_consumes_in_background(self):
+        """Test a queue with a consumer answers jobs on a background thread, surviving consumer errors."""
+        answered = threading.Event()
+        consumer = MagicMock(side_effect=[RuntimeError("LLM unavailable"), None])
+
+        def consume(batch):
+            try:
+                consumer(batch)
+            finally:
+                answered.set()
+
+        queue = LocalQueue(consumer=consume)
+        queue.send(make_job("First?"))
+        self.assertTrue(answered.wait(5))
+        answered.clear()
+        queue.send(make_job("Second?"))
+        self.assertTrue(answered.wait(5))
+
+        self.assertEqual(consumer.call_count, 2)
+        self.assertEqual(consumer.call_args.args[0], [{"question": "Second?"}])
+
+    def test_sqs_queue_sends_json(self):
+        """Test SQS jobs are sent as JSON message bodies."""
+        client = MagicMock()
+
+        SQSQueue("https://sqs.example/questions", client=client).send(make_job("What is arti?"))
+
+        client.send_message.assert_called_once_with(
+            QueueUrl="https://sqs.example/questions", MessageBody=json.dumps({"question": "What is arti?"})
+        )
+
+    def test_queue_from_env(self):
+        """Test the queue is configured by environment variables."""
+        with patch.dict("os.environ", {"QUESTION_QUEUE": ""}):
+            self.assertIsNone(question_queue_from_env())
+        with patch.dict("os.environ", {"QUESTION_QUEUE": "sqs", "QUESTION_QUEUE_URL": "https://sqs.example/q"}):
+            self.assertEqual(question_queue_from_env().queue_url, "https://sqs.example/q")
+        with patch.dict("os.environ", {"QUESTION_QUEUE": "kafka"}):
+            with self.assertRaises(ValueError):
+                question_queue_from_env()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Unit tests for reranking retrieved chunks."""
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.rerank import BM25Scorer, LLMScorer, Reranker, install_reranker, rerank_options_from_env, scorer_from_env
+
+CONTEXTS = [
+    ("Deploys run on Fridays.", {"url": "a"}),
+    ("Rotate the API key monthly.", {"url": "b"}),
+    ("The API key is stored in Secrets Manager.", {"url": "c"}),
+]
+
+
+class TestRerank(unittest.TestCase):
+    """Test reranking retrieved chunks."""
+
+    def test_bm25_scorer(self):
+        """Test the text sharing the most rare terms with the question scores highest."""
+        scores = BM25Scorer()("Where is the API key stored?", [text for text, _ in CONTEXTS])
+
+        self.assertEqual(scores[0], 0.0)
+        self.assertGreater(scores[2], scores[1])
+
+    def test_reranker(self):
+        """Test candidates are over-fetched, reordered by score and cut to the requested number."""
+        vector_query = MagicMock(return_value=list(CONTEXTS))
+        reranker = Reranker(vector_query, MagicMock(return_value=[0.1, 0.5, 0.9]), candidates=3)
+
+        contexts = reranker(input_query="question", n_results=2, where={"app_id": "arti"}, citations=True)
+
+        vector_query.assert_called_once_with(
+            input_query="question", n_results=6, where={"app_id": "arti"}, citations=True
+        )
+        self.assertEqual(
+            contexts,
+            [
+                ("The API key is stored in Secrets Manager.", {"url": "c", "rerank_score": 0.9}),
+                ("Rotate the API key monthly.", {"url": "b", "rerank_score": 0.5}),
+            ],
+        )
+
+    def test_reranker_top_n(self):
+        """Test at most `top_n` chunks are forwarded, as texts without citations."""
+        reranker = Reranker(MagicMock(return_value=list(CONTEXTS)), MagicMock(return_value=[0.3, 0.2, 0.1]), top_n=1)
+
+        self.assertEqual(reranker(input_query="question", n_results=3), ["Deploys run on Fridays."])
+
+    def test_reranker_bypassed(self):
+        """Test the retrieval order is kept when scoring fails or exceeds the latency budget."""
+        released = threading.Event()
+        slow_scorer = MagicMock(side_effect=lambda question, texts: released.wait(5) and [0.0] * len(texts))
+        failing_scorer = MagicMock(side_effect=RuntimeError("model unavailable"))
+
+        for reranker in (
+            Reranker(MagicMock(return_value=list(CONTEXTS)), slow_scorer, budget_seconds=0.05),
+            Reranker(MagicMock(return_value=list(CONTEXTS)), failing_scorer),
+        ):
+            self.assertEqual(
+                reranker(input_query="question", n_results=2),
+                ["Deploys run on Fridays.", "Rotate the API key monthly."],
+            )
+        released.set()
+
+    def test_llm_scorer(self):
+        """Test the candidates are scored with one chat completion, whose reply must hold a score per candidate."""
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices[0].message.content = "Scores: [2, 9]"
+        scorer = LLMScorer(client=client)
+
+        self.assertEqual(scorer("question", ["first", "second"]), [2.0, 9.0])
+        self.assertIn("[2] second", client.chat.completions.create.call_args.kwargs["messages"][0]["content"])
+        with self.assertRaises(ValueError):
+            scorer("question", ["only one"])
+
+    def test_install_reranker(self):
+        """Test the app's vector database queries are reranked."""
+        app = MagicMock()
+        query = app.db.query
+
+        install_reranker(app, BM25Scorer(), candidates=2)
+
+        self.assertIsInstance(app.db.query, Reranker)
+        self.assertIs(app.db.query.vector_query, query)
+
+    def test_from_env(self):
+        """Test the scorer and options are read from the environment."""
+        with patch.dict("os.environ", {"RERANKER": "", "RERANK_TOP_N": "2", "RERANK_BUDGET_SECONDS": "0.5"}):
+            self.assertIsNone(scorer_from_env())
+            self.assertEqual(rerank_options_from_env(), {"candidates": 3, "top_n": 2, "budget_seconds": 0.5})
+        with patch.dict("os.environ", {"RERANKER": "llm", "RERANK_MODEL": "gpt-4o-mini"}):
+            self.assertEqual(scorer_from_env().model, "gpt-4o-mini")
+        with patch.dict("os.environ", {"RERANKER": "unknown"}), self.assertRaises(ValueError):
+            scorer_from_env()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,21 @@
 # pylint: disable=E0633, I0021
 """Test cases for the S3BucketLoader class."""
 
+import hashlib
 import unittest
 from contextlib import contextmanager
 from unittest.mock import MagicMock, patch
 
-from arti_ai.s3_loader import S3BucketLoader
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.s3_loader import S3BucketLoader, document_id, parse_html, parse_pdf, parse_text, select_parser
+
+
+def s3_body(content):
+    """Return a streaming body mock yielding the content in one chunk."""
+    body = MagicMock()
+    body.iter_chunks.return_value = [content]
+    return body
 
 
 @contextmanager
@@ -49,7 +59,9 @@ class TestS3BucketLoader(unittest.TestCase):
         self.assertEqual(
             len(data.get("data", [])), 0
         )  # Expecting no data since DirectoryLoader.load_data is mocked to return an empty list
-        mock_boto3_client.assert_called_once_with("s3")
+        mock_boto3_client.assert_called_once()
+        self.assertEqual(mock_boto3_client.call_args.args, ("s3",))
+        self.assertEqual(mock_boto3_client.call_args.kwargs["config"].max_pool_connections, 10)
         mock_paginator.paginate.assert_called_once_with(Bucket="my-test-bucket", Prefix="")
 
     @patch(
@@ -93,6 +105,130 @@ class TestS3BucketLoader(unittest.TestCase):
 
         mock_boto3_client.return_value.download_file.assert_not_called()
 
+    def test_loader_exact_key_selects_single_object(self):
+        """Test a prefix naming an object exactly does not download siblings sharing the prefix."""
+        mock_boto3_client, _, _, _ = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [{"Contents": [{"Key": "assets/a.md"}, {"Key": "assets/a.md.bak"}]}]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+
+        self.loader.load_data("my-test-bucket/assets/a.md")
+
+        mock_boto3_client.return_value.download_file.assert_called_once()
+        self.assertEqual(
+            mock_boto3_client.return_value.download_file.call_args.args,
+            ("my-test-bucket", "assets/a.md", "fake_tmp_dir/assets/a.md"),
+        )
+
+    def test_loader_downloads_concurrently_and_reports_throughput(self):
+        """Test every object is downloaded through the worker pool and throughput is reported."""
+        mock_boto3_client, _, _, _ = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [
+            {"Contents": [{"Key": f"assets/{index}.md", "Size": 100} for index in range(5)]},
+            {"Contents": [{"Key": f"assets/{index}.md", "Size": 100} for index in range(5, 30)]},
+        ]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+        loader = S3BucketLoader(config={"max_workers": "4"})
+
+        loader.load_data("my-test-bucket/assets")
+
+        self.assertEqual(mock_boto3_client.return_value.download_file.call_count, 30)
+        self.assertEqual(loader.last_stats["objects"], 30)
+        self.assertEqual(loader.last_stats["bytes"], 3000)
+        self.assertIn("bytes_per_second", loader.last_stats)
+
+    @patch("arti_ai.s3_loader.time.sleep")
+    def test_loader_retries_throttled_downloads(self, mock_sleep):
+        """Test throttled downloads are retried with exponential backoff."""
+        mock_boto3_client, _, _, _ = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [{"Contents": [{"Key": "test_file.txt"}]}]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+        throttled = ClientError({"Error": {"Code": "SlowDown"}}, "GetObject")
+        mock_boto3_client.return_value.download_file.side_effect = [throttled, throttled, None]
+
+        self.loader.load_data("my-test-bucket")
+
+        self.assertEqual(mock_boto3_client.return_value.download_file.call_count, 3)
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [0.5, 1.0])
+
+    def test_loader_raises_non_throttling_errors(self):
+        """Test errors other than throttling are not retried."""
+        mock_boto3_client, _, _, _ = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [{"Contents": [{"Key": "test_file.txt"}]}]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+        mock_boto3_client.return_value.download_file.side_effect = ClientError(
+            {"Error": {"Code": "AccessDenied"}}, "GetObject"
+        )
+
+        with self.assertRaises(ClientError):
+            self.loader.load_data("my-test-bucket")
+
+        mock_boto3_client.return_value.download_file.assert_called_once()
+
+    def test_document_id_matches_hash_of_contents(self):
+        """Test the incremental document id equals the hash of the contents' string form and the URL."""
+        contents = ["first", 'it\'s "quoted"\n', ""]
+
+        self.assertEqual(
+            document_id(iter(contents), "bucket/prefix"),
+            hashlib.sha256((str(contents) + "bucket/prefix").encode()).hexdigest(),
+        )
+        self.assertEqual(document_id([], "bucket"), hashlib.sha256(b"[]bucket").hexdigest())
+
+    def test_select_parser(self):
+        """Test parsers are selected by extension, then by content type."""
+        self.assertIs(select_parser("docs/readme.md"), parse_text)
+        self.assertIs(select_parser("docs/page.HTML"), parse_html)
+        self.assertIs(select_parser("docs/paper.pdf", "text/plain"), parse_pdf)
+        self.assertIs(select_parser("docs/no-extension", "text/plain; charset=utf-8"), parse_text)
+        self.assertIsNone(select_parser("docs/report.docx"))
+
+    def test_stream_mode_parses_objects_in_memory(self):
+        """Test stream mode reads objects with get_object and never creates a temporary directory."""
+        mock_boto3_client, mock_temp_dir, _, mock_directory_loader_load_data = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [{"Contents": [{"Key": "assets/b.html"}, {"Key": "assets/a.md"}]}]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+        mock_boto3_client.return_value.get_object.side_effect = lambda Bucket, Key: {
+            "Body": s3_body(b"# Title" if Key.endswith(".md") else b"<html><body><p>Hello</p></body></html>"),
+            "ContentType": "text/html" if Key.endswith(".html") else "text/markdown",
+        }
+        loader = S3BucketLoader(config={"mode": "stream"})
+
+        data = loader.load_data("my-test-bucket/assets")
+
+        self.assertEqual([item["content"] for item in data["data"]], ["# Title", "Hello"])
+        self.assertEqual(
+            data["data"][0]["meta_data"]["url"], "https://s3.us-east-1.amazonaws.com/my-test-bucket/assets/a.md"
+        )
+        self.assertIsNotNone(data["doc_id"])
+        mock_temp_dir.assert_not_called()
+        mock_directory_loader_load_data.assert_not_called()
+        mock_boto3_client.return_value.download_file.assert_not_called()
+
+    @patch("embedchain.loaders.directory_loader.DirectoryLoader._predict_loader")
+    def test_stream_mode_falls_back_to_embedchain_loader(self, mock_predict_loader):
+        """Test formats without an in-memory parser are loaded through the matching Embedchain loader."""
+        mock_boto3_client, _, _, _ = self.mock_environment_context
+        mock_paginator = MagicMock()
+        mock_paginator.paginate.return_value = [{"Contents": [{"Key": "report.docx"}]}]
+        mock_boto3_client.return_value.get_paginator.return_value = mock_paginator
+        mock_boto3_client.return_value.get_object.return_value = {"Body": s3_body(b"docx bytes")}
+        mock_predict_loader.return_value.load_data.return_value = {
+            "data": [{"content": "report text", "meta_data": {"url": "/tmp/tmpfile.docx"}}]
+        }
+        loader = S3BucketLoader(config={"mode": "stream"})
+
+        documents = list(loader.iter_documents("my-test-bucket"))
+
+        self.assertEqual(documents[0]["content"], "report text")
+        self.assertEqual(
+            documents[0]["meta_data"]["url"], "https://s3.us-east-1.amazonaws.com/my-test-bucket/report.docx"
+        )
+
     def test_s3_bucket_loader_processes_files_correctly(self):
         """Test that S3BucketLoader processes files correctly, including invoking DirectoryLoader."""
         mock_boto3_client, _, _, mock_directory_loader_load_data = self.mock_environment_context
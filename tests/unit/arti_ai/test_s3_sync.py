@@ -0,0 +1,137 @@
+"""Unit tests for incremental S3 synchronisation."""
+
+import io
+import json
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.s3_sync import S3IncrementalSync, S3Manifest, object_fingerprint
+
+
+def s3_object(key, etag, size=10):
+    """Return an object as listed by list_objects_v2."""
+    return {"Key": key, "ETag": f'"{etag}"', "Size": size, "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+
+class TestS3IncrementalSync(unittest.TestCase):
+    """Test the S3IncrementalSync class."""
+
+    def setUp(self):
+        """Set up the test."""
+        self.app = MagicMock()
+        self.app.add.side_effect = lambda source, loader: f"hash-of-{source}"
+        self.s3_client = MagicMock()
+        self.paginator = MagicMock()
+        self.s3_client.get_paginator.return_value = self.paginator
+        self.sync = S3IncrementalSync(self.app, MagicMock(), self.s3_client, manifest_key=".arti/manifest.json")
+
+    def given_manifest(self, entries):
+        """Make the stored manifest return the given entries."""
+        body = io.BytesIO(json.dumps({"version": 1, "objects": entries}).encode("utf-8"))
+        self.s3_client.get_object.return_value = {"Body": body}
+
+    def saved_manifest(self):
+        """Return the entries of the last saved manifest."""
+        return json.loads(self.s3_client.put_object.call_args.kwargs["Body"])["objects"]
+
+    def test_first_sync_adds_everything(self):
+        """Test every object is added when no manifest exists."""
+        self.s3_client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        self.paginator.paginate.return_value = [
+            {"Contents": [s3_object("assets/a.md", "1"), s3_object("assets/", "0"), s3_object("assets/b.md", "2")]}
+        ]
+
+        counts = self.sync.sync("bucket/assets")
+
+        self.assertEqual(counts, {"added": 2, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0})
+        self.app.add.assert_any_call("bucket/assets/a.md", loader=self.sync.loader)
+        self.assertEqual(self.saved_manifest()["assets/b.md"]["source_hash"], "hash-of-bucket/assets/b.md")
+
+    def test_sync_only_touches_changed_objects(self):
+        """Test unchanged objects are skipped, changed ones re-ingested and removed ones deleted."""
+        self.given_manifest(
+            {
+                "assets/same.md": {**object_fingerprint(s3_object("assets/same.md", "1")), "source_hash": "same"},
+                "assets/changed.md": {**object_fingerprint(s3_object("assets/changed.md", "1")), "source_hash": "old"},
+                "assets/removed.md": {**object_fingerprint(s3_object("assets/removed.md", "1")), "source_hash": "gone"},
+                "other/kept.md": {**object_fingerprint(s3_object("other/kept.md", "1")), "source_hash": "kept"},
+            }
+        )
+        self.paginator.paginate.return_value = [
+            {
+                "Contents": [
+                    s3_object("assets/same.md", "1"),
+                    s3_object("assets/changed.md", "2"),
+                    s3_object("assets/new.md", "3"),
+                ]
+            }
+        ]
+
+        counts = self.sync.sync("bucket/assets")
+
+        self.assertEqual(counts, {"added": 1, "updated": 1, "deleted": 1, "skipped": 1, "failed": 0})
+        self.assertEqual(self.app.add.call_count, 2)
+        self.app.delete.assert_any_call("old")
+        self.app.delete.assert_any_call("gone")
+        self.assertEqual(
+            sorted(self.saved_manifest()), ["assets/changed.md", "assets/new.md", "assets/same.md", "other/kept.md"]
+        )
+
+    def test_unchanged_sync_does_not_write_manifest(self):
+        """Test a sync with nothing to do leaves the manifest alone."""
+        self.given_manifest({"a.md": {**object_fingerprint(s3_object("a.md", "1")), "source_hash": "a"}})
+        self.paginator.paginate.return_value = [{"Contents": [s3_object("a.md", "1")]}]
+
+        counts = self.sync.sync("bucket")
+
+        self.assertEqual(counts["skipped"], 1)
+        self.app.add.assert_not_called()
+        self.s3_client.put_object.assert_not_called()
+
+    def test_failed_ingest_is_counted_and_not_recorded(self):
+        """Test an object that fails to ingest is retried on the next run."""
+        self.given_manifest({})
+        self.app.add.side_effect = RuntimeError("embedding failed")
+        self.paginator.paginate.return_value = [{"Contents": [s3_object("a.md", "1")]}]
+
+        counts = self.sync.sync("bucket")
+
+        self.assertEqual(counts["failed"], 1)
+        self.s3_client.put_object.assert_not_called()
+
+    def test_sync_skips_internal_objects(self):
+        """Test snapshots arti writes to the bucket are not ingested by a sync of the whole bucket."""
+        self.given_manifest({})
+        self.sync.config_data = {"vectordb": {"provider": "local", "config": {"snapshot_url": "bucket/vectordb"}}}
+        self.paginator.paginate.return_value = [
+            {
+                "Contents": [
+                    s3_object(".arti/manifest.json", "1"),
+                    s3_object(".arti/keyword_index.json.gz", "2"),
+                    s3_object("snapshots/embeddings.sqlite3", "3"),
+                    s3_object("vectordb/embedchain_store/snapshot.bin", "4"),
+                    s3_object("assets/a.md", "5"),
+                ]
+            }
+        ]
+
+        with patch.dict(os.environ, {"EMBEDDING_CACHE_SNAPSHOT_URL": "bucket/snapshots/embeddings.sqlite3"}):
+            counts = self.sync.sync("bucket")
+
+        self.assertEqual(counts["added"], 1)
+        self.app.add.assert_called_once_with("bucket/assets/a.md", loader=self.sync.loader)
+
+    def test_manifest_load_reraises_unexpected_errors(self):
+        """Test errors other than a missing manifest are raised."""
+        self.s3_client.get_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "GetObject")
+
+        with self.assertRaises(ClientError):
+            S3Manifest(self.s3_client, "bucket").load()
+
+
+if __name__ == "__main__":
+    unittest.main()
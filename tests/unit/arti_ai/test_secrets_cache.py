@@ -0,0 +1,111 @@
+"""Unit tests for the secrets cache."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError  # type: ignore
+from cryptography.fernet import Fernet  # type: ignore
+
+from arti_ai.secrets_cache import SecretsCache
+
+
+def secret_value(**kwargs):
+    """Return a get_secret_value response for the requested secret."""
+    return {"SecretString": json.dumps({"apiKey": f"key-for-{kwargs['SecretId']}"})}
+
+
+class TestSecretsCache(unittest.TestCase):
+    """Test the SecretsCache class."""
+
+    def setUp(self):
+        """Set up a Secrets Manager client mock."""
+        self.client = MagicMock()
+        self.client.get_secret_value.side_effect = secret_value
+
+    @patch("arti_ai.secrets_cache.time.time")
+    def test_get_caches_until_ttl(self, mock_time):
+        """Test a secret is fetched once per TTL."""
+        cache = SecretsCache(lambda: self.client, ttl=100, refresh_ahead=0)
+
+        mock_time.return_value = 0
+        self.assertEqual(cache.get("openai"), {"apiKey": "key-for-openai"})
+        mock_time.return_value = 99
+        cache.get("openai")
+        self.client.get_secret_value.assert_called_once()
+
+        mock_time.return_value = 100
+        cache.get("openai")
+        self.assertEqual(self.client.get_secret_value.call_count, 2)
+
+    @patch("arti_ai.secrets_cache.threading.Thread")
+    @patch("arti_ai.secrets_cache.time.time")
+    def test_get_refreshes_in_background_before_expiry(self, mock_time, mock_thread):
+        """Test a read close to expiry returns the cached value and starts one background refresh."""
+        cache = SecretsCache(lambda: self.client, ttl=100, refresh_ahead=10)
+        mock_time.return_value = 0
+        cache.get("openai")
+
+        mock_time.return_value = 95
+        self.assertEqual(cache.get("openai"), {"apiKey": "key-for-openai"})
+        cache.get("openai")
+
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+        self.client.get_secret_value.assert_called_once()
+
+    def test_prefetch_batches_missing_secrets(self):
+        """Test missing secrets are fetched in one batched, paginated request and then served from the cache."""
+        self.client.batch_get_secret_value.side_effect = [
+            {"SecretValues": [{"Name": "openai", "SecretString": json.dumps({"apiKey": "o"})}], "NextToken": "t"},
+            {
+                "SecretValues": [{"Name": "slack", "ARN": "arn:slack", "SecretString": json.dumps({"apiKey": "s"})}],
+                "Errors": [{"SecretId": "pinecone", "Message": "not found"}],
+            },
+        ]
+        cache = SecretsCache(lambda: self.client)
+
+        secrets = cache.prefetch(["openai", "pinecone", "slack", "openai"])
+
+        self.assertEqual(set(secrets), {"openai", "slack"})
+        self.assertEqual(
+            self.client.batch_get_secret_value.call_args_list[0].kwargs,
+            {"SecretIdList": ["openai", "pinecone", "slack"]},
+        )
+        self.assertEqual(self.client.batch_get_secret_value.call_args_list[1].kwargs["NextToken"], "t")
+        self.assertEqual(cache.get("slack"), {"apiKey": "s"})
+        self.assertEqual(cache.prefetch(["openai", "slack"]), {})
+        self.client.get_secret_value.assert_not_called()
+
+    def test_prefetch_falls_back_when_batch_is_denied(self):
+        """Test a denied batch request leaves secrets to individual fetches."""
+        self.client.batch_get_secret_value.side_effect = ClientError(
+            {"Error": {"Code": "AccessDeniedException"}}, "BatchGetSecretValue"
+        )
+        cache = SecretsCache(lambda: self.client)
+
+        self.assertEqual(cache.prefetch(["openai"]), {})
+        self.assertEqual(cache.get("openai"), {"apiKey": "key-for-openai"})
+
+    def test_encrypted_disk_cache_survives_restart(self):
+        """Test a new cache reads secrets from the encrypted file instead of Secrets Manager."""
+        key = Fernet.generate_key().decode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "secrets.cache")
+            SecretsCache(lambda: self.client, path=path, encryption_key=key).get("openai")
+            with open(path, "rb") as file:
+                self.assertNotIn(b"key-for-openai", file.read())
+
+            restarted = SecretsCache(lambda: self.client, path=path, encryption_key=key)
+            self.assertEqual(restarted.get("openai"), {"apiKey": "key-for-openai"})
+
+            other_key = SecretsCache(lambda: self.client, path=path, encryption_key=Fernet.generate_key())
+            other_key.get("openai")
+
+        self.assertEqual(self.client.get_secret_value.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Unit tests for the long-running arti server."""
+
+import http.client
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from wsgiref.util import setup_testing_defaults
+
+from arti_ai.question_queue import LocalQueue, make_job
+from arti_ai.server import ServerMetrics, create_server, create_wsgi_app, warm
+
+
+def call(application, path):
+    """Call a WSGI application, returning the status and the decoded JSON body."""
+    environ = {"PATH_INFO": path}
+    setup_testing_defaults(environ)
+    responses = []
+    body = b"".join(application(environ, lambda status, headers, exc_info=None: responses.append(status)))
+    return responses[0], json.loads(body)
+
+
+class TestServer(unittest.TestCase):
+    """Test the server's routing, health and metrics endpoints."""
+
+    def setUp(self):
+        """Create a WSGI application with a stand-in Slack handler."""
+        self.checks = {"app": MagicMock(return_value=True)}
+        self.metrics = ServerMetrics()
+        self.queue = LocalQueue()
+
+        def slack_handler(environ, start_response):  # pylint: disable=unused-argument
+            start_response("200 OK", [("Content-Type", "application/json")])
+            return [b'{"slack": true}']
+
+        self.application = create_wsgi_app(slack_handler, self.metrics, self.checks, question_queue=self.queue)
+
+    def test_routes(self):
+        """Test Slack requests reach the Slack handler and unknown paths are not found."""
+        self.assertEqual(call(self.application, "/slack/events"), ("200 OK", {"slack": True}))
+        self.assertEqual(call(self.application, "/admin")[0], "404 Not Found")
+
+    def test_health(self):
+        """Test the health endpoint fails while any readiness check fails."""
+        self.assertEqual(call(self.application, "/healthz"), ("200 OK", {"status": "ok", "app": True}))
+
+        self.checks["app"].return_value = False
+        self.assertEqual(
+            call(self.application, "/healthz"), ("503 Service Unavailable", {"status": "unavailable", "app": False})
+        )
+
+    def test_metrics(self):
+        """Test the metrics endpoint reports request counters, the app pool and the question queue."""
+        self.queue.send(make_job("Why?"))
+        call(self.application, "/slack/events")
+        call(self.application, "/admin")
+
+        _, metrics = call(self.application, "/metrics")
+
+        self.assertEqual(metrics["requests"], {"/slack/events 200": 1, "/admin 404": 1})
+        self.assertEqual(metrics["in_flight"], 1)
+        self.assertIn("misses", metrics["app_pool"])
+        self.assertEqual(metrics["queued_questions"], 1)
+
+    @patch("arti_ai.server.arti_app.get_app", side_effect=RuntimeError("secrets unavailable"))
+    def test_warm_failure_is_logged(self, mock_get_app):
+        """Test a failure to build the app while warming does not stop the server."""
+        self.assertFalse(warm())
+        mock_get_app.assert_called_once()
+
+    def test_pooled_server(self):
+        """Test the pooled WSGI server answers concurrent connections over HTTP."""
+        server = create_server(self.application, host="127.0.0.1", port=0, workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            statuses = []
+            for _ in range(3):
+                connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+                connection.request("GET", "/healthz")
+                statuses.append(connection.getresponse().status)
+                connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(self.metrics.snapshot()["requests"], {"/healthz 200": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
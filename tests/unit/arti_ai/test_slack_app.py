@@ -44,6 +44,237 @@ class TestSlackbotEntrypoint(unittest.TestCase):
 
         mock_respond.assert_called_once_with("Q: _Question?_ A: Response from bot.")
 
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    @patch("arti_ai.slack_app.time.monotonic", side_effect=[0.0, 0.5, 1.0, 1.5, 2.0])
+    def test_stream_answer_throttles_updates(self, _mock_monotonic, _mock_auth_test, _mock_app_command):
+        """Test partial answers are sent at most once per interval and rate limits push updates back."""
+        # pylint: disable=import-outside-toplevel
+        from slack_sdk.errors import SlackApiError
+        from slack_sdk.web import SlackResponse
+
+        from arti_ai.slack_app import stream_answer
+
+        # pylint: enable=import-outside-toplevel
+        rate_limited = SlackResponse(
+            client=None,
+            http_verb="POST",
+            api_url="chat.update",
+            req_args={},
+            data={"ok": False, "error": "ratelimited"},
+            headers={"Retry-After": "3"},
+            status_code=429,
+        )
+        mock_update = MagicMock(side_effect=[None, SlackApiError("ratelimited", rate_limited)])
+
+        answer = stream_answer(iter(["a", "b", "c", "d", "e"]), mock_update, interval=1.0)
+
+        self.assertEqual(answer, "abcde")
+        self.assertEqual([call.args[0] for call in mock_update.call_args_list], ["a", "abc"])
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_process_arti_request_streaming(self, _mock_auth_test, _mock_app_command):
+        """Test the /arti answer replaces the original message while it is streamed."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import handle_arti_request
+
+        # pylint: enable=import-outside-toplevel
+        mock_respond = MagicMock()
+
+        with patch.dict("os.environ", {"SLACK_STREAMING_ENABLED": "true", "SLACK_STREAM_UPDATE_SECONDS": "0"}):
+            with patch("arti_ai.slack_app.ask_ai", return_value=iter(["Response ", "from bot."])):
+                handle_arti_request(mock_respond, {"text": "Question?"})
+
+        mock_respond.assert_called_with(text="Q: _Question?_ A: Response from bot.", replace_original=True)
+        self.assertLessEqual(mock_respond.call_count, 5)
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_slack_identity_is_cached_per_token(self, _mock_auth_test, _mock_app_command):
+        """Test auth.test is called once per token, and again after the identity is invalidated."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import SlackIdentity
+
+        # pylint: enable=import-outside-toplevel
+        tokens = iter(["xoxb-1", "xoxb-1", "xoxb-2", "xoxb-2", "xoxb-2"])
+        identity = SlackIdentity(lambda: next(tokens))
+        mock_session = MagicMock()
+        mock_session.post.return_value.status_code = 200
+        mock_session.post.return_value.json.return_value = {"ok": True, "user_id": "U1"}
+
+        with patch("arti_ai.slack_app.get_http_session", return_value=mock_session):
+            user_ids = [identity.bot_user_id, identity.bot_user_id, identity.bot_user_id]
+            identity.invalidate()
+            mock_session.post.return_value.json.return_value = {"ok": False, "error": "invalid_auth"}
+            self.assertEqual(identity.get(), {})
+            self.assertEqual(identity.get(), {})
+
+        self.assertEqual(user_ids, ["U1", "U1", "U1"])
+        self.assertEqual(mock_session.post.call_count, 4)
+        self.assertEqual(mock_session.post.call_args.kwargs["headers"], {"Authorization": "Bearer xoxb-2"})
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_app_mention_uses_cached_identity(self, _mock_auth_test, _mock_app_command):
+        """Test a mention is stripped using the cached bot user id rather than an auth.test call."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import handle_app_mention, slack_identity
+
+        # pylint: enable=import-outside-toplevel
+        mock_say, mock_client = MagicMock(), MagicMock()
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+
+        with patch("arti_ai.slack_app.ask_ai", return_value="Answer.") as mock_ask_ai:
+            handle_app_mention({"text": "<@UBOT> ask What is arti?"}, mock_say, mock_client)
+
+        mock_ask_ai.assert_called_once_with(question="What is arti?")
+        mock_client.auth_test.assert_not_called()
+        mock_say.assert_called_once_with("Answer.")
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_app_mention_empty_streamed_answer(self, _mock_auth_test, _mock_app_command):
+        """Test an empty streamed answer replaces the placeholder with a fallback, as Slack rejects empty text."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import EMPTY_ANSWER, handle_app_mention, slack_identity
+
+        # pylint: enable=import-outside-toplevel
+        mock_say, mock_client = MagicMock(), MagicMock()
+        mock_say.return_value = {"channel": "C1", "ts": "1.0"}
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+
+        with patch.dict("os.environ", {"SLACK_STREAMING_ENABLED": "true"}):
+            with patch("arti_ai.slack_app.ask_ai", return_value=iter(["", " "])):
+                handle_app_mention({"text": "<@UBOT> ask What is arti?", "channel": "C1"}, mock_say, mock_client)
+
+        mock_client.chat_update.assert_called_once_with(channel="C1", ts="1.0", text=EMPTY_ANSWER)
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_duplicate_deliveries_answer_once(self, _mock_auth_test, _mock_app_command):
+        """Test a redelivered slash command or mention runs its lazy listener once."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import handle_app_mention, handle_arti_request, slack_identity
+
+        # pylint: enable=import-outside-toplevel
+        mock_respond, mock_say = MagicMock(), MagicMock()
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+        command = {"text": "What is arti?", "trigger_id": "T-duplicate"}
+        mention = {"event_id": "Ev-duplicate", "event": {"text": "<@UBOT> ask What is arti?"}}
+
+        with patch("arti_ai.slack_app.ask_ai", return_value="Answer.") as mock_ask_ai:
+            for _ in range(2):
+                handle_arti_request(respond=mock_respond, body=command)
+                handle_app_mention(event=mention["event"], say=mock_say, client=MagicMock(), body=mention)
+
+        self.assertEqual(mock_ask_ai.call_count, 2)
+        mock_respond.assert_called_once()
+        mock_say.assert_called_once_with("Answer.")
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_questions_are_queued(self, _mock_auth_test, _mock_app_command):
+        """Test questions are enqueued for the worker instead of answered when a queue is configured."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import handle_app_mention, handle_arti_request, slack_identity
+
+        # pylint: enable=import-outside-toplevel
+        mock_queue, mock_respond, mock_say = MagicMock(), MagicMock(), MagicMock()
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+        command = {"text": "Why?", "trigger_id": "T-queued", "response_url": "https://hooks.slack.com/1"}
+        mention = {"event_id": "Ev-queued", "event": {"text": "<@UBOT> ask How?", "channel": "C1"}}
+
+        with patch("arti_ai.slack_app.question_queue", mock_queue), patch("arti_ai.slack_app.ask_ai") as mock_ask_ai:
+            handle_arti_request(respond=mock_respond, body=command)
+            handle_app_mention(event=mention["event"], say=mock_say, client=MagicMock(), body=mention)
+
+        mock_ask_ai.assert_not_called()
+        mock_respond.assert_not_called()
+        mock_say.assert_not_called()
+        self.assertEqual(
+            [call.args[0] for call in mock_queue.send.call_args_list],
+            [
+                {
+                    "question": "Why?",
+                    "id": "T-queued",
+                    "response_url": "https://hooks.slack.com/1",
+                    "prefix": "Q: _Why?_ A: ",
+                },
+                {"question": "How?", "id": "Ev-queued", "channel": "C1"},
+            ],
+        )
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_instrument_slack_request(self, _mock_auth_test, _mock_app_command):
+        """Test Slack API calls are counted on the request's trace and Bolt's identity is cached."""
+        # pylint: disable=import-outside-toplevel
+        from slack_bolt import BoltContext
+        from slack_sdk import WebClient
+
+        from arti_ai.slack_app import instrument_slack_request, slack_identity
+        from arti_ai.tracing import Tracer
+
+        # pylint: enable=import-outside-toplevel
+        client = WebClient(token="xoxb-bolt")
+        client.api_call = MagicMock()
+        context = BoltContext(client=client, bot_token="xoxb-bolt", bot_user_id="UBOLT", bot_id="B1", team_id="T1")
+        tracer = Tracer(enabled=True)
+        emitted = []
+
+        with patch("arti_ai.slack_app.tracer", tracer), patch.object(tracer, "emit", emitted.append):
+            instrument_slack_request(
+                context,
+                {"event": {"type": "app_mention"}},
+                lambda: context.client.chat_postMessage(channel="C1", text="Hi"),
+            )
+
+        self.assertEqual(emitted[0].attributes, {"request_type": "app_mention"})
+        self.assertEqual(emitted[0].counters, {"slack_api_calls": 1, "slack_api.chat.postMessage": 1})
+        self.assertEqual(slack_identity._token, "xoxb-bolt")  # pylint: disable=protected-access
+        self.assertEqual(slack_identity._identity["user_id"], "UBOLT")  # pylint: disable=protected-access
+        slack_identity.invalidate()
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_auth_errors_invalidate_identity(self, _mock_auth_test, _mock_app_command):
+        """Test an auth error raised by a lazy listener or reaching the error handler forgets the bot identity."""
+        # pylint: disable=import-outside-toplevel
+        from slack_sdk.errors import SlackApiError
+
+        from arti_ai.slack_app import handle_arti_request, handle_listener_error, slack_identity
+
+        # pylint: enable=import-outside-toplevel
+        revoked = SlackApiError("token_revoked", {"ok": False, "error": "token_revoked"})
+        mock_respond = MagicMock(side_effect=revoked)
+
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+        with patch("arti_ai.slack_app.ask_ai", return_value="Answer."):
+            with self.assertRaises(SlackApiError):
+                handle_arti_request(respond=mock_respond, body={"text": "Why?", "trigger_id": "T-revoked"})
+        self.assertEqual(slack_identity.peek(), {})
+
+        slack_identity.remember(slack_identity.token_provider(), {"user_id": "UBOT"})
+        handle_listener_error(SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"}), MagicMock())
+        self.assertEqual(slack_identity.peek(), {"user_id": "UBOT"})
+        handle_listener_error(revoked, MagicMock())
+        self.assertEqual(slack_identity.peek(), {})
+
+    @patch("arti_ai.slack_app.app.command")
+    @patch("slack_bolt.app.app.WebClient.auth_test", return_value=MagicMock(ok=True))
+    def test_http_session_is_pooled(self, _mock_auth_test, _mock_app_command):
+        """Test direct Slack HTTP calls share one session that counts them."""
+        # pylint: disable=import-outside-toplevel
+        from arti_ai.slack_app import count_slack_http_call, get_http_session
+
+        # pylint: enable=import-outside-toplevel
+        session = get_http_session()
+
+        self.assertIs(get_http_session(), session)
+        self.assertIn(count_slack_http_call, session.hooks["response"])
+        self.assertEqual(session.get_adapter("https://slack.com")._pool_maxsize, 10)  # pylint: disable=protected-access
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,103 @@
+"""Unit tests for the Slack event prefilter."""
+
+import base64
+import json
+import unittest
+from unittest.mock import patch
+
+from arti_ai.slack_prefilter import EventPrefilter, RecentEvents, prefilter_from_env
+
+
+def api_gateway_event(payload, headers=None, base64_encoded=False):
+    """Return an API Gateway event posting a JSON payload."""
+    body = json.dumps(payload)
+    if base64_encoded:
+        body = base64.b64encode(body.encode("utf-8")).decode("utf-8")
+    return {"body": body, "isBase64Encoded": base64_encoded, "headers": headers or {}}
+
+
+def event_callback(event_id, **slack_event):
+    """Return an Events API payload."""
+    return {"type": "event_callback", "event_id": event_id, "event": slack_event}
+
+
+class TestSlackPrefilter(unittest.TestCase):
+    """Test the Slack event prefilter."""
+
+    def setUp(self):
+        """Create a prefilter deduplicating events."""
+        self.prefilter = EventPrefilter(RecentEvents(ttl_seconds=60))
+
+    def test_ignored_events_are_skipped(self):
+        """Test bot messages and reactions on other users' messages are skipped, other events pass."""
+        bot_message = event_callback("Ev1", type="message", bot_id="B1", text="hello")
+        edited_message = event_callback("Ev2", type="message", subtype="message_changed")
+        other_reaction = event_callback("Ev3", type="reaction_added", item_user="U2", reaction="eyes")
+        own_reaction = event_callback("Ev4", type="reaction_added", item_user="U1", reaction="eyes")
+        mention = event_callback("Ev5", type="app_mention", text="<@U1> ask why?")
+
+        self.assertEqual(self.prefilter.check(api_gateway_event(bot_message), "U1"), ("bot_message", "Ev1"))
+        self.assertEqual(
+            self.prefilter.check(api_gateway_event(edited_message, base64_encoded=True), "U1"), ("bot_message", "Ev2")
+        )
+        self.assertEqual(
+            self.prefilter.check(api_gateway_event(other_reaction), "U1"), ("reaction_not_on_bot_message", "Ev3")
+        )
+        self.assertEqual(self.prefilter.check(api_gateway_event(own_reaction), "U1"), (None, "Ev4"))
+        self.assertEqual(self.prefilter.check(api_gateway_event(other_reaction), None), (None, "Ev3"))
+        self.assertEqual(self.prefilter.check(api_gateway_event(mention), "U1"), (None, "Ev5"))
+
+    def test_commands_and_lazy_invocations_pass(self):
+        """Test form encoded requests and Bolt's lazy listener invocations are never skipped."""
+        self.prefilter.handled("Ev1", {"statusCode": 200})
+        command = {"body": "command=%2Fsmarti&text=", "isBase64Encoded": False, "headers": {}}
+        lazy = api_gateway_event(
+            event_callback("Ev1", type="message", bot_id="B1"), headers={"x-slack-bolt-lazy-only": "1"}
+        )
+
+        self.assertEqual(self.prefilter.check(command, "U1"), (None, None))
+        self.assertEqual(self.prefilter.check(lazy, "U1"), (None, None))
+
+    def test_retries_are_deduplicated(self):
+        """Test retries are skipped once their event was accepted, or while the first delivery is running."""
+        event = event_callback("Ev1", type="app_mention", text="<@U1> ask why?")
+        retry = api_gateway_event(event, headers={"X-Slack-Retry-Num": "1", "X-Slack-Retry-Reason": "http_error"})
+        timeout_retry = api_gateway_event(
+            event, headers={"X-Slack-Retry-Num": "1", "X-Slack-Retry-Reason": "http_timeout"}
+        )
+
+        self.assertEqual(self.prefilter.check(timeout_retry), ("retry_after_timeout", None))
+        self.assertEqual(self.prefilter.check(retry), (None, "Ev1"))
+
+        self.prefilter.handled("Ev1", {"statusCode": 401})
+        self.assertEqual(self.prefilter.check(retry), (None, "Ev1"))
+
+        self.prefilter.handled("Ev1", {"statusCode": 200})
+        self.assertEqual(self.prefilter.check(retry), ("duplicate_event", "Ev1"))
+
+    def test_recent_events_expire_and_are_capped(self):
+        """Test event ids are forgotten after the time to live and beyond the maximum number."""
+        recent_events = RecentEvents(ttl_seconds=10, max_entries=2)
+
+        with patch("arti_ai.slack_prefilter.time.monotonic", side_effect=[0, 1, 2, 3, 4, 15]):
+            recent_events.add("Ev1")
+            recent_events.add("Ev2")
+            recent_events.add("Ev3")
+
+            self.assertNotIn("Ev1", recent_events)
+            self.assertIn("Ev3", recent_events)
+            self.assertEqual(len(recent_events), 0)
+
+    @patch.dict("os.environ", {"SLACK_EVENT_PREFILTER": "false"})
+    def test_prefilter_can_be_disabled(self):
+        """Test the prefilter is disabled by environment variable."""
+        self.assertIsNone(prefilter_from_env())
+
+    @patch.dict("os.environ", {"SLACK_EVENT_DEDUPE_TTL_SECONDS": "0"})
+    def test_deduplication_can_be_disabled(self):
+        """Test retries are not deduplicated with a zero time to live."""
+        self.assertIsNone(prefilter_from_env().recent_events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Unit tests for the snapshotted index base class."""
+
+import io
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError  # type: ignore
+
+from arti_ai.snapshot import SNAPSHOT_ATTEMPTS, SnapshottedIndex
+
+
+class ListIndex(SnapshottedIndex):
+    """Index of a list of items, snapshotted as comma-separated text."""
+
+    def __init__(self, snapshot_url=None):
+        """Initialize an empty index."""
+        super().__init__(snapshot_url=snapshot_url, refresh_seconds=0)
+        self.items = []
+        self.saved = 0
+
+    def add(self, item):
+        """Add an item."""
+        self._record("add", item)
+
+    def _add(self, item):
+        """Add an item without recording the change."""
+        self.items.append(item)
+
+    def save(self):
+        """Count the saves."""
+        self.saved += 1
+
+    def _load_snapshot(self, payload):
+        """Replace the items with the snapshot's."""
+        self.items = payload.decode("utf-8").split(",") if payload else []
+
+    def _save_snapshot(self):
+        """Return the items as the snapshot."""
+        self.save()
+        return ",".join(self.items).encode("utf-8")
+
+
+class TestSnapshottedIndex(unittest.TestCase):
+    """Test the SnapshottedIndex class."""
+
+    def test_changes_are_only_recorded_with_a_snapshot_location(self):
+        """Test changes are journaled for snapshots only, and saving locally skips S3."""
+        index = ListIndex()
+        index.add("a")
+
+        self.assertFalse(index.snapshot())
+        self.assertEqual(index.items, ["a"])
+        self.assertEqual(index._pending, [])  # pylint: disable=protected-access
+        self.assertEqual(index.saved, 1)
+
+    def test_refresh_replays_pending_changes(self):
+        """Test a newer snapshot is loaded with the unsnapshotted changes replayed on top of it."""
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.return_value = {"Body": io.BytesIO(b"b,c"), "ETag": '"2"'}
+        index = ListIndex(snapshot_url="bucket/index")
+        index.add("a")
+
+        with patch("boto3.client", return_value=mock_s3_client):
+            self.assertTrue(index.refresh())
+
+        self.assertEqual(index.items, ["b", "c", "a"])
+        mock_s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="index")
+
+    def test_snapshot_gives_up_when_the_snapshot_keeps_changing(self):
+        """Test conflicting uploads are merged again, up to `SNAPSHOT_ATTEMPTS` times."""
+        mock_s3_client = MagicMock()
+        mock_s3_client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        mock_s3_client.put_object.side_effect = ClientError({"Error": {"Code": "412"}}, "PutObject")
+        index = ListIndex(snapshot_url="bucket/index")
+        index.add("a")
+
+        with patch("boto3.client", return_value=mock_s3_client), self.assertRaises(RuntimeError):
+            index.snapshot()
+
+        self.assertEqual(mock_s3_client.put_object.call_count, SNAPSHOT_ATTEMPTS)
+        self.assertEqual(index._pending, [("add", ("a",))])  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    unittest.main()
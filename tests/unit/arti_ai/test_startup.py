@@ -0,0 +1,68 @@
+"""Unit tests for cold-start profiling and pre-warming."""
+
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from arti_ai.startup import StartupProfiler, prewarm
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """Test the StartupProfiler class."""
+
+    def test_phase_records_duration_and_loaded_packages(self):
+        """Test a phase records its duration and the packages first imported during it."""
+        profiler = StartupProfiler()
+
+        with patch.dict("sys.modules"):
+            with profiler.phase("import colorsys"):
+                # pylint: disable=import-outside-toplevel,unused-import
+                import colorsys  # noqa: F401
+
+                # pylint: enable=import-outside-toplevel,unused-import
+
+        phase = profiler.report()["phases"][0]
+        self.assertEqual(phase["name"], "import colorsys")
+        self.assertGreaterEqual(phase["seconds"], 0)
+        self.assertIn("offset_seconds", phase)
+
+    def test_report_on_first_call_logs_once(self):
+        """Test the breakdown is logged on the first invocation only."""
+        profiler = StartupProfiler()
+        with profiler.phase("init"):
+            pass
+        handler = profiler.report_on_first_call(MagicMock(return_value={"statusCode": 200}))
+
+        with patch("arti_ai.startup.logger.info") as mock_info:
+            self.assertEqual(handler({}, {}), {"statusCode": 200})
+            handler({}, {})
+
+        mock_info.assert_called_once()
+        report = json.loads(mock_info.call_args.args[0])
+        self.assertEqual(report["event"], "cold_start")
+        self.assertEqual([phase["name"] for phase in report["phases"]], ["init"])
+
+
+class TestPrewarm(unittest.TestCase):
+    """Test the prewarm function."""
+
+    def test_prewarm_is_opt_in(self):
+        """Test the app is only built when pre-warming is enabled."""
+        build_app = MagicMock()
+
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(prewarm(build_app))
+        with patch.dict(os.environ, {"ARTI_PREWARM": "true"}):
+            self.assertTrue(prewarm(build_app))
+
+        build_app.assert_called_once()
+
+    @patch.dict(os.environ, {"ARTI_PREWARM": "true"})
+    def test_prewarm_failure_is_left_for_first_invocation(self):
+        """Test a failure while pre-warming is logged rather than failing the init phase."""
+        self.assertFalse(prewarm(MagicMock(side_effect=RuntimeError("no network"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
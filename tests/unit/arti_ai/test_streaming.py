@@ -0,0 +1,52 @@
+"""Unit tests for streaming answers."""
+
+import unittest
+from unittest.mock import MagicMock
+
+from arti_ai.streaming import AnswerStream, answer_text
+
+
+class TestAnswerStream(unittest.TestCase):
+    """Test the answer stream."""
+
+    def test_yields_tokens_and_completes(self):
+        """Test tokens are yielded as the callbacks receive them and the response is kept."""
+
+        def query(callbacks):
+            for token in ["Hello", " ", "world"]:
+                callbacks[0].on_llm_new_token(token)
+            return ("Hello world", [("detail", {"url": "u"})])
+
+        on_complete = MagicMock()
+        stream = AnswerStream(query, on_complete=on_complete)
+
+        self.assertEqual(list(stream), ["Hello", " ", "world"])
+        self.assertEqual(stream.response, ("Hello world", [("detail", {"url": "u"})]))
+        on_complete.assert_called_once_with(stream.response)
+
+    def test_yields_whole_answer_without_tokens(self):
+        """Test a query that streams nothing, such as a cached answer, yields its full text."""
+        stream = AnswerStream(lambda _callbacks: ("Cached answer", []))
+
+        self.assertEqual(list(stream), ["Cached answer"])
+
+    def test_reraises_query_errors(self):
+        """Test an error raised by the query surfaces in the consumer."""
+
+        def query(_callbacks):
+            raise RuntimeError("LLM unavailable")
+
+        on_complete = MagicMock()
+
+        with self.assertRaises(RuntimeError):
+            list(AnswerStream(query, on_complete=on_complete))
+        on_complete.assert_not_called()
+
+    def test_answer_text(self):
+        """Test the answer text is extracted from responses with citations."""
+        self.assertEqual(answer_text(("text", [])), "text")
+        self.assertEqual(answer_text("text"), "text")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Unit tests for request tracing."""
+
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from arti_ai.tracing import NOOP_SPAN, Tracer, get_current_span, instrument_app
+
+
+class TestTracing(unittest.TestCase):
+    """Test request tracing."""
+
+    def test_span_tree_is_logged_once(self):
+        """Test nested spans are collected under their root and the trace is logged when the root ends."""
+        tracer = Tracer(enabled=True)
+
+        with patch("arti_ai.tracing.logger") as mock_logger:
+            with tracer.span("ask_ai", model="gpt-4"):
+                with tracer.span("retrieve") as retrieve_span:
+                    retrieve_span.add("answer_cache.hits")
+                    self.assertIs(get_current_span(), retrieve_span)
+                mock_logger.info.assert_not_called()
+
+        trace = json.loads(mock_logger.info.call_args.args[0])
+        self.assertEqual(trace["event"], "trace")
+        self.assertEqual(trace["attributes"], {"model": "gpt-4"})
+        self.assertEqual(trace["spans"][0]["name"], "retrieve")
+        self.assertEqual(trace["spans"][0]["counters"], {"answer_cache.hits": 1})
+        self.assertIs(get_current_span(), NOOP_SPAN)
+
+    def test_traced_records_errors(self):
+        """Test a decorated function failing records the error on its span."""
+        tracer = Tracer(enabled=True)
+
+        @tracer.traced("load_data")
+        def load_data():
+            raise RuntimeError("boom")
+
+        with patch("arti_ai.tracing.logger") as mock_logger, self.assertRaises(RuntimeError):
+            load_data()
+
+        self.assertEqual(json.loads(mock_logger.info.call_args.args[0])["attributes"], {"error": "RuntimeError: boom"})
+
+    def test_disabled_tracer(self):
+        """Test a disabled tracer hands out no-op spans and emits nothing."""
+        tracer = Tracer(enabled=False)
+
+        with patch("arti_ai.tracing.logger") as mock_logger, tracer.span("ask_ai") as span:
+            span.add("tokens", 3)
+
+        self.assertIs(span, NOOP_SPAN)
+        mock_logger.info.assert_not_called()
+
+    def test_embedded_metrics(self):
+        """Test a trace is printed as EMF with summed durations and counters."""
+        tracer = Tracer(enabled=True, emf_namespace="Arti")
+
+        with patch("arti_ai.tracing.logger"), patch("builtins.print") as mock_print:
+            with tracer.span("ask_ai"):
+                for _ in range(2):
+                    with tracer.span("embed") as embed_span:
+                        embed_span.add("total_tokens", 5)
+
+        record = json.loads(mock_print.call_args.args[0])
+        directive = record["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(directive["Namespace"], "Arti")
+        self.assertIn({"Name": "embed.duration", "Unit": "Milliseconds"}, directive["Metrics"])
+        self.assertEqual(record["Operation"], "ask_ai")
+        self.assertEqual(record["total_tokens"], 10)
+
+    @patch("arti_ai.tracing.openai_usage")
+    def test_instrument_app(self, mock_openai_usage):
+        """Test retrieval and generation of an instrumented app are spans, with token usage."""
+        tracer = Tracer(enabled=True)
+        usage = SimpleNamespace(prompt_tokens=7, completion_tokens=3, total_tokens=10)
+        mock_openai_usage.return_value.__enter__.return_value = usage
+
+        class FakeLlm:  # pylint: disable=too-few-public-methods
+            """An LLM answering with its configured model."""
+
+            config = SimpleNamespace(model="gpt-4")
+
+            def get_answer_from_llm(self, prompt):
+                """Return an answer naming the model."""
+                return f"Answer to {prompt} from {self.config.model}"
+
+        app = MagicMock(spec=["db", "embedding_model", "llm"], llm=FakeLlm())
+        app.db = MagicMock(spec=["query"])
+        app.db.query.return_value = ["context"]
+
+        with patch("arti_ai.tracing.tracer", tracer), patch("arti_ai.tracing.logger") as mock_logger:
+            instrument_app(app)
+            with tracer.span("ask_ai"):
+                app.db.query(input_query="question?")
+                answer = app.llm.get_answer_from_llm("prompt")
+
+        spans = json.loads(mock_logger.info.call_args.args[0])["spans"]
+        self.assertEqual([span["name"] for span in spans], ["retrieve", "generate"])
+        self.assertEqual(spans[1]["attributes"], {"model": "gpt-4"})
+        self.assertEqual(spans[1]["counters"], {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10})
+        self.assertEqual(answer, "Answer to prompt from gpt-4")
+
+
+if __name__ == "__main__":
+    unittest.main()